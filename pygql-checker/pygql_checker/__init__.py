@@ -1,5 +1,10 @@
 import ast
+import hashlib
 import json
+import multiprocessing
+import os
+import time
+from collections import namedtuple
 
 import pycodestyle
 
@@ -7,6 +12,7 @@ from pygql_checker.__about__ import (
     __author__, __copyright__, __email__, __license__, __summary__, __title__,
     __uri__, __version__
 )
+from pygql_checker.cache import ResultCache
 from pygql_checker.stdlib_list import STDLIB_NAMES
 from graphql import Source, validate, parse, build_client_schema
 
@@ -18,6 +24,83 @@ __all__ = [
 
 PYGQL_SYNTAX_ERROR = 'PYGQL100'
 PYGQL_VALIDATION_ERROR = 'PYGQL101'
+PYGQL_COST_ERROR = 'PYGQL102'
+
+# Position of the errors read from the cache
+Position = namedtuple('Position', ['lineno', 'col_offset'])
+
+# Result of checking a file, the failure is the reason it couldn't be checked
+FileResult = namedtuple('FileResult', [
+    'filename', 'errors', 'queries', 'cached', 'seconds', 'failure'
+])
+
+
+class IntrospectionSchema(object):
+    """
+    Schema of an introspection file, only built when a query is validated.
+    """
+
+    def __init__(self, data):
+        self.hash = hashlib.sha1(data).hexdigest()
+        self._data = data
+        self._schema = None
+
+    @property
+    def schema(self):
+        if self._schema is None:
+            try:
+                introspection = json.loads(self._data.decode('utf-8'))
+                self._schema = build_client_schema(introspection)
+            except Exception as e:
+                raise Exception(
+                    "Cannot load the provided introspection schema. {}".format(
+                        str(e)
+                    )
+                )
+            self._data = None
+        return self._schema
+
+
+# The schemas are loaded once per process, as flake8 creates a checker per file
+_schemas = {}
+
+
+def load_schema(path):
+    """
+    Return the IntrospectionSchema of the file, loaded again only when the
+    file changes.
+    """
+    try:
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime, stat.st_size)
+        if key not in _schemas:
+            with open(path, 'rb') as data_file:
+                _schemas[key] = IntrospectionSchema(data_file.read())
+    except (IOError, OSError) as e:
+        raise Exception(
+            "Cannot find the provided introspection schema. {}".format(str(e))
+        )
+    return _schemas[key]
+
+
+def parse_costs(value):
+    """
+    Return the dict of a "name=number,name=number" option, as the cost
+    limits "depth=10,nodes=1000" or the field costs "User.friends=5".
+    """
+    if not value:
+        return {}
+    if isinstance(value, dict):
+        return value
+    costs = {}
+    for item in value.split(','):
+        name, _, number = item.partition('=')
+        try:
+            costs[name.strip()] = int(number)
+        except ValueError:
+            raise Exception('Invalid cost "{}", use name=number.'.format(item))
+    return costs
+
 
 class ImportVisitor(ast.NodeVisitor):
     """
@@ -30,8 +113,9 @@ class ImportVisitor(ast.NodeVisitor):
         self.calls = []
 
     def visit_Call(self, node):  # noqa
-        if node.func.id == 'pygql':
+        if isinstance(node.func, ast.Name) and node.func.id == 'gql':
             self.calls.append(node)
+        self.generic_visit(node)
 
     def node_query(self, node):
         """
@@ -57,6 +141,9 @@ class ImportOrderChecker(object):
         self.tree = tree
         self.filename = filename
         self.lines = None
+        # Statistics of the last check
+        self.queries = 0
+        self.cached = False
 
     def load_file(self):
         if self.filename in ("stdin", "-", None):
@@ -68,32 +155,89 @@ class ImportOrderChecker(object):
         if not self.tree:
             self.tree = ast.parse("".join(self.lines))
 
-    def get_schema(self):
+    def get_introspection_schema(self):
         pygql_introspection_schema = self.options.get('pygql_introspection_schema')
-        if gql_introspection_schema:
-            try:
-                with open(pygql_introspection_schema) as data_file:
-                    introspection_schema = json.load(data_file)
-                    return build_client_schema(introspection_schema)
-            except IOError as e:
-                raise Exception("Cannot find the provided introspection schema. {}".format(str(e)))
+        if pygql_introspection_schema:
+            return load_schema(pygql_introspection_schema)
+
+    def get_schema(self):
+        introspection_schema = self.get_introspection_schema()
+        if introspection_schema:
+            return introspection_schema.schema
 
         schema = self.options.get('schema')
         assert schema, 'Need to provide schema'
 
+    def get_cost_analyzer(self):
+        limits = parse_costs(self.options.get('pygql_cost_limits'))
+        if not limits:
+            return None, None
+        try:
+            from pygql.cost import CostAnalyzer
+        except ImportError:
+            raise Exception('The cost limits need pygql to be installed.')
+        field_costs = parse_costs(self.options.get('pygql_field_costs'))
+        return CostAnalyzer(self.get_schema(), field_costs), limits
+
+    def cache_version(self):
+        """
+        Return the key of everything the errors depend on, except the query.
+        """
+        return json.dumps([
+            self.get_introspection_schema().hash,
+            parse_costs(self.options.get('pygql_cost_limits')),
+            parse_costs(self.options.get('pygql_field_costs')),
+        ], sort_keys=True)
+
+    def get_cache(self):
+        # Only introspection schemas are cached, as they can be hashed
+        if self.options.get('pygql_no_cache'):
+            return None
+        if not self.get_introspection_schema():
+            return None
+        return ResultCache(self.options.get('pygql_cache_dir'))
+
     def validation_errors(self, ast):
         return validate(self.get_schema(), ast)
 
     def error(self, node, code, message):
         raise NotImplemented()
 
-    def check_pygql(self):
-        if not self.tree or not self.lines:
-            self.load_file()
+    def query_errors(self, query):
+        """
+        Return the code and message of the errors of the query.
+        """
+        try:
+            source = Source(query, 'pygql query')
+            ast = parse(source)
+        except Exception as e:
+            return [(PYGQL_SYNTAX_ERROR, str(e))]
+
+        errors = [
+            (PYGQL_VALIDATION_ERROR, str(error))
+            for error in self.validation_errors(ast)
+        ]
+        if errors:
+            return errors
+
+        analyzer, limits = self.get_cost_analyzer()
+        if analyzer:
+            from pygql.cost import QueryCostError
+            try:
+                analyzer.check(ast, limits)
+            except QueryCostError as e:
+                return [(PYGQL_COST_ERROR, str(e))]
+        return []
 
+    def file_errors(self, cache=None, version=None):
+        """
+        Return the position, code and message of the errors of the file.
+        """
         visitor = self.visitor_class(self.filename, self.options)
         visitor.visit(self.tree)
 
+        errors = []
+        self.queries = 0
         for node in visitor.calls:
             # Lines with the noqa flag are ignored entirely
             if pycodestyle.noqa(self.lines[node.lineno - 1]):
@@ -103,16 +247,120 @@ class ImportOrderChecker(object):
             if not query:
                 continue
 
-            try:
-                source = Source(query, 'pygql query')
-                ast = parse(source)
-            except Exception as e:
-                message = str(e)
-                yield self.error(node, PYGQL_SYNTAX_ERROR, message)
-                continue
+            self.queries += 1
+            if cache is None:
+                query_errors = self.query_errors(query)
+            else:
+                query_key = cache.key('query', version, query)
+                query_errors = cache.get(query_key)
+                if query_errors is None:
+                    query_errors = self.query_errors(query)
+                    cache.set(query_key, query_errors)
+
+            for code, message in query_errors:
+                errors.append((node.lineno, node.col_offset, code, message))
+        return errors
+
+    def check_pygql(self):
+        if not self.tree or not self.lines:
+            self.load_file()
+
+        cache = self.get_cache()
+        self.cached = False
+        if cache is None:
+            errors = self.file_errors()
+        else:
+            # Files are skipped while they and the schema don't change
+            version = self.cache_version()
+            file_key = cache.key('file', version, ''.join(self.lines))
+            entry = cache.get(file_key)
+            if entry is None:
+                errors = self.file_errors(cache, version)
+                cache.set(file_key, {
+                    'queries': self.queries, 'errors': errors
+                })
+            else:
+                errors, self.queries = entry['errors'], entry['queries']
+                self.cached = True
+
+        for lineno, col_offset, code, message in errors:
+            yield self.error(Position(lineno, col_offset), code, message)
+
+
+class FileChecker(ImportOrderChecker):
+    """
+    Checker returning the errors as (filename, line, column, code, message).
+    """
+
+    def __init__(self, filename, options):
+        super(FileChecker, self).__init__(filename, None)
+        self.options = options
 
-            validation_errors = self.validation_errors(ast)
-            if validation_errors:
-                for error in validation_errors:
-                    message = str(error)
-                    yield self.error(node, PYGQL_VALIDATION_ERROR, message)
+    def error(self, node, code, message):
+        return (self.filename, node.lineno, node.col_offset, code, message)
+
+
+def check_file(filename, options):
+    return list(FileChecker(filename, options).check_pygql())
+
+
+def check_file_result(filename, options):
+    """
+    Check a file, returning a FileResult instead of raising when the file
+    can't be read or parsed.
+    """
+    start = time.time()
+    checker = FileChecker(filename, options)
+    try:
+        errors = list(checker.check_pygql())
+    except (IOError, OSError, SyntaxError, UnicodeDecodeError) as e:
+        return FileResult(filename, [], 0, False, time.time() - start, str(e))
+    return FileResult(
+        filename, errors, checker.queries, checker.cached,
+        time.time() - start, None
+    )
+
+
+def _check_file_result(args):
+    return check_file_result(*args)
+
+
+def check_file_results(filenames, options, jobs=None):
+    """
+    Check the files in parallel with a pool of processes, each loading the
+    schema once. Return the FileResult of every file in order.
+
+    :param filenames: Paths of the Python files
+    :param options: Checker options, as pygql_introspection_schema
+    :param jobs: Number of processes, by default the number of CPUs
+    """
+    filenames = list(filenames)
+    jobs = jobs or multiprocessing.cpu_count()
+    if jobs == 1 or len(filenames) < 2:
+        return [check_file_result(filename, options) for filename in filenames]
+
+    pool = multiprocessing.Pool(min(jobs, len(filenames)))
+    try:
+        chunksize = max(1, len(filenames) // (jobs * 4))
+        return pool.map(
+            _check_file_result,
+            [(filename, options) for filename in filenames],
+            chunksize
+        )
+    finally:
+        pool.close()
+        pool.join()
+
+
+def check_files(filenames, options, jobs=None):
+    """
+    Check the files like check_file_results, returning the errors of all
+    the files in order.
+    """
+    results = check_file_results(filenames, options, jobs)
+    for result in results:
+        if result.failure:
+            raise Exception('Cannot check {}: {}'.format(
+                result.filename, result.failure
+            ))
+    return [error for result in results for error in result.errors]
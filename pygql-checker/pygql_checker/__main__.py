@@ -0,0 +1,5 @@
+import sys
+
+from pygql_checker.cli import main
+
+sys.exit(main())
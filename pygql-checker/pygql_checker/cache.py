@@ -0,0 +1,62 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from pygql_checker.__about__ import __version__
+
+
+def default_cache_dir():
+    return os.environ.get('PYGQL_CHECKER_CACHE_DIR') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'pygql-checker'
+    )
+
+
+class ResultCache(object):
+    """
+    Keeps the errors found in queries and files on disk, so they are not
+    checked again while they and the schema don't change.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or default_cache_dir()
+
+    def key(self, *parts):
+        key = hashlib.sha1(__version__.encode('utf-8'))
+        for part in parts:
+            key.update(b'\0')
+            key.update(part.encode('utf-8'))
+        return key.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, key):
+        try:
+            with open(self.path(key)) as cache_file:
+                return json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def set(self, key, value):
+        directory = os.path.dirname(self.path(key))
+        try:
+            try:
+                os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+
+            # Write to a temporary file first, so other processes
+            # never read a partial entry
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as cache_file:
+                    json.dump(value, cache_file)
+                getattr(os, 'replace', os.rename)(temp_path, self.path(key))
+            except Exception:
+                os.remove(temp_path)
+                raise
+        except (IOError, OSError):
+            # The checks don't fail because of the cache, only get slower
+            pass
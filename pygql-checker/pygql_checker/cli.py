@@ -0,0 +1,267 @@
+"""
+Validates the gql calls of a whole tree against a schema, without flake8.
+
+    pygql-checker --schema introspection.json --format sarif src/
+"""
+from __future__ import absolute_import, print_function
+
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import time
+
+from pygql_checker import (
+    PYGQL_COST_ERROR, PYGQL_SYNTAX_ERROR, PYGQL_VALIDATION_ERROR,
+    check_file_results, load_schema
+)
+from pygql_checker.__about__ import __title__, __uri__, __version__
+
+# The directories skipped by flake8 by default
+DEFAULT_EXCLUDE = '.svn,CVS,.bzr,.hg,.git,__pycache__,.tox,.eggs,*.egg'
+
+SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+
+RULES = [
+    (PYGQL_SYNTAX_ERROR, "The gql query doesn't match the GraphQL syntax"),
+    (PYGQL_VALIDATION_ERROR,
+     "The gql query doesn't validate against the schema"),
+    (PYGQL_COST_ERROR, "The gql query is over the cost limits"),
+]
+
+
+def find_files(paths, exclude=()):
+    """
+    Return the Python files of the paths, looking into the directories
+    except the ones matching an exclude pattern.
+    """
+    def excluded(path):
+        name = os.path.basename(os.path.normpath(path))
+        return any(fnmatch.fnmatch(name, pattern) for pattern in exclude)
+
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, directories, filenames in os.walk(path):
+            directories[:] = sorted(
+                directory for directory in directories
+                if not excluded(directory)
+            )
+            for filename in sorted(filenames):
+                if filename.endswith('.py') and not excluded(filename):
+                    yield os.path.join(root, filename)
+
+
+def get_stats(results, seconds):
+    return {
+        'files': len(results),
+        'cached_files': sum(1 for result in results if result.cached),
+        'failed_files': sum(1 for result in results if result.failure),
+        'queries': sum(result.queries for result in results),
+        'errors': sum(len(result.errors) for result in results),
+        'seconds': round(seconds, 3),
+        'check_seconds': round(sum(result.seconds for result in results), 3),
+    }
+
+
+def format_text(results, stats):
+    lines = []
+    for result in results:
+        if result.failure:
+            lines.append('{}: cannot check: {}'.format(
+                result.filename, result.failure
+            ))
+        for filename, lineno, col_offset, code, message in result.errors:
+            lines.append('{}:{}:{}: {} {}'.format(
+                filename, lineno, col_offset + 1, code, message
+            ))
+    lines.append(
+        '{errors} errors in {queries} queries of {files} files '
+        '({cached_files} cached) in {seconds:.2f}s'.format(**stats)
+    )
+    return '\n'.join(lines)
+
+
+def format_json(results, stats):
+    return json.dumps({
+        'version': __version__,
+        'results': [
+            {
+                'file': filename,
+                'line': lineno,
+                'column': col_offset + 1,
+                'code': code,
+                'message': message,
+            }
+            for result in results
+            for filename, lineno, col_offset, code, message in result.errors
+        ],
+        'failures': [
+            {'file': result.filename, 'message': result.failure}
+            for result in results if result.failure
+        ],
+        'stats': stats,
+    }, indent=2, sort_keys=True)
+
+
+def _uri(filename):
+    if os.path.isabs(filename):
+        return 'file://' + filename.replace(os.sep, '/')
+    return os.path.normpath(filename).replace(os.sep, '/')
+
+
+def format_sarif(results, stats):
+    sarif_results = [
+        {
+            'ruleId': code,
+            'level': 'error',
+            'message': {'text': message},
+            'locations': [{
+                'physicalLocation': {
+                    'artifactLocation': {'uri': _uri(filename)},
+                    'region': {
+                        'startLine': lineno,
+                        'startColumn': col_offset + 1,
+                    },
+                },
+            }],
+        }
+        for result in results
+        for filename, lineno, col_offset, code, message in result.errors
+    ]
+    notifications = [
+        {
+            'level': 'error',
+            'message': {'text': 'Cannot check: {}'.format(result.failure)},
+            'locations': [{
+                'physicalLocation': {
+                    'artifactLocation': {'uri': _uri(result.filename)},
+                },
+            }],
+        }
+        for result in results if result.failure
+    ]
+    return json.dumps({
+        '$schema': SARIF_SCHEMA,
+        'version': '2.1.0',
+        'runs': [{
+            'tool': {
+                'driver': {
+                    'name': __title__,
+                    'version': __version__,
+                    'informationUri': __uri__,
+                    'rules': [
+                        {'id': code, 'shortDescription': {'text': text}}
+                        for code, text in RULES
+                    ],
+                },
+            },
+            'results': sarif_results,
+            'invocations': [{
+                'executionSuccessful': not stats['failed_files'],
+                'toolExecutionNotifications': notifications,
+                'properties': stats,
+            }],
+        }],
+    }, indent=2, sort_keys=True)
+
+
+FORMATS = {
+    'text': format_text,
+    'json': format_json,
+    'sarif': format_sarif,
+}
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog='pygql-checker',
+        description='Validate the gql calls of Python files against a schema.'
+    )
+    parser.add_argument(
+        'paths', nargs='*', default=['.'],
+        help='Python files or directories to check, by default the current one'
+    )
+    parser.add_argument(
+        '--schema', required=True, metavar='FILE',
+        help='JSON file with the introspection of the schema'
+    )
+    parser.add_argument(
+        '--format', choices=sorted(FORMATS), default='text',
+        help='Output format, by default text'
+    )
+    parser.add_argument(
+        '--output', metavar='FILE',
+        help='File to write the results to, by default the standard output'
+    )
+    parser.add_argument(
+        '--jobs', type=int, default=None,
+        help='Number of processes, by default the number of CPUs'
+    )
+    parser.add_argument(
+        '--exclude', default=DEFAULT_EXCLUDE,
+        help='Comma separated patterns of the files and directories to skip'
+    )
+    parser.add_argument(
+        '--cost-limits', default='', metavar='LIMITS',
+        help=('Maximum depth, breadth, nodes or cost of the queries, '
+              'as depth=10,nodes=1000')
+    )
+    parser.add_argument(
+        '--field-costs', default='', metavar='COSTS',
+        help='Cost of the fields, as User.friends=5,Query.search=10'
+    )
+    parser.add_argument(
+        '--cache-dir', metavar='DIR',
+        help='Directory caching the errors, by default ~/.cache/pygql-checker'
+    )
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help='Check every query again instead of using the cached errors'
+    )
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    start = time.time()
+
+    # Fail early on a missing or invalid schema, instead of once per file.
+    # It's built before starting the pool, so the forked workers reuse it
+    try:
+        load_schema(args.schema).schema
+    except Exception as e:
+        print(str(e), file=sys.stderr)
+        return 2
+
+    options = {
+        'pygql_introspection_schema': args.schema,
+        'pygql_cache_dir': args.cache_dir,
+        'pygql_no_cache': args.no_cache,
+        'pygql_cost_limits': args.cost_limits,
+        'pygql_field_costs': args.field_costs,
+    }
+    exclude = [pattern for pattern in args.exclude.split(',') if pattern]
+    filenames = list(find_files(args.paths, exclude))
+    results = check_file_results(filenames, options, args.jobs)
+    stats = get_stats(results, time.time() - start)
+
+    output = FORMATS[args.format](results, stats)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+    if args.format != 'text':
+        # The summary doesn't go in the machine readable output
+        print(format_text([], stats), file=sys.stderr)
+
+    if stats['failed_files']:
+        return 2
+    return 1 if stats['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
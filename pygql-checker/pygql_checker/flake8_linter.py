@@ -27,8 +27,37 @@ class Linter(ImportOrderChecker):
             help=("Style to follow. Available: "
                   "cryptography, google, smarkets, pep8")
         )
+        parser.add_option(
+            "--pygql-cache-dir",
+            metavar="DIR",
+            help=("Directory caching the errors of the checked queries and "
+                  "files, by default ~/.cache/pygql-checker")
+        )
+        parser.add_option(
+            "--pygql-no-cache",
+            default=False,
+            action="store_true",
+            help="Check every query again instead of using the cached errors"
+        )
+        parser.add_option(
+            "--pygql-cost-limits",
+            default='',
+            metavar="LIMITS",
+            help=("Maximum depth, breadth, nodes or cost of the queries, "
+                  "as depth=10,nodes=1000")
+        )
+        parser.add_option(
+            "--pygql-field-costs",
+            default='',
+            metavar="COSTS",
+            help="Cost of the fields, as User.friends=5,Query.search=10"
+        )
         parser.config_options.append("pygql-introspection-schema")
         parser.config_options.append("pygql-typedef-schema")
+        parser.config_options.append("pygql-cache-dir")
+        parser.config_options.append("pygql-no-cache")
+        parser.config_options.append("pygql-cost-limits")
+        parser.config_options.append("pygql-field-costs")
 
     @classmethod
     def parse_options(cls, options):
@@ -37,6 +66,10 @@ class Linter(ImportOrderChecker):
         optdict = dict(
             pygql_introspection_schema=options.pygql_introspection_schema,
             pygql_typedef_schema=options.pygql_typedef_schema,
+            pygql_cache_dir=options.pygql_cache_dir,
+            pygql_no_cache=options.pygql_no_cache,
+            pygql_cost_limits=options.pygql_cost_limits,
+            pygql_field_costs=options.pygql_field_costs,
         )
 
         cls.options = optdict
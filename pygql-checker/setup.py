@@ -30,6 +30,10 @@ setup(
         "pycodestyle"
     ],
 
+    extras_require={
+        "cost": ["pygql"],
+    },
+
     tests_require=[
         "pytest",
         "flake8",
@@ -44,6 +48,9 @@ setup(
         ],
         'pylama.linter': [
             'pygql_checker = pygql_checker.pylama_linter:Linter'
+        ],
+        'console_scripts': [
+            'pygql-checker = pygql_checker.cli:main'
         ]
     },
 
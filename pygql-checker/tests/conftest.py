@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmpdir, monkeypatch):
+    # The checks never read or write the cache of the user
+    cache_dir = str(tmpdir.join('cache'))
+    monkeypatch.setenv('PYGQL_CHECKER_CACHE_DIR', cache_dir)
+    return cache_dir
@@ -0,0 +1,84 @@
+import os
+import shutil
+
+import mock
+
+import pygql_checker
+from pygql_checker import check_file, check_files, load_schema
+from pygql_checker.cache import ResultCache
+
+base_path = os.path.dirname(__file__)
+SCHEMA = os.path.join(base_path, "introspection_schema.json")
+VALIDATION_CASE = os.path.join(base_path, "test_cases", "validation.py")
+
+
+def options(**kwargs):
+    return dict(pygql_introspection_schema=SCHEMA, **kwargs)
+
+
+def copy_case(tmpdir, name="validation.py"):
+    path = str(tmpdir.join(name))
+    shutil.copy(VALIDATION_CASE, path)
+    return path
+
+
+def test_schema_is_built_once_per_process():
+    pygql_checker._schemas.clear()
+    with mock.patch.object(pygql_checker, "build_client_schema",
+                           wraps=pygql_checker.build_client_schema) as build:
+        check_file(VALIDATION_CASE, options(pygql_no_cache=True))
+        check_file(VALIDATION_CASE, options(pygql_no_cache=True))
+
+    assert build.call_count == 1
+    assert load_schema(SCHEMA) is load_schema(SCHEMA)
+
+
+def test_unchanged_files_are_skipped(tmpdir):
+    path = copy_case(tmpdir)
+    errors = check_file(path, options())
+    assert len(errors) == 4
+
+    with mock.patch.object(pygql_checker.ImportVisitor, "visit") as visit:
+        assert check_file(path, options()) == errors
+    assert not visit.called
+
+
+def test_cached_queries_are_not_validated_again(tmpdir):
+    first = copy_case(tmpdir, "first.py")
+    check_file(first, options())
+
+    # Another file with the same queries
+    second = copy_case(tmpdir, "second.py")
+    with open(second, "a") as second_file:
+        second_file.write("\n# Changed\n")
+    with mock.patch.object(pygql_checker, "validate") as validate:
+        errors = check_file(second, options())
+
+    assert not validate.called
+    assert [error[1:] for error in errors] == [
+        error[1:] for error in check_file(first, options())
+    ]
+
+
+def test_cache_is_keyed_by_schema(tmpdir):
+    cache = ResultCache(str(tmpdir))
+    assert cache.key("query", "schema 1", "{ hero }") != cache.key(
+        "query", "schema 2", "{ hero }"
+    )
+
+    cache.set(cache.key("query", "schema 1", "{ hero }"), [["PYGQL101", "x"]])
+    assert cache.get(cache.key("query", "schema 1", "{ hero }")) == [
+        ["PYGQL101", "x"]
+    ]
+    assert cache.get(cache.key("query", "schema 2", "{ hero }")) is None
+
+
+def test_check_files_in_parallel(tmpdir):
+    paths = [copy_case(tmpdir, "case{}.py".format(index)) for index in range(4)]
+
+    errors = check_files(paths, options(pygql_no_cache=True), jobs=2)
+
+    assert errors == check_files(paths, options(pygql_no_cache=True), jobs=1)
+    assert [error[0] for error in errors] == [
+        path for path in paths for _ in range(4)
+    ]
@@ -4,4 +4,4 @@ gql('''
 {
   id
 }
-''') # GQL101: Cannot query field "id" on type "Query".
+''') # PYGQL101: Cannot query field "id" on type "Query".
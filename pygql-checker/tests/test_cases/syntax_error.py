@@ -1,3 +1,3 @@
 from pygql import gql
 
-gql(''' wrong query ''') # GQL100
+gql(''' wrong query ''') # PYGQL100
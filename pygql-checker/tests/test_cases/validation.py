@@ -52,7 +52,7 @@ gql('''
         primaryFunction
       }
     }
-''') # PYGQL101: Cannot query field "primaryFunction" on type "Character". However, this field exists on "Droid". Perhaps you meant to use an inline fragment?
+''') # PYGQL101: Cannot query field "primaryFunction" on type "Character".
 
 gql('''
     query DroidFieldInFragment {
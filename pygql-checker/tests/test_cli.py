@@ -0,0 +1,123 @@
+import json
+import os
+
+from pygql_checker import cli
+
+base_path = os.path.dirname(__file__)
+SCHEMA = os.path.join(base_path, "introspection_schema.json")
+TEST_CASES = os.path.join(base_path, "test_cases")
+
+
+def run(capsys, *args):
+    exit_code = cli.main(["--schema", SCHEMA] + list(args))
+    out, err = capsys.readouterr()
+    return exit_code, out, err
+
+
+def test_find_files(tmpdir):
+    tmpdir.join("module.py").write("")
+    tmpdir.join("README.rst").write("")
+    tmpdir.mkdir("package").join("__init__.py").write("")
+    tmpdir.mkdir(".tox").join("skipped.py").write("")
+
+    filenames = list(cli.find_files([str(tmpdir)], [".tox"]))
+
+    assert [os.path.relpath(name, str(tmpdir)) for name in filenames] == [
+        "module.py", os.path.join("package", "__init__.py")
+    ]
+
+
+def test_text_output(capsys):
+    exit_code, out, err = run(capsys, "--jobs", "2", TEST_CASES)
+
+    assert exit_code == 1
+    lines = out.splitlines()
+    assert lines[0].endswith(
+        'bad_query.py:3:1: PYGQL101 Cannot query field "id" on type "Query".'
+    )
+    assert lines[-1].startswith("6 errors in 9 queries of 4 files")
+
+
+def test_json_output(capsys):
+    exit_code, out, err = run(capsys, "--format", "json", TEST_CASES)
+
+    result = json.loads(out)
+    assert exit_code == 1
+    assert [error["code"] for error in result["results"]] == (
+        ["PYGQL101", "PYGQL100"] + ["PYGQL101"] * 4
+    )
+    assert result["results"][0]["line"] == 3
+    assert result["stats"]["files"] == 4
+    assert result["stats"]["queries"] == 9
+    assert "6 errors" in err
+
+
+def test_sarif_output(capsys, tmpdir):
+    output = str(tmpdir.join("results.sarif"))
+    run(capsys, "--format", "sarif", "--output", output,
+        os.path.join(TEST_CASES, "bad_query.py"))
+
+    with open(output) as output_file:
+        sarif = json.load(output_file)
+    assert sarif["version"] == "2.1.0"
+    run_ = sarif["runs"][0]
+    assert run_["tool"]["driver"]["name"] == "pygql-checker"
+    assert [rule["id"] for rule in run_["tool"]["driver"]["rules"]] == [
+        "PYGQL100", "PYGQL101", "PYGQL102"
+    ]
+    [result] = run_["results"]
+    assert result["ruleId"] == "PYGQL101"
+    location = result["locations"][0]["physicalLocation"]
+    assert location["artifactLocation"]["uri"].endswith("bad_query.py")
+    assert location["region"] == {"startLine": 3, "startColumn": 1}
+    assert run_["invocations"][0]["executionSuccessful"]
+
+
+def test_valid_files(capsys, tmpdir):
+    tmpdir.join("valid.py").write("gql('{ hero { name } }')\n")
+
+    exit_code, out, err = run(capsys, str(tmpdir))
+
+    assert exit_code == 0
+    assert out.startswith("0 errors in 1 queries of 1 files")
+
+
+def test_cached_files(capsys, tmpdir):
+    tmpdir.join("invalid.py").write("gql('{ hero { nickname } }')\n")
+    run(capsys, str(tmpdir))
+
+    exit_code, out, err = run(capsys, str(tmpdir))
+
+    assert exit_code == 1
+    assert "1 errors in 1 queries of 1 files (1 cached)" in out
+
+
+def test_files_that_cannot_be_checked(capsys, tmpdir):
+    tmpdir.join("broken.py").write("gql('{ hero }'\n")
+
+    exit_code, out, err = run(capsys, "--format", "json", str(tmpdir))
+
+    assert exit_code == 2
+    [failure] = json.loads(out)["failures"]
+    assert failure["file"].endswith("broken.py")
+
+
+def test_missing_schema(capsys):
+    exit_code = cli.main(["--schema", "missing.json", TEST_CASES])
+
+    assert exit_code == 2
+    assert "Cannot find the provided introspection schema" in (
+        capsys.readouterr()[1]
+    )
+
+
+def test_invalid_schema(capsys, tmpdir):
+    schema = tmpdir.join("schema.json")
+    schema.write("{")
+
+    exit_code = cli.main(["--schema", str(schema), TEST_CASES])
+
+    out, err = capsys.readouterr()
+    assert exit_code == 2
+    assert not out
+    assert "Cannot load the provided introspection schema" in err
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from pygql_checker import check_file, parse_costs
+from pygql_checker import cli
+
+pytest.importorskip("pygql.cost")
+
+SCHEMA = os.path.join(os.path.dirname(__file__), "introspection_schema.json")
+
+QUERIES = '''from pygql import gql
+
+gql("{ hero { name } }")
+gql("{ hero { friends { friends { friends { name } } } } }")
+gql("{ hero { nickname friends { friends { friends { name } } } } }")
+'''
+
+
+def options(**kwargs):
+    return dict(pygql_introspection_schema=SCHEMA, **kwargs)
+
+
+def test_parse_costs():
+    assert parse_costs("depth=10, nodes=1000") == {"depth": 10, "nodes": 1000}
+    assert parse_costs("") == {}
+    with pytest.raises(Exception):
+        parse_costs("depth")
+
+
+def test_queries_over_the_limits(tmpdir):
+    path = str(tmpdir.join("queries.py"))
+    with open(path, "w") as queries_file:
+        queries_file.write(QUERIES)
+
+    errors = check_file(path, options(pygql_cost_limits="depth=4"))
+
+    # The invalid queries are not analyzed
+    assert [error[1:4] for error in errors] == [
+        (4, 0, "PYGQL102"), (5, 0, "PYGQL101")
+    ]
+    assert errors[0][4] == "The query depth is 5, over the limit of 4."
+
+
+def test_field_costs(tmpdir, capsys):
+    path = str(tmpdir.join("queries.py"))
+    with open(path, "w") as queries_file:
+        queries_file.write(QUERIES)
+
+    exit_code = cli.main([
+        "--schema", SCHEMA, "--cost-limits", "cost=3",
+        "--field-costs", "Character.friends=0", path
+    ])
+
+    assert exit_code == 1
+    assert "4:1: PYGQL102 The query cost is 1001, over the limit of 3." in (
+        capsys.readouterr()[0]
+    )
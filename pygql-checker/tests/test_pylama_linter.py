@@ -39,7 +39,7 @@ def test_expected_error(filename, expected_codes, expected_messages):
     messages = []
 
     options = {
-        "gql_introspection_schema": "./tests/introspection_schema.json"
+        "pygql_introspection_schema": "./tests/introspection_schema.json"
     }
 
     for error in checker.run(filename, **options):
@@ -1,8 +1,14 @@
 import logging
+import threading
 
-from graphql import parse, introspection_query, build_ast_schema, build_client_schema
-from graphql.validation import validate
+from concurrent.futures import ThreadPoolExecutor
+from graphql import parse, build_ast_schema, build_client_schema
 
+from .compact_schema import load_schema
+from .cost import LIMITS, CostAnalyzer
+from .schema_cache import fetch_introspection
+from .schema_poller import SchemaPoller, changed_types, introspection_hash, type_hashes
+from .validation import ValidationCache, ValidationError, get_rules, validate_document
 from .transport.local_schema import LocalSchemaTransport
 from .transport.batch_transport import BatchTransport
 
@@ -19,39 +25,220 @@ class RetryError(Exception):
 
 class Client(object):
     def __init__(self, schema=None, introspection=None, type_def=None, transport=None,
-                 fetch_schema_from_transport=False, retries=0):
+                 fetch_schema_from_transport=False, retries=0, max_workers=10, schema_cache=None,
+                 lazy_schema=False, warm_schema=False, compact_schema=None, validation_cache_size=1024,
+                 poll_schema_interval=None, validation_rules='all', collect_validation_errors=False,
+                 trusted_documents=(), cost_limits=None, field_costs=None):
         assert not(type_def and introspection), 'Cant provide introspection type definition at the same time'
+        if compact_schema:
+            assert not (schema or introspection or type_def or fetch_schema_from_transport), \
+                'Cant provide a compact schema and another schema at the same time'
+        assert not cost_limits or set(cost_limits) <= set(LIMITS), \
+            'The cost limits can only be: {}'.format(', '.join(LIMITS))
         if transport and fetch_schema_from_transport:
             assert not schema, 'Cant fetch the schema from transport if is already provided'
-            introspection = transport.execute(parse(introspection_query)).data
         if introspection:
             assert not schema, 'Cant provide introspection and schema at the same time'
-            schema = build_client_schema(introspection)
         elif type_def:
             assert not schema, 'Cant provide Type definition and schema at the same time'
-            type_def_ast = parse(type_def)
-            schema = build_ast_schema(type_def_ast)
         elif schema and not transport:
             transport = LocalSchemaTransport(schema)
 
-        self.schema = schema
-        self.introspection = introspection
         self.transport = transport
         self.retries = retries
+        self.max_workers = max_workers
+        self.schema_cache = schema_cache
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self.schema_refresh = None
+        self.schema_warmup = None
+        self.validation_cache = ValidationCache(validation_cache_size) if validation_cache_size else None
+        self.fragment_cache = ValidationCache(validation_cache_size) if validation_cache_size else None
+        self.schema_poller = None
+        # The validation caches don't depend on the rules, so they can't change per call
+        self.validation_rules = get_rules(validation_rules)
+        self.collect_validation_errors = collect_validation_errors
+        self.trusted_documents = set(trusted_documents)
+        self.cost_limits = cost_limits
+        self.field_costs = field_costs
+
+        # The schema is built by _load_schema, when created or on its first use if lazy
+        self._schema = schema
+        self._introspection = introspection
+        self._type_def = type_def
+        self._compact_schema = compact_schema
+        self._fetch_schema = bool(transport and fetch_schema_from_transport)
+        self._schema_loaded = not (self._fetch_schema or introspection or type_def or compact_schema)
+        self._schema_lock = threading.Lock()
+        self._schema_hashes = None
+        if not lazy_schema:
+            self._load_schema()
+        elif warm_schema:
+            self.schema_warmup = threading.Thread(target=self._warm_schema, name='pygql-schema-warmup')
+            self.schema_warmup.daemon = True
+            self.schema_warmup.start()
+        if poll_schema_interval and self._fetch_schema:
+            self.schema_poller = SchemaPoller(self, poll_schema_interval).start()
+
+    @property
+    def schema(self):
+        self._load_schema()
+        return self._schema
+
+    @schema.setter
+    def schema(self, schema):
+        with self._schema_lock:
+            self._schema = schema
+            self._schema_loaded = True
+
+    @property
+    def introspection(self):
+        self._load_schema()
+        return self._introspection
+
+    def _load_schema(self):
+        if self._schema_loaded:
+            return
+
+        stale = False
+        with self._schema_lock:
+            if self._schema_loaded:
+                return
+            introspection = self._introspection
+            if self._fetch_schema:
+                if self.schema_cache:
+                    introspection, stale = self.schema_cache.get_introspection(self.transport)
+                else:
+                    introspection = fetch_introspection(self.transport)
+            if introspection:
+                schema = build_client_schema(introspection)
+            elif self._compact_schema:
+                schema = load_schema(self._compact_schema)
+            else:
+                schema = build_ast_schema(parse(self._type_def))
+            self._schema = schema
+            self._introspection = introspection
+            self._schema_loaded = True
+
+        if stale:
+            self.schema_refresh = self.schema_cache.refresh_in_background(self.transport, self.update_schema)
+
+    def _warm_schema(self):
+        try:
+            self._load_schema()
+        except Exception:
+            # It's loaded again, raising the error, on its first use
+            log.warning('Could not load the schema in the background', exc_info=True)
+
+    def update_schema(self, introspection):
+        """
+        Replace the schema with the one of the introspection, if it changed,
+        and forget the validations of the documents using the changed types.
+
+        Return the names of the changed types, None if the whole schema changed.
+        """
+        current = self.introspection
+        new_hash = introspection_hash(introspection)
+        if self._schema_hashes is None and current is not None:
+            self._schema_hashes = introspection_hash(current), type_hashes(current)
+        if self._schema_hashes is not None and self._schema_hashes[0] == new_hash:
+            return set()
+
+        new_type_hashes = type_hashes(introspection)
+        changed = changed_types(self._schema_hashes[1], new_type_hashes) if self._schema_hashes else None
+        schema = build_client_schema(introspection)
+        with self._schema_lock:
+            self._schema = schema
+            self._introspection = introspection
+            self._schema_hashes = new_hash, new_type_hashes
+            self._schema_loaded = True
+
+        if self.validation_cache is not None:
+            self.validation_cache.invalidate(changed)
+            self.fragment_cache.invalidate(changed)
+        return changed
 
     def validate(self, document):
-        if not self.schema:
+        # The generation is read before the schema, so validations of a replaced schema are not cached
+        cache = self.validation_cache
+        generation = cache.generation if cache is not None else None
+        fragment_generation = self.fragment_cache.generation if cache is not None else None
+        schema = self.schema
+        if not schema:
             raise Exception("Cannot validate locally the document, you need to pass a schema.")
-        validation_errors = validate(self.schema, document)
+
+        validation_errors = cache.get(document) if cache is not None else None
+        if validation_errors is None:
+            validation_errors, type_names = validate_document(
+                schema, document, self.validation_rules, fragment_cache=self.fragment_cache,
+                generation=fragment_generation
+            )
+            if cache is not None:
+                cache.put(document, validation_errors, type_names, generation)
         if validation_errors:
+            if self.collect_validation_errors:
+                raise ValidationError(validation_errors)
             raise validation_errors[0]
 
+    def analyze_cost(self, document, variable_values=None):
+        """
+        Return the estimated QueryCost of the document for the client schema.
+        """
+        return CostAnalyzer(self.schema, self.field_costs).analyze(document, variable_values)
+
+    def check_cost(self, document, variable_values=None):
+        # The cost can't be estimated without a schema, the limits are ignored then
+        if self.cost_limits and self.schema:
+            CostAnalyzer(self.schema, self.field_costs).check(document, self.cost_limits, variable_values)
+
+    def trust(self, *documents):
+        """
+        Don't validate the documents anymore, e.g. if validated when building.
+        """
+        self.trusted_documents.update(documents)
+
+    def _needs_validation(self, document, skip_validation=False):
+        # The schema is checked last, so skipping the validation doesn't load a lazy schema
+        return not skip_validation and self.validation_rules and document not in self.trusted_documents and \
+            bool(self.schema)
+
     def execute(self, document, *args, **kwargs):
-        if self.schema:
+        """
+        Execute the document, validated first if there is a schema unless the
+        document is trusted or ``skip_validation=True`` is given.
+        """
+        if self._needs_validation(document, kwargs.pop('skip_validation', False)):
             self.validate(document)
+        self.check_cost(document, kwargs.get('variable_values', args[0] if args else None))
 
         result = self._get_result(document, *args, **kwargs)
+        return self._process_result(result)
 
+    def subscribe(self, document, *args, **kwargs):
+        """
+        Start a subscription, validated like in execute, and return the
+        ResultStream of its ExecutionResults, iterated as they arrive.
+        """
+        assert hasattr(self.transport, 'subscribe'), 'The transport does not support subscriptions'
+        if self._needs_validation(document, kwargs.pop('skip_validation', False)):
+            self.validate(document)
+        self.check_cost(document, kwargs.get('variable_values', args[0] if args else None))
+        return self.transport.subscribe(document, *args, **kwargs)
+
+    def execute_incremental(self, document, *args, **kwargs):
+        """
+        Execute a document using @defer or @stream, validated like in execute,
+        and return an iterator of the IncrementalResults merged so far, see
+        pygql.incremental. The errors are in the results, not raised.
+        """
+        assert hasattr(self.transport, 'execute_incremental'), \
+            'The transport does not support the incremental delivery'
+        if self._needs_validation(document, kwargs.pop('skip_validation', False)):
+            self.validate(document)
+        self.check_cost(document, kwargs.get('variable_values', args[0] if args else None))
+        return self.transport.execute_incremental(document, *args, **kwargs)
+
+    def _process_result(self, result):
         if isinstance(self.transport, BatchTransport):
             return result
 
@@ -60,15 +247,110 @@ class Client(object):
 
         return result.data
 
+    def execute_many(self, queries, return_exceptions=False):
+        """
+        Execute independent documents concurrently and return their results in order.
+
+        All the calls share the client thread pool, so at most ``max_workers``
+        requests are in flight for this client at any time.
+
+        :param queries: Iterable of documents or (document, variable_values) pairs
+        :param return_exceptions: Put the exception raised by a query in its slot of the
+            results instead of raising the first one
+        """
+        requests = [query if isinstance(query, (tuple, list)) else (query, None) for query in queries]
+        if hasattr(self.transport, 'execute_many'):
+            return self._execute_combined(requests, return_exceptions)
+
+        executor = self._get_executor()
+        futures = []
+        for document, variable_values in requests:
+            futures.append(executor.submit(self.execute, document, variable_values=variable_values))
+
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                if not return_exceptions:
+                    for pending in futures:
+                        pending.cancel()
+                    raise
+                results.append(e)
+        return results
+
+    def _execute_combined(self, requests, return_exceptions):
+        # The transport sends all the queries at once (e.g. MergingTransport)
+        results = [None] * len(requests)
+        pending = []
+        for index, (document, variable_values) in enumerate(requests):
+            try:
+                if self._needs_validation(document):
+                    self.validate(document)
+                self.check_cost(document, variable_values)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results[index] = e
+            else:
+                pending.append(index)
+
+        try:
+            transport_results = self._retry(self.transport.execute_many, [requests[index] for index in pending])
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            transport_results = [e] * len(pending)
+        for index, result in zip(pending, transport_results):
+            if isinstance(result, Exception):
+                results[index] = result
+                continue
+            try:
+                results[index] = self._process_result(result)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results[index] = e
+        return results
+
+    def close(self):
+        """
+        Stop the schema poller and the thread pool of execute_many, and close the transport.
+        """
+        if self.schema_poller is not None:
+            self.schema_poller.stop()
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+        if hasattr(self.transport, 'close'):
+            self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
     def _get_result(self, document, *args, **kwargs):
+        return self._retry(self.transport.execute, document, *args, **kwargs)
+
+    def _retry(self, send, *args, **kwargs):
         if not self.retries:
-            return self.transport.execute(document, *args, **kwargs)
+            return send(*args, **kwargs)
 
         last_exception = None
         retries_count = 0
         while retries_count < self.retries:
             try:
-                result = self.transport.execute(document, *args, **kwargs)
+                result = send(*args, **kwargs)
                 return result
             except Exception as e:
                 last_exception = e
@@ -0,0 +1,250 @@
+"""
+Compact precompiled schemas, much faster to load than building a GraphQLSchema
+from an introspection or a type definition.
+
+The schema is stored as marshaled tuples with the default values already
+coerced, and the fields of every type are only built the first time they are
+used, so loading a schema doesn't depend on its number of fields.
+
+Create them from an introspection file with:
+
+    python -m pygql.compact_schema introspection.json schema.gqlc
+"""
+import argparse
+import json
+import marshal
+import sys
+from collections import defaultdict
+
+from graphql import build_client_schema
+from graphql.pyutils.ordereddict import OrderedDict
+from graphql.type import (GraphQLArgument, GraphQLBoolean, GraphQLEnumType, GraphQLEnumValue, GraphQLField,
+                          GraphQLFloat, GraphQLID, GraphQLInputObjectField, GraphQLInputObjectType, GraphQLInt,
+                          GraphQLInterfaceType, GraphQLList, GraphQLNonNull, GraphQLObjectType, GraphQLScalarType,
+                          GraphQLSchema, GraphQLString, GraphQLUnionType)
+from graphql.type.directives import GraphQLDirective
+from graphql.type.introspection import IntrospectionSchema
+from graphql.type.typemap import GraphQLTypeMap
+from graphql.utils.build_client_schema import _false, _none, no_execution
+
+MAGIC = b'PYGQLSCHEMA'
+FORMAT_VERSION = 1
+
+SCALAR, OBJECT, INTERFACE, UNION, ENUM, INPUT_OBJECT = range(6)
+
+
+class CompactSchemaError(Exception):
+    pass
+
+
+def _collect_builtin_types():
+    # The types every schema shares with graphql-core, they are stored by name
+    types = dict(GraphQLTypeMap([IntrospectionSchema]))
+    for scalar in (GraphQLBoolean, GraphQLFloat, GraphQLID, GraphQLInt, GraphQLString):
+        types[scalar.name] = scalar
+    return types
+
+
+BUILTIN_TYPES = _collect_builtin_types()
+
+
+def _plain(value):
+    # Default values are stored without the OrderedDicts of graphql-core
+    if isinstance(value, dict):
+        return dict((key, _plain(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    return value
+
+
+def _dump_input_values(values):
+    return tuple(
+        (name, str(value.type), _plain(value.default_value), value.description)
+        for name, value in values.items()
+    )
+
+
+def _dump_fields(fields):
+    return tuple(
+        (name, str(field.type), _dump_input_values(field.args), field.description, field.deprecation_reason)
+        for name, field in fields.items()
+    )
+
+
+def _dump_type(type):
+    if isinstance(type, GraphQLObjectType):
+        return (OBJECT, type.name, type.description, tuple(i.name for i in type.interfaces), _dump_fields(type.fields))
+    if isinstance(type, GraphQLInterfaceType):
+        return (INTERFACE, type.name, type.description, _dump_fields(type.fields))
+    if isinstance(type, GraphQLUnionType):
+        return (UNION, type.name, type.description, tuple(t.name for t in type.types))
+    if isinstance(type, GraphQLEnumType):
+        return (ENUM, type.name, type.description, tuple(
+            (value.name, value.value, value.description, value.deprecation_reason) for value in type.values
+        ))
+    if isinstance(type, GraphQLInputObjectType):
+        return (INPUT_OBJECT, type.name, type.description, _dump_input_values(type.fields))
+    return (SCALAR, type.name, type.description)
+
+
+def dumps_schema(schema):
+    """
+    Serialize a schema to the compact format.
+
+    Only the type system is kept: resolvers, custom scalar coercion and type
+    resolution are replaced by the ones of build_client_schema, as in any
+    schema built from an introspection.
+    """
+    types = tuple(
+        _dump_type(type) for name, type in schema.get_type_map().items()
+        if BUILTIN_TYPES.get(name) is not type
+    )
+    directives = tuple(
+        (directive.name, directive.description, tuple(directive.locations), _dump_input_values(directive.args or {}))
+        for directive in schema.get_directives()
+    )
+    root_types = tuple(
+        root.name if root else None
+        for root in (schema.get_query_type(), schema.get_mutation_type(), schema.get_subscription_type())
+    )
+    try:
+        payload = marshal.dumps((FORMAT_VERSION, tuple(schema.get_type_map()), root_types, types, directives), 2)
+    except ValueError as e:
+        raise CompactSchemaError('The schema has values that can not be serialized: {}'.format(e))
+    return MAGIC + payload
+
+
+class _SchemaLoader(object):
+    def __init__(self, types):
+        self.types = dict(BUILTIN_TYPES)
+        self.definitions = types
+
+    def get_type(self, ref):
+        if ref.endswith('!'):
+            return GraphQLNonNull(self.get_type(ref[:-1]))
+        if ref.startswith('['):
+            return GraphQLList(self.get_type(ref[1:-1]))
+        return self.types[ref]
+
+    def input_values(self, values, value_class):
+        return OrderedDict(
+            (name, value_class(self.get_type(ref), default_value=default_value, description=description))
+            for name, ref, default_value, description in values
+        )
+
+    def fields(self, fields):
+        return OrderedDict(
+            (name, GraphQLField(
+                self.get_type(ref),
+                args=self.input_values(args, GraphQLArgument),
+                resolver=no_execution,
+                deprecation_reason=deprecation_reason,
+                description=description
+            ))
+            for name, ref, args, description, deprecation_reason in fields
+        )
+
+    def build_type(self, definition):
+        kind, name, description = definition[:3]
+        if kind == OBJECT:
+            interfaces, fields = definition[3:]
+            return GraphQLObjectType(
+                name,
+                fields=lambda: self.fields(fields),
+                interfaces=lambda: [self.types[interface] for interface in interfaces],
+                description=description
+            )
+        if kind == INTERFACE:
+            fields = definition[3]
+            return GraphQLInterfaceType(
+                name, fields=lambda: self.fields(fields), resolve_type=no_execution, description=description
+            )
+        if kind == UNION:
+            types = definition[3]
+            return GraphQLUnionType(
+                name, types=lambda: [self.types[type] for type in types], resolve_type=no_execution,
+                description=description
+            )
+        if kind == ENUM:
+            values = OrderedDict(
+                (value_name, GraphQLEnumValue(value, deprecation_reason=reason, description=value_description))
+                for value_name, value, value_description, reason in definition[3]
+            )
+            return GraphQLEnumType(name, values=values, description=description)
+        if kind == INPUT_OBJECT:
+            fields = definition[3]
+            return GraphQLInputObjectType(
+                name, fields=lambda: self.input_values(fields, GraphQLInputObjectField), description=description
+            )
+        return GraphQLScalarType(name, serialize=_none, parse_value=_false, parse_literal=_false,
+                                 description=description)
+
+    def build(self, type_names, root_types, directives):
+        for definition in self.definitions:
+            self.types[definition[1]] = self.build_type(definition)
+
+        # The type map is filled directly, as the schema was already checked when serialized
+        type_map = GraphQLTypeMap.__new__(GraphQLTypeMap)
+        OrderedDict.__init__(type_map)
+        type_map.update((name, self.types[name]) for name in type_names)
+        type_map._possible_type_map = defaultdict(set)
+        type_map._implementations = {}
+        for definition in self.definitions:
+            if definition[0] == OBJECT:
+                for interface in definition[3]:
+                    type_map._implementations.setdefault(interface, []).append(self.types[definition[1]])
+
+        schema = GraphQLSchema.__new__(GraphQLSchema)
+        schema._query, schema._mutation, schema._subscription = (
+            self.types[name] if name else None for name in root_types
+        )
+        schema._directives = [
+            GraphQLDirective(name, description=description, locations=list(locations),
+                             args=self.input_values(args, GraphQLArgument))
+            for name, description, locations, args in directives
+        ]
+        schema._type_map = type_map
+        return schema
+
+
+def loads_schema(data):
+    """
+    Return the GraphQLSchema serialized with dumps_schema.
+    """
+    if not data.startswith(MAGIC):
+        raise CompactSchemaError('Not a compact schema.')
+    try:
+        format_version, type_names, root_types, types, directives = marshal.loads(data[len(MAGIC):])
+    except (ValueError, EOFError, TypeError) as e:
+        raise CompactSchemaError('Invalid compact schema: {}'.format(e))
+    if format_version != FORMAT_VERSION:
+        raise CompactSchemaError('Unsupported compact schema version {}.'.format(format_version))
+    return _SchemaLoader(types).build(type_names, root_types, directives)
+
+
+def dump_schema(schema, path):
+    with open(path, 'wb') as schema_file:
+        schema_file.write(dumps_schema(schema))
+
+
+def load_schema(path):
+    with open(path, 'rb') as schema_file:
+        return loads_schema(schema_file.read())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Precompile a GraphQL introspection into a compact schema.')
+    parser.add_argument('introspection', help='JSON file with the result of the introspection query')
+    parser.add_argument('output', help='Path of the compact schema')
+    args = parser.parse_args(argv)
+
+    with open(args.introspection) as introspection_file:
+        introspection = json.load(introspection_file)
+    # Accept both the introspection data and the whole response
+    introspection = introspection.get('data', introspection)
+    dump_schema(build_client_schema(introspection), args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,443 @@
+import collections
+import logging
+import sys
+import threading
+
+import six
+from graphql.error import GraphQLError, GraphQLLocatedError
+from graphql.execution import ExecutionResult
+from graphql.execution.base import (ExecutionContext, ResolveInfo, collect_fields, default_resolve_fn,
+                                    get_field_def, get_operation_root_type)
+from graphql.execution.executor import execute_fields_serially, get_default_resolve_type_fn
+from graphql.execution.executors.sync import SyncExecutor
+from graphql.execution.middleware import MiddlewareManager
+from graphql.execution.values import get_argument_values, get_variable_values
+from graphql.language import ast
+from graphql.pyutils.default_ordered_dict import DefaultOrderedDict
+from graphql.pyutils.ordereddict import OrderedDict
+from graphql.type import (GraphQLEnumType, GraphQLInterfaceType, GraphQLList, GraphQLNonNull, GraphQLObjectType,
+                          GraphQLScalarType, GraphQLUnionType)
+from promise import Promise, is_thenable, promise_for_dict
+
+log = logging.getLogger(__name__)
+
+try:
+    Iterable = collections.abc.Iterable
+except AttributeError:
+    Iterable = collections.Iterable
+
+# Values of these types are never promises nor errors, so they skip those checks
+PLAIN_TYPES = frozenset(six.string_types + six.integer_types + (float, bool, type(None), list, tuple, dict))
+
+
+def contains_variable(value):
+    if isinstance(value, ast.Variable):
+        return True
+    if isinstance(value, ast.ListValue):
+        return any(contains_variable(item) for item in value.values)
+    if isinstance(value, ast.ObjectValue):
+        return any(contains_variable(field.value) for field in value.fields)
+    return False
+
+
+def arguments_contain_variable(arguments):
+    return any(contains_variable(argument.value) for argument in arguments or [])
+
+
+class FieldPlan(object):
+    """
+    Everything needed to resolve a field that doesn't change between executions:
+    its definition, resolver, arguments (unless they use variables) and the
+    function completing its values, specialized for its return type.
+    """
+    __slots__ = ('response_name', 'field_name', 'field_asts', 'field_def', 'parent_type', 'return_type',
+                 'resolve_fn', 'args', 'complete')
+
+    def __init__(self, compiled, response_name, field_asts, field_def, parent_type):
+        field_ast = field_asts[0]
+        self.response_name = response_name
+        self.field_name = field_ast.name.value
+        self.field_asts = field_asts
+        self.field_def = field_def
+        self.parent_type = parent_type
+        self.return_type = field_def.type
+        self.resolve_fn = field_def.resolver or default_resolve_fn
+        self.args = None
+        if field_ast not in compiled.dynamic_arguments:
+            self.args = get_argument_values(field_def.args, field_ast.arguments, {})
+        self.complete = compile_complete_catching_error(compiled, self.return_type, field_asts)
+
+    def resolve(self, context, source):
+        info = context.get_info(self)
+        args = self.args
+        if args is None:
+            args = context.get_argument_values(self.field_def, self.field_asts[0])
+        resolve_fn = self.resolve_fn
+        if context.middleware:
+            resolve_fn = context.get_field_resolver(resolve_fn)
+
+        try:
+            result = context.executor.execute(resolve_fn, source, args, context.context_value, info)
+        except Exception as e:
+            log.exception("An error occurred while resolving field %s.%s", self.parent_type.name, self.field_name)
+            e.stack = sys.exc_info()[2]
+            result = e
+        return self.complete(context, info, result)
+
+
+def execute_plans(context, source, plans):
+    results = OrderedDict()
+    contains_promise = False
+    for plan in plans:
+        result = plan.resolve(context, source)
+        results[plan.response_name] = result
+        if isinstance(result, Promise):
+            contains_promise = True
+
+    if contains_promise:
+        return promise_for_dict(results)
+    return results
+
+
+def compile_complete_catching_error(compiled, return_type, field_asts):
+    complete = compile_complete(compiled, return_type, field_asts)
+    # Errors in non-nullable fields propagate to the parent field
+    if isinstance(return_type, GraphQLNonNull):
+        return complete
+
+    def complete_catching_error(context, info, result):
+        try:
+            completed = complete(context, info, result)
+        except Exception as e:
+            context.errors.append(e)
+            return None
+
+        if isinstance(completed, Promise):
+            def handle_error(error):
+                context.errors.append(error)
+                return None
+
+            return completed.catch(handle_error)
+        return completed
+
+    return complete_catching_error
+
+
+def compile_complete(compiled, return_type, field_asts):
+    """
+    Return a function completing the resolved values of return_type, with the
+    type checks of graphql.execution.executor.complete_value done ahead of time.
+    """
+    if isinstance(return_type, GraphQLNonNull):
+        complete_type = compile_complete_nonnull(compiled, return_type, field_asts)
+    elif isinstance(return_type, GraphQLList):
+        complete_type = compile_complete_list(compiled, return_type, field_asts)
+    elif isinstance(return_type, (GraphQLScalarType, GraphQLEnumType)):
+        serialize = return_type.serialize
+
+        def complete_type(context, info, result):
+            if result is None:
+                return None
+            return serialize(result)
+    elif isinstance(return_type, (GraphQLInterfaceType, GraphQLUnionType)):
+        complete_type = compile_complete_abstract(compiled, return_type, field_asts)
+    elif isinstance(return_type, GraphQLObjectType):
+        def complete_type(context, info, result):
+            if result is None:
+                return None
+            return complete_object(compiled, return_type, field_asts, context, info, result)
+    else:
+        raise AssertionError(u'Cannot complete value of unexpected type "{}".'.format(return_type))
+
+    def complete(context, info, result):
+        if type(result) not in PLAIN_TYPES:
+            if is_thenable(result):
+                return Promise.resolve(result).then(
+                    lambda resolved: complete(context, info, resolved),
+                    lambda error: Promise.rejected(GraphQLLocatedError(field_asts, original_error=error))
+                )
+            if isinstance(result, Exception):
+                raise GraphQLLocatedError(field_asts, original_error=result)
+        return complete_type(context, info, result)
+
+    return complete
+
+
+def compile_complete_nonnull(compiled, return_type, field_asts):
+    complete_inner = compile_complete(compiled, return_type.of_type, field_asts)
+
+    def complete_nonnull(context, info, result):
+        completed = complete_inner(context, info, result)
+        if completed is None:
+            raise GraphQLError(
+                'Cannot return null for non-nullable field {}.{}.'.format(info.parent_type, info.field_name),
+                field_asts
+            )
+        return completed
+
+    return complete_nonnull
+
+
+def compile_complete_list(compiled, return_type, field_asts):
+    complete_item = compile_complete_catching_error(compiled, return_type.of_type, field_asts)
+
+    def complete_list(context, info, result):
+        if result is None:
+            return None
+        assert isinstance(result, Iterable), \
+            ('User Error: expected iterable, but did not find one ' +
+             'for field {}.{}.').format(info.parent_type, info.field_name)
+
+        completed_results = []
+        contains_promise = False
+        for item in result:
+            completed_item = complete_item(context, info, item)
+            if isinstance(completed_item, Promise):
+                contains_promise = True
+            completed_results.append(completed_item)
+
+        return Promise.all(completed_results) if contains_promise else completed_results
+
+    return complete_list
+
+
+def compile_complete_abstract(compiled, return_type, field_asts):
+    def complete_abstract(context, info, result):
+        if result is None:
+            return None
+        if return_type.resolve_type:
+            runtime_type = return_type.resolve_type(result, context.context_value, info)
+        else:
+            runtime_type = get_default_resolve_type_fn(result, context.context_value, info, return_type)
+
+        if isinstance(runtime_type, six.string_types):
+            runtime_type = info.schema.get_type(runtime_type)
+
+        if not isinstance(runtime_type, GraphQLObjectType):
+            raise GraphQLError(
+                ('Abstract type {} must resolve to an Object type at runtime ' +
+                 'for field {}.{} with value "{}", received "{}".').format(
+                     return_type,
+                     info.parent_type,
+                     info.field_name,
+                     result,
+                     runtime_type,
+                ),
+                field_asts
+            )
+
+        if not context.schema.is_possible_type(return_type, runtime_type):
+            raise GraphQLError(
+                u'Runtime Object type "{}" is not a possible type for "{}".'.format(runtime_type, return_type),
+                field_asts
+            )
+
+        return complete_object(compiled, runtime_type, field_asts, context, info, result)
+
+    return complete_abstract
+
+
+def complete_object(compiled, object_type, field_asts, context, info, result):
+    if object_type.is_type_of and not object_type.is_type_of(result, context.context_value, info):
+        raise GraphQLError(
+            u'Expected value of type "{}" but got: {}.'.format(object_type, type(result).__name__),
+            field_asts
+        )
+    return execute_plans(context, result, compiled.get_field_plans(context, object_type, field_asts))
+
+
+class CompiledQuery(object):
+    """
+    Execution plan of a document: its operation, fragments and the FieldPlan
+    of every selection, computed in the first execution and reused later.
+
+    If @skip or @include use variables, the fields to execute are collected
+    in every execution, while their FieldPlans are still reused.
+    """
+
+    def __init__(self, schema, document, operation_name=None):
+        operation = None
+        fragments = {}
+        for definition in document.definitions:
+            if isinstance(definition, ast.OperationDefinition):
+                if not operation_name and operation:
+                    raise GraphQLError('Must provide operation name if query contains multiple operations.')
+                if not operation_name or definition.name and definition.name.value == operation_name:
+                    operation = definition
+            elif isinstance(definition, ast.FragmentDefinition):
+                fragments[definition.name.value] = definition
+            else:
+                raise GraphQLError(
+                    u'GraphQL cannot execute a request containing a {}.'.format(definition.__class__.__name__),
+                    definition
+                )
+
+        if not operation:
+            if operation_name:
+                raise GraphQLError(u'Unknown operation named "{}".'.format(operation_name))
+            raise GraphQLError('Must provide an operation.')
+
+        self.schema = schema
+        self.document = document
+        self.operation = operation
+        self.fragments = fragments
+        self.root_type = get_operation_root_type(schema, operation)
+        self.serial = operation.operation == 'mutation'
+
+        self.dynamic_arguments = set()
+        self.static_fields = True
+        for definition in document.definitions:
+            self._find_variables(definition.selection_set)
+
+        self.subfields_cache = {}
+        self.field_plans = {}
+        self.selection_plans = {}
+
+    def _find_variables(self, selection_set):
+        if not selection_set:
+            return
+        for selection in selection_set.selections:
+            if any(arguments_contain_variable(directive.arguments) for directive in selection.directives or []):
+                self.static_fields = False
+            if isinstance(selection, ast.Field) and arguments_contain_variable(selection.arguments):
+                self.dynamic_arguments.add(selection)
+            self._find_variables(getattr(selection, 'selection_set', None))
+
+    def get_field_plans(self, context, parent_type, field_asts):
+        key = parent_type, tuple(field_asts)
+        if self.static_fields:
+            plans = self.selection_plans.get(key)
+            if plans is not None:
+                return plans
+
+        plans = []
+        for response_name, subfield_asts in context.get_sub_fields(parent_type, field_asts).items():
+            field_key = parent_type, response_name, tuple(subfield_asts)
+            plan = self.field_plans.get(field_key)
+            if plan is None:
+                field_def = get_field_def(self.schema, parent_type, subfield_asts[0].name.value)
+                if not field_def:
+                    continue
+                plan = self.field_plans[field_key] = FieldPlan(
+                    self, response_name, subfield_asts, field_def, parent_type
+                )
+            plans.append(plan)
+
+        if self.static_fields:
+            self.selection_plans[key] = plans
+        return plans
+
+
+class CompiledExecutionContext(ExecutionContext):
+    __slots__ = 'compiled', 'infos'
+
+    def __init__(self, compiled, root_value, context_value, variable_values, executor, middleware):
+        # The operation and fragments come from the plan instead of walking the document again
+        self.compiled = compiled
+        self.schema = compiled.schema
+        self.fragments = compiled.fragments
+        self.root_value = root_value
+        self.operation = compiled.operation
+        self.variable_values = get_variable_values(
+            compiled.schema,
+            compiled.operation.variable_definitions or [],
+            variable_values
+        )
+        self.errors = []
+        self.context_value = context_value
+        self.argument_values_cache = {}
+        self.executor = executor
+        self.middleware = middleware
+        self._subfields_cache = compiled.subfields_cache if compiled.static_fields else {}
+        self.infos = {}
+
+    def get_info(self, plan):
+        # A single ResolveInfo per field and execution, instead of one per resolved value
+        info = self.infos.get(plan)
+        if info is None:
+            info = self.infos[plan] = ResolveInfo(
+                plan.field_name,
+                plan.field_asts,
+                plan.return_type,
+                plan.parent_type,
+                schema=self.schema,
+                fragments=self.fragments,
+                root_value=self.root_value,
+                operation=self.operation,
+                variable_values=self.variable_values,
+            )
+        return info
+
+
+class CompiledQueryCache(object):
+    def __init__(self, maxsize=128):
+        """
+        Least recently used cache of the plans of the executed documents.
+        The documents are compared by identity, so reuse the parsed documents to benefit from it.
+
+        :param maxsize: Maximum number of plans kept
+        """
+        self.maxsize = maxsize
+        self.plans = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, schema, document, operation_name=None):
+        key = schema, document, operation_name
+        with self.lock:
+            compiled = self.plans.pop(key, None)
+            if compiled is not None:
+                self.plans[key] = compiled
+                return compiled
+
+        compiled = CompiledQuery(schema, document, operation_name)
+        with self.lock:
+            self.plans[key] = compiled
+            while len(self.plans) > self.maxsize:
+                self.plans.popitem(last=False)
+        return compiled
+
+
+def execute_compiled(schema, document_ast, root_value=None, context_value=None,
+                     variable_values=None, operation_name=None, executor=None,
+                     return_promise=False, middleware=None, cache=None):
+    """
+    Same as graphql.execution.execute, but resolving the fields with the
+    execution plan of the document stored in the cache (a CompiledQueryCache).
+    """
+    if middleware and not isinstance(middleware, MiddlewareManager):
+        middleware = MiddlewareManager(*middleware)
+
+    if executor is None:
+        executor = SyncExecutor()
+
+    if cache is None:
+        compiled = CompiledQuery(schema, document_ast, operation_name)
+    else:
+        compiled = cache.get(schema, document_ast, operation_name)
+
+    context = CompiledExecutionContext(compiled, root_value, context_value, variable_values, executor, middleware)
+
+    def promise_executor(resolve, reject):
+        if compiled.serial:
+            # Mutations are rare and run their root fields in order, they use the graphql-core executor
+            fields = collect_fields(
+                context, compiled.root_type, compiled.operation.selection_set, DefaultOrderedDict(list), set()
+            )
+            return resolve(execute_fields_serially(context, compiled.root_type, root_value, fields))
+        plans = compiled.get_field_plans(context, compiled.root_type, [compiled.operation])
+        return resolve(execute_plans(context, root_value, plans))
+
+    def on_rejected(error):
+        context.errors.append(error)
+        return None
+
+    def on_resolve(data):
+        if not context.errors:
+            return ExecutionResult(data=data)
+        return ExecutionResult(data=data, errors=context.errors)
+
+    promise = Promise(promise_executor).catch(on_rejected).then(on_resolve)
+    if return_promise:
+        return promise
+    context.executor.wait_until_finished()
+    return promise.get()
@@ -0,0 +1,193 @@
+"""
+Static cost analysis of the documents, to refuse the queries too expensive
+for the server before sending them.
+"""
+from graphql.execution.base import get_field_def
+from graphql.language import ast
+from graphql.type import GraphQLInterfaceType, GraphQLList, GraphQLNonNull, GraphQLObjectType, get_named_type
+
+# Arguments limiting the number of items of a list field
+LIST_SIZE_ARGUMENTS = ('first', 'last')
+
+LIMITS = ('depth', 'breadth', 'nodes', 'cost')
+
+
+class QueryCost(object):
+    __slots__ = 'depth', 'breadth', 'nodes', 'cost'
+
+    def __init__(self, depth=0, breadth=0, nodes=0, cost=0):
+        """
+        Estimated size of the result of a query.
+
+        :param depth: Maximum number of nested fields
+        :param breadth: Maximum number of fields selected in one object
+        :param nodes: Number of values in the result, counting the items of the lists
+        :param cost: Sum of the costs of the fields of all the values
+        """
+        self.depth = depth
+        self.breadth = breadth
+        self.nodes = nodes
+        self.cost = cost
+
+    def __eq__(self, other):
+        return isinstance(other, QueryCost) and all(getattr(self, name) == getattr(other, name) for name in LIMITS)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'QueryCost({})'.format(', '.join('{}={}'.format(name, getattr(self, name)) for name in LIMITS))
+
+    def max(self, other):
+        return QueryCost(*(max(getattr(self, name), getattr(other, name)) for name in LIMITS))
+
+
+class QueryCostError(Exception):
+    """The estimated cost of a query is over a limit"""
+    def __init__(self, name, value, limit, cost):
+        message = 'The query {} is {}, over the limit of {}.'.format(name, value, limit)
+        super(QueryCostError, self).__init__(message)
+        self.cost = cost
+
+
+class CostAnalyzer(object):
+    def __init__(self, schema, field_costs=None, default_cost=1, default_list_size=10):
+        """
+        Estimate the cost of the documents for the schema, without executing them.
+
+        The list fields are expected to return as many items as their first or last
+        argument, or default_list_size without them.
+
+        :param schema: GraphQLSchema the documents are executed with
+        :param field_costs: Dict of the cost of the fields, by 'Type.field'
+        :param default_cost: Cost of the fields not in field_costs
+        :param default_list_size: Number of items expected in the lists without a size argument
+        """
+        self.schema = schema
+        self.field_costs = field_costs or {}
+        self.default_cost = default_cost
+        self.default_list_size = default_list_size
+
+    def analyze(self, document, variable_values=None, operation_name=None):
+        """
+        Return the QueryCost of the operation, or the highest one of all the
+        operations of the document when no operation_name is given.
+
+        It's an upper bound: the fields selected more than once, or in the
+        fragments of different types, are all counted.
+        """
+        fragments = {}
+        operations = []
+        for definition in document.definitions:
+            if isinstance(definition, ast.FragmentDefinition):
+                fragments[definition.name.value] = definition
+            elif isinstance(definition, ast.OperationDefinition):
+                if operation_name is None or (definition.name and definition.name.value == operation_name):
+                    operations.append(definition)
+
+        total = QueryCost()
+        for operation in operations:
+            root_type = {
+                'query': self.schema.get_query_type,
+                'mutation': self.schema.get_mutation_type,
+                'subscription': self.schema.get_subscription_type,
+            }[operation.operation]()
+            if root_type is None:
+                continue
+            variables = self._get_variables(operation, variable_values or {})
+            analysis = _Analysis(self, fragments, variables)
+            total = total.max(analysis.selection_cost(root_type, operation.selection_set))
+        return total
+
+    def _get_variables(self, operation, variable_values):
+        # The size arguments of the variables without a value use their default value
+        variables = {}
+        for definition in operation.variable_definitions or ():
+            name = definition.variable.name.value
+            if name in variable_values:
+                variables[name] = variable_values[name]
+            elif isinstance(definition.default_value, ast.IntValue):
+                variables[name] = int(definition.default_value.value)
+        return variables
+
+    def field_cost(self, parent_type, field_name):
+        return self.field_costs.get('{}.{}'.format(parent_type.name, field_name), self.default_cost)
+
+    def check(self, document, limits, variable_values=None, operation_name=None):
+        """
+        Raise a QueryCostError if the cost of the document is over any of the
+        limits, a dict with the maximum depth, breadth, nodes or cost.
+        """
+        cost = self.analyze(document, variable_values, operation_name)
+        for name in LIMITS:
+            limit = limits.get(name)
+            if limit is not None and getattr(cost, name) > limit:
+                raise QueryCostError(name, getattr(cost, name), limit, cost)
+        return cost
+
+
+class _Analysis(object):
+    def __init__(self, analyzer, fragments, variables):
+        self.analyzer = analyzer
+        self.fragments = fragments
+        self.variables = variables
+        # The selections are reached from every spread of their fragment, they are only analyzed once
+        self.costs = {}
+
+    def collect_fields(self, parent_type, selection_set, fields, visiting):
+        # The fragments being spread are skipped, so cycles of fragments don't recurse forever
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                fields.append((parent_type, selection, visiting))
+            elif isinstance(selection, ast.InlineFragment):
+                type = parent_type
+                if selection.type_condition:
+                    type = self.analyzer.schema.get_type(selection.type_condition.name.value) or parent_type
+                self.collect_fields(type, selection.selection_set, fields, visiting)
+            elif isinstance(selection, ast.FragmentSpread):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is None or name in visiting:
+                    continue
+                type = self.analyzer.schema.get_type(fragment.type_condition.name.value) or parent_type
+                self.collect_fields(type, fragment.selection_set, fields, visiting | {name})
+        return fields
+
+    def list_size(self, field):
+        for argument in field.arguments or ():
+            if argument.name.value in LIST_SIZE_ARGUMENTS:
+                if isinstance(argument.value, ast.IntValue):
+                    return int(argument.value.value)
+                if isinstance(argument.value, ast.Variable):
+                    value = self.variables.get(argument.value.name.value)
+                    if isinstance(value, int):
+                        return value
+        return self.analyzer.default_list_size
+
+    def selection_cost(self, parent_type, selection_set, visiting=frozenset()):
+        key = (parent_type, id(selection_set))
+        if key in self.costs:
+            return self.costs[key]
+
+        fields = self.collect_fields(parent_type, selection_set, [], visiting)
+        cost = QueryCost(breadth=len(set(field.alias.value if field.alias else field.name.value
+                                         for _, field, _ in fields)))
+        for type, field, field_visiting in fields:
+            if not isinstance(type, (GraphQLObjectType, GraphQLInterfaceType)) and field.name.value != '__typename':
+                continue
+            field_def = get_field_def(self.analyzer.schema, type, field.name.value)
+            if field_def is None:
+                continue
+
+            return_type = field_def.type.of_type if isinstance(field_def.type, GraphQLNonNull) else field_def.type
+            size = self.list_size(field) if isinstance(return_type, GraphQLList) else 1
+            child = QueryCost()
+            if field.selection_set:
+                child = self.selection_cost(get_named_type(return_type), field.selection_set, field_visiting)
+            cost.depth = max(cost.depth, child.depth + 1)
+            cost.breadth = max(cost.breadth, child.breadth)
+            cost.nodes += size * (child.nodes + 1)
+            cost.cost += size * (child.cost + self.analyzer.field_cost(type, field.name.value))
+
+        self.costs[key] = cost
+        return cost
@@ -0,0 +1,193 @@
+import threading
+
+from promise import Promise, is_thenable
+
+
+class DataLoader(object):
+    def __init__(self, batch_load_fn, max_batch_size=None, cache=True, get_cache_key=None):
+        """
+        Batch and cache the loads of keys, so resolving the same field for many
+        objects makes a single call to the data source instead of one per object.
+
+        The keys requested with load are collected until the loader is
+        dispatched, usually by the transport when the execution can't go further
+        without them, and then loaded with a single call to batch_load_fn.
+
+        :param batch_load_fn: Function receiving a list of keys and returning a list of values
+            in the same order, or a promise of it. A value that is an Exception rejects that key
+        :param max_batch_size: Maximum number of keys per call to batch_load_fn (Default: no limit)
+        :param cache: Return the same promise when a key is loaded again (Default: True)
+        :param get_cache_key: Function returning the key used to cache a key (Default: the key itself)
+        """
+        assert callable(batch_load_fn), 'batch_load_fn must be callable, received "{}".'.format(batch_load_fn)
+        self.batch_load_fn = batch_load_fn
+        self.max_batch_size = max_batch_size
+        self.cache = cache
+        self.get_cache_key = get_cache_key or (lambda key: key)
+        self.on_schedule = None
+        self._promises = {}
+        self._queue = []
+        self._lock = threading.Lock()
+
+    def load(self, key):
+        """
+        Return a promise of the value of the key.
+        """
+        assert key is not None, 'The key to load must not be None.'
+        cache_key = self.get_cache_key(key)
+        with self._lock:
+            if self.cache and cache_key in self._promises:
+                return self._promises[cache_key]
+
+            promise = Promise()
+            if self.cache:
+                self._promises[cache_key] = promise
+            self._queue.append((key, promise))
+            scheduled = len(self._queue) == 1
+
+        if scheduled and self.on_schedule:
+            self.on_schedule(self)
+        return promise
+
+    def load_many(self, keys):
+        return Promise.all([self.load(key) for key in keys])
+
+    def prime(self, key, value):
+        """
+        Cache the value of a key, unless it's already cached.
+        """
+        cache_key = self.get_cache_key(key)
+        with self._lock:
+            if cache_key not in self._promises:
+                if isinstance(value, Exception):
+                    self._promises[cache_key] = Promise.rejected(value)
+                else:
+                    self._promises[cache_key] = Promise.resolve(value)
+        return self
+
+    def clear(self, key):
+        with self._lock:
+            self._promises.pop(self.get_cache_key(key), None)
+        return self
+
+    def clear_all(self):
+        with self._lock:
+            self._promises.clear()
+        return self
+
+    @property
+    def pending(self):
+        return len(self._queue)
+
+    def dispatch(self):
+        """
+        Load the keys queued so far. Return whether there was any.
+        """
+        with self._lock:
+            queue, self._queue = self._queue, []
+        if not queue:
+            return False
+
+        batch_size = self.max_batch_size or len(queue)
+        for start in range(0, len(queue), batch_size):
+            self._load_batch(queue[start:start + batch_size])
+        return True
+
+    def _load_batch(self, batch):
+        keys = [key for key, _ in batch]
+        try:
+            values = self.batch_load_fn(keys)
+        except Exception as e:
+            self._fail_batch(batch, e)
+            return
+
+        if is_thenable(values):
+            Promise.resolve(values).then(
+                lambda resolved: self._resolve_batch(batch, resolved),
+                lambda error: self._fail_batch(batch, error)
+            )
+        else:
+            self._resolve_batch(batch, values)
+
+    def _resolve_batch(self, batch, values):
+        values = list(values) if values is not None else None
+        if values is None or len(values) != len(batch):
+            self._fail_batch(batch, TypeError(
+                'DataLoader batch_load_fn must return a list with a value per key, '
+                'received {} for the keys {}.'.format(values, [key for key, _ in batch])
+            ))
+            return
+
+        for (_, promise), value in zip(batch, values):
+            if isinstance(value, Exception):
+                promise.do_reject(value)
+            else:
+                promise.do_resolve(value)
+
+    def _fail_batch(self, batch, error):
+        # Failed loads are not cached, so they can be retried
+        for key, promise in batch:
+            self.clear(key)
+            promise.do_reject(error)
+
+
+class DataLoaders(object):
+    def __init__(self, batch_load_fns, loop=None):
+        """
+        The DataLoaders of a single execution, available as attributes by name.
+
+        :param batch_load_fns: Dict of name to the batch_load_fn of its DataLoader
+        :param loop: asyncio event loop, to dispatch the loaders in the loop when they
+            are used by coroutines
+        """
+        self.loop = loop
+        self._loaders = {}
+        for name, batch_load_fn in batch_load_fns.items():
+            loader = DataLoader(batch_load_fn)
+            loader.on_schedule = self._schedule
+            self._loaders[name] = loader
+        self._condition = threading.Condition()
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['_loaders'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __getitem__(self, name):
+        return self._loaders[name]
+
+    def _schedule(self, loader):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(loader.dispatch)
+        with self._condition:
+            self._condition.notify_all()
+
+    def _notify(self, value):
+        with self._condition:
+            self._condition.notify_all()
+
+    def dispatch(self):
+        """
+        Dispatch every loader with queued keys, return whether there was any.
+        """
+        dispatched = False
+        for loader in self._loaders.values():
+            if loader.dispatch():
+                dispatched = True
+        return dispatched
+
+    def run(self, promise, executor):
+        """
+        Wait for the result of an execution, dispatching the loaders every
+        time the execution can't go further without their keys.
+        """
+        promise.then(self._notify, self._notify)
+        while promise.is_pending:
+            executor.wait_until_finished()
+            if self.dispatch():
+                continue
+            with self._condition:
+                if promise.is_pending and not any(loader.pending for loader in self._loaders.values()):
+                    self._condition.wait()
+        return promise.get()
@@ -0,0 +1,106 @@
+import multiprocessing
+from concurrent import futures
+
+import six
+from graphql.execution.base import default_resolve_fn
+from graphql.execution.executors.asyncio import AsyncioExecutor
+from graphql.execution.executors.sync import SyncExecutor
+from promise import Promise
+
+EXECUTOR_SYNC = 'sync'
+EXECUTOR_THREAD = 'thread'
+EXECUTOR_PROCESS = 'process'
+EXECUTOR_ASYNCIO = 'asyncio'
+
+
+def cpu_bound(resolver):
+    """
+    Mark a resolver to run in the worker processes of the process executor.
+
+    The resolver and the values it receives and returns are pickled, so it must
+    be a module level function, and it is called as ``resolver(source, args, None, None)``,
+    as the context and the resolve info can't be sent to other processes.
+    """
+    resolver.cpu_bound = True
+    return resolver
+
+
+def _call_cpu_bound(fn, source, args):
+    return fn(source, args, None, None)
+
+
+class PoolExecutor(object):
+    """
+    Executor of a single execution running the resolvers in a concurrent.futures pool.
+    """
+
+    def __init__(self, submit):
+        self.submit = submit
+        self.futures = []
+
+    def wait_until_finished(self):
+        # Completing a field may submit the resolvers of its subfields
+        while True:
+            pending = [future for future in self.futures if not future.done()]
+            if not pending:
+                return
+            futures.wait(pending)
+
+    def execute(self, fn, *args, **kwargs):
+        future = self.submit(fn, args, kwargs)
+        if future is None:
+            return fn(*args, **kwargs)
+        self.futures.append(future)
+        return Promise.resolve(future)
+
+
+class ExecutorFactory(object):
+    def __init__(self, executor=EXECUTOR_SYNC, max_workers=None, loop=None):
+        """
+        Create the graphql-core executor used in every execution of a local schema.
+
+        :param executor: One of ``sync``, ``thread``, ``process`` or ``asyncio``,
+            or an executor instance shared by all the executions (Default: sync)
+        :param max_workers: Size of the thread or process pool (Default: number of cores,
+            times 5 for threads as in concurrent.futures)
+        :param loop: Event loop of the asyncio executor (Default: asyncio.get_event_loop())
+        """
+        assert isinstance(executor, six.string_types) or hasattr(executor, 'execute'), \
+            'Executor must be a name or have an execute method, received "{}".'.format(executor)
+        assert not isinstance(executor, six.string_types) or executor in (
+            EXECUTOR_SYNC, EXECUTOR_THREAD, EXECUTOR_PROCESS, EXECUTOR_ASYNCIO
+        ), 'Unknown executor "{}".'.format(executor)
+        self.executor = executor
+        self.loop = loop
+        self.pool = None
+        if executor == EXECUTOR_THREAD:
+            self.pool = futures.ThreadPoolExecutor(max_workers=max_workers or multiprocessing.cpu_count() * 5)
+        elif executor == EXECUTOR_PROCESS:
+            self.pool = futures.ProcessPoolExecutor(max_workers=max_workers or multiprocessing.cpu_count())
+
+    def _submit_to_thread(self, fn, args, kwargs):
+        # Reading an attribute is cheaper than switching threads
+        if fn is default_resolve_fn:
+            return None
+        return self.pool.submit(fn, *args, **kwargs)
+
+    def _submit_to_process(self, fn, args, kwargs):
+        if not getattr(fn, 'cpu_bound', False):
+            return None
+        source, resolver_args = args[:2]
+        return self.pool.submit(_call_cpu_bound, fn, source, resolver_args)
+
+    def create(self):
+        if not isinstance(self.executor, six.string_types):
+            return self.executor
+        if self.executor == EXECUTOR_THREAD:
+            return PoolExecutor(self._submit_to_thread)
+        if self.executor == EXECUTOR_PROCESS:
+            return PoolExecutor(self._submit_to_process)
+        if self.executor == EXECUTOR_ASYNCIO:
+            return AsyncioExecutor(loop=self.loop)
+        return SyncExecutor()
+
+    def shutdown(self, wait=True):
+        if self.pool is not None:
+            self.pool.shutdown(wait=wait)
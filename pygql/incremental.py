@@ -0,0 +1,201 @@
+"""
+Incremental delivery of the results, for the documents using @defer and @stream.
+
+The server answers with a multipart/mixed response: the first part is the
+initial result, and every next part adds the data of some deferred fragments
+or streamed list items at their path, until one of them has no next.
+Both the format of the ``incremental`` list (with or without the ``pending``
+ids) and the older one of a payload per fragment are understood.
+"""
+import json
+
+from graphql.execution import ExecutionResult
+
+MULTIPART_MIXED = 'multipart/mixed'
+# Sent as Accept to ask for the incremental delivery, the servers without it answer JSON
+ACCEPT_INCREMENTAL = 'multipart/mixed; deferSpec=20220824, application/json'
+
+
+class IncrementalResult(ExecutionResult):
+    """
+    The result merged so far. The results of a response share their data,
+    updated in place by the next payloads.
+    """
+    __slots__ = 'has_next', 'incremental'
+
+    def __init__(self, data=None, errors=None, has_next=False, incremental=None):
+        """
+        :param has_next: More payloads follow
+        :param incremental: The entries merged from the last payload, each with its path
+        """
+        super(IncrementalResult, self).__init__(data=data, errors=errors)
+        self.has_next = has_next
+        self.incremental = incremental or []
+
+
+def _content_type_params(content_type):
+    parts = [part.strip() for part in (content_type or '').split(';')]
+    params = {}
+    for part in parts[1:]:
+        name, _, value = part.partition('=')
+        params[name.strip().lower()] = value.strip().strip('"')
+    return parts[0].lower(), params
+
+
+def is_multipart(content_type):
+    return _content_type_params(content_type)[0] == MULTIPART_MIXED
+
+
+def iter_parts(chunks, boundary):
+    """
+    Yield the bodies of the parts of a multipart response as their last
+    byte arrives, from the chunks of its body.
+    """
+    # The delimiters are preceded by a line break, except the first one if it starts the body
+    delimiter = b'\r\n--' + boundary.encode('ascii')
+    buffer = b'\r\n'
+    started = False
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            index = buffer.find(delimiter)
+            if index < 0:
+                break
+            part, buffer = buffer[:index], buffer[index + len(delimiter):]
+            if started:
+                # The line of the delimiter ends the headers when there are none
+                headers, separator, body = part.partition(b'\r\n\r\n')
+                yield body if separator else b''
+            started = True
+        if started and buffer.startswith(b'--'):
+            # The closing delimiter
+            return
+
+
+def iter_payloads(content_type, chunks):
+    """
+    Yield the JSON payloads of a response, one if it is not multipart.
+    """
+    media_type, params = _content_type_params(content_type)
+    if media_type != MULTIPART_MIXED:
+        yield json.loads(b''.join(chunks).decode('utf-8'))
+        return
+
+    for body in iter_parts(chunks, params.get('boundary', '-')):
+        body = body.strip()
+        # The servers send empty parts or objects to keep the connection alive
+        if body and body != b'{}':
+            yield json.loads(body.decode('utf-8'))
+
+
+def _merge(target, source):
+    for key, value in source.items():
+        current = target.get(key)
+        if isinstance(value, dict) and isinstance(current, dict):
+            _merge(current, value)
+        elif isinstance(value, list) and isinstance(current, list) and len(value) == len(current):
+            for index, item in enumerate(value):
+                if isinstance(item, dict) and isinstance(current[index], dict):
+                    _merge(current[index], item)
+                else:
+                    current[index] = item
+        else:
+            target[key] = value
+
+
+class ResultMerger(object):
+    """
+    Merge the payloads of a response in a single result.
+    """
+
+    def __init__(self):
+        self.data = None
+        self.errors = None
+        self.has_next = True
+        # Paths of the pending fragments and streams, by id
+        self.pending = {}
+
+    def _add_errors(self, errors):
+        if errors:
+            self.errors = (self.errors or []) + list(errors)
+
+    def _resolve(self, path):
+        value = self.data
+        for key in path:
+            value = value[key]
+        return value
+
+    def _merge_entry(self, entry):
+        path = list(entry.get('path') or ())
+        if 'id' in entry:
+            path = list(self.pending.get(entry['id'], {}).get('path', ())) + list(entry.get('subPath') or ())
+        self._add_errors(entry.get('errors'))
+        try:
+            if 'items' in entry:
+                if 'id' in entry:
+                    items = self._resolve(path)
+                    start = len(items)
+                else:
+                    items = self._resolve(path[:-1])
+                    start = path[-1]
+                for offset, item in enumerate(entry['items']):
+                    if start + offset < len(items):
+                        items[start + offset] = item
+                    else:
+                        items.append(item)
+            elif entry.get('data') is not None:
+                _merge(self._resolve(path), entry['data'])
+        except (KeyError, IndexError, TypeError):
+            # The parent of the entry is null, after an error
+            pass
+        return dict(entry, path=path)
+
+    def add(self, payload):
+        """
+        Merge a payload, return the IncrementalResult so far.
+        """
+        if not isinstance(payload, dict) or not ('data' in payload or 'errors' in payload or
+                                                 'incremental' in payload or 'hasNext' in payload):
+            raise ValueError('Received non-compatible response "{}"'.format(payload))
+
+        entries = []
+        for pending in payload.get('pending') or ():
+            self.pending[pending['id']] = pending
+        if 'path' in payload:
+            # A payload per fragment or stream, in the first format
+            entries.append(self._merge_entry(payload))
+        else:
+            if self.data is None and 'data' in payload:
+                self.data = payload['data']
+            self._add_errors(payload.get('errors'))
+            for entry in payload.get('incremental') or ():
+                entries.append(self._merge_entry(entry))
+        for completed in payload.get('completed') or ():
+            self.pending.pop(completed.get('id'), None)
+            self._add_errors(completed.get('errors'))
+
+        self.has_next = bool(payload.get('hasNext', False))
+        return IncrementalResult(self.data, self.errors, self.has_next, entries)
+
+
+def iter_results(content_type, chunks):
+    """
+    Yield the IncrementalResult of every payload of a response as it arrives.
+    """
+    merger = ResultMerger()
+    for payload in iter_payloads(content_type, chunks):
+        yield merger.add(payload)
+        if not merger.has_next:
+            return
+
+
+def merge_response(content_type, content):
+    """
+    Return the complete result of the body of a response.
+    """
+    result = None
+    for result in iter_results(content_type, [content]):
+        pass
+    if result is None:
+        raise ValueError('Received an empty response')
+    return result
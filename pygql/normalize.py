@@ -0,0 +1,268 @@
+"""
+Normalization and minification of the documents sent to the servers.
+
+The normalized form of a document has the same meaning but without the
+unused fragments or the selections written more than once, and with the
+arguments sorted. Printed minified it's a canonical text of the document,
+so semantically identical documents can share cache entries.
+"""
+import collections
+import hashlib
+import threading
+
+from graphql.language import ast
+from graphql.language.printer import PrintingVisitor, join, print_ast, wrap
+from graphql.language.visitor import visit
+
+NAME_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_')
+
+
+def _join_tokens(parts):
+    # Only the names and numbers need a space between them
+    result = ''
+    for part in parts or ():
+        if not part:
+            continue
+        if result and result[-1] in NAME_CHARS and (part[0] in NAME_CHARS or part[0] == '-'):
+            result += ' '
+        result += part
+    return result
+
+
+class MinifyingVisitor(PrintingVisitor):
+    """
+    Prints a document with the least whitespace possible.
+    """
+    __slots__ = ()
+
+    def leave_Document(self, node, *args):
+        return _join_tokens(node.definitions)
+
+    def leave_OperationDefinition(self, node, *args):
+        var_defs = wrap('(', _join_tokens(node.variable_definitions), ')')
+        directives = _join_tokens(node.directives)
+        if not node.name and not directives and not var_defs and node.operation == 'query':
+            return node.selection_set
+        return _join_tokens([node.operation, node.name, var_defs, directives, node.selection_set])
+
+    def leave_VariableDefinition(self, node, *args):
+        return node.variable + ':' + node.type + wrap('=', node.default_value)
+
+    def leave_SelectionSet(self, node, *args):
+        return '{' + _join_tokens(node.selections) + '}'
+
+    def leave_Field(self, node, *args):
+        return _join_tokens([
+            wrap('', node.alias, ':') + node.name + wrap('(', _join_tokens(node.arguments), ')'),
+            _join_tokens(node.directives),
+            node.selection_set
+        ])
+
+    def leave_Argument(self, node, *args):
+        return node.name + ':' + node.value
+
+    def leave_FragmentSpread(self, node, *args):
+        return '...' + node.name + _join_tokens(node.directives)
+
+    def leave_InlineFragment(self, node, *args):
+        return _join_tokens([
+            '...',
+            wrap('on ', node.type_condition),
+            _join_tokens(node.directives),
+            node.selection_set
+        ])
+
+    def leave_FragmentDefinition(self, node, *args):
+        return _join_tokens([
+            'fragment', node.name, 'on', node.type_condition, _join_tokens(node.directives), node.selection_set
+        ])
+
+    def leave_ListValue(self, node, *args):
+        return '[' + _join_tokens(node.values) + ']'
+
+    def leave_ObjectValue(self, node, *args):
+        return '{' + _join_tokens(node.fields) + '}'
+
+    def leave_ObjectField(self, node, *args):
+        return node.name + ':' + node.value
+
+    def leave_Directive(self, node, *args):
+        return '@' + node.name + wrap('(', _join_tokens(node.arguments), ')')
+
+
+def minify(document):
+    """
+    Return the text of the document without the whitespace print_ast adds.
+    """
+    return visit(document, MinifyingVisitor())
+
+
+def _sort_value(value):
+    if isinstance(value, ast.ObjectValue):
+        return ast.ObjectValue(fields=sorted(
+            (ast.ObjectField(field.name, _sort_value(field.value)) for field in value.fields),
+            key=lambda field: field.name.value
+        ))
+    if isinstance(value, ast.ListValue):
+        return ast.ListValue(values=[_sort_value(item) for item in value.values])
+    return value
+
+
+def _sort_arguments(arguments):
+    return sorted(
+        (ast.Argument(argument.name, _sort_value(argument.value)) for argument in arguments or ()),
+        key=lambda argument: argument.name.value
+    )
+
+
+def _sort_directives(directives):
+    return [ast.Directive(directive.name, _sort_arguments(directive.arguments)) for directive in directives or ()]
+
+
+def _merge_selections(selections):
+    # The selections asking the same field (or fragment) are merged in the first of them
+    merged = collections.OrderedDict()
+    for selection in selections:
+        directives = _sort_directives(selection.directives)
+        printed_directives = join([minify(directive) for directive in directives])
+        if isinstance(selection, ast.Field):
+            arguments = _sort_arguments(selection.arguments)
+            key = (
+                'field',
+                (selection.alias or selection.name).value,
+                selection.name.value,
+                join([minify(argument) for argument in arguments]),
+                printed_directives,
+            )
+            if key not in merged:
+                merged[key] = ast.Field(
+                    selection.name, alias=selection.alias, arguments=arguments, directives=directives,
+                    selection_set=[] if selection.selection_set else None
+                )
+            if selection.selection_set:
+                if merged[key].selection_set is None:
+                    merged[key].selection_set = []
+                merged[key].selection_set.extend(selection.selection_set.selections)
+        elif isinstance(selection, ast.InlineFragment):
+            type_condition = selection.type_condition.name.value if selection.type_condition else None
+            key = ('inline', type_condition, printed_directives)
+            if key not in merged:
+                merged[key] = ast.InlineFragment(selection.type_condition, [], directives=directives)
+            merged[key].selection_set.extend(selection.selection_set.selections)
+        else:
+            key = ('spread', selection.name.value, printed_directives)
+            merged.setdefault(key, ast.FragmentSpread(selection.name, directives=directives))
+
+    # The selection sets hold the lists of the merged selections until now
+    for selection in merged.values():
+        if isinstance(selection, (ast.Field, ast.InlineFragment)) and selection.selection_set is not None:
+            selection.selection_set = _normalize_selection_set(selection.selection_set)
+    return list(merged.values())
+
+
+def _normalize_selection_set(selections):
+    return ast.SelectionSet(selections=_merge_selections(selections))
+
+
+def _spread_names(selection_set, names):
+    for selection in selection_set.selections:
+        if isinstance(selection, ast.FragmentSpread):
+            names.add(selection.name.value)
+        elif selection.selection_set:
+            _spread_names(selection.selection_set, names)
+    return names
+
+
+def _used_fragments(operations, fragments):
+    used = set()
+    pending = list(operations)
+    while pending:
+        for name in _spread_names(pending.pop().selection_set, set()):
+            if name not in used and name in fragments:
+                used.add(name)
+                pending.append(fragments[name])
+    return used
+
+
+def normalize(document):
+    """
+    Return a new document with the same meaning, without the unused
+    fragments nor the selections written more than once, and with the
+    arguments and the fragments sorted by name.
+    """
+    operations = [
+        definition for definition in document.definitions if isinstance(definition, ast.OperationDefinition)
+    ]
+    fragments = dict(
+        (definition.name.value, definition)
+        for definition in document.definitions if isinstance(definition, ast.FragmentDefinition)
+    )
+    # A document with only fragments is kept whole, they are what it's about
+    used = _used_fragments(operations, fragments) if operations else set(fragments)
+
+    definitions = [
+        ast.OperationDefinition(
+            operation.operation,
+            _normalize_selection_set(operation.selection_set.selections),
+            name=operation.name,
+            variable_definitions=operation.variable_definitions,
+            directives=_sort_directives(operation.directives)
+        )
+        for operation in operations
+    ]
+    for name in sorted(used):
+        fragment = fragments[name]
+        definitions.append(ast.FragmentDefinition(
+            fragment.name,
+            fragment.type_condition,
+            _normalize_selection_set(fragment.selection_set.selections),
+            directives=_sort_directives(fragment.directives)
+        ))
+    return ast.Document(definitions=definitions)
+
+
+def canonical_query(document):
+    """
+    Return the minified text of the normalized document.
+    """
+    return minify(normalize(document))
+
+
+def query_hash(document):
+    """
+    Return a hash of the document, the same for the documents with the
+    same canonical_query, to use as cache key.
+    """
+    return hashlib.sha256(canonical_query(document).encode('utf-8')).hexdigest()
+
+
+class QueryPrinter(object):
+    def __init__(self, normalize=True, minify=True, maxsize=1024):
+        """
+        Print the documents sent by a transport, keeping the text of the last
+        ones printed, which are compared by identity.
+
+        :param normalize: Send the normalized documents
+        :param minify: Send the documents without whitespace
+        :param maxsize: Maximum number of documents kept
+        """
+        self.normalize = normalize
+        self.minify = minify
+        self.maxsize = maxsize
+        self._queries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, document):
+        with self._lock:
+            query = self._queries.pop(document, None)
+            if query is not None:
+                self._queries[document] = query
+                return query
+
+        printed = normalize(document) if self.normalize else document
+        query = minify(printed) if self.minify else print_ast(printed)
+        with self._lock:
+            self._queries[document] = query
+            while len(self._queries) > self.maxsize:
+                self._queries.popitem(last=False)
+        return query
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from graphql import introspection_query, parse
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join('~', '.cache', 'pygql')
+
+
+def fetch_introspection(transport):
+    result = transport.execute(parse(introspection_query))
+    if result.errors:
+        raise Exception(str(result.errors[0]))
+    return result.data
+
+
+class SchemaCache(object):
+    def __init__(self, directory=None, ttl=3600, version=None):
+        """
+        Keep the introspection of the remote schemas on disk, so new clients
+        don't need to fetch it again.
+
+        :param directory: Where the introspections are stored (Default: $PYGQL_CACHE_DIR or ~/.cache/pygql)
+        :param ttl: Seconds after which a cached introspection is stale and refreshed in the
+            background, None to never refresh it (Default: 3600)
+        :param version: Version of the remote schema, e.g. the deployed API release or an ETag.
+            Introspections cached for other versions are ignored
+        """
+        directory = directory or os.environ.get('PYGQL_CACHE_DIR') or DEFAULT_CACHE_DIR
+        self.directory = os.path.expanduser(directory)
+        self.ttl = ttl
+        self.version = version
+
+    def path(self, url):
+        key = json.dumps([url, self.version]).encode('utf-8')
+        return os.path.join(self.directory, hashlib.sha1(key).hexdigest() + '.json')
+
+    def load(self, url):
+        """
+        Return the cached entry of the url, a dict with its ``introspection`` and
+        the time it was ``fetched_at``, or None when missing or unreadable.
+        """
+        try:
+            with open(self.path(url)) as cache_file:
+                entry = json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get('url') != url or entry.get('version') != self.version:
+            return None
+        return entry
+
+    def store(self, url, introspection):
+        entry = {
+            'url': url,
+            'version': self.version,
+            'fetched_at': time.time(),
+            'introspection': introspection,
+        }
+        try:
+            os.makedirs(self.directory)
+        except OSError:
+            if not os.path.isdir(self.directory):
+                raise
+
+        # Write to a temporary file first, so other processes never read a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as cache_file:
+                json.dump(entry, cache_file)
+            getattr(os, 'replace', os.rename)(temp_path, self.path(url))
+        except Exception:
+            os.remove(temp_path)
+            raise
+        return entry
+
+    def is_stale(self, entry):
+        return self.ttl is not None and time.time() - entry['fetched_at'] > self.ttl
+
+    def fetch(self, transport):
+        """
+        Fetch the introspection of the schema through the transport and cache it.
+        """
+        introspection = fetch_introspection(transport)
+        url = getattr(transport, 'url', None)
+        if url:
+            try:
+                self.store(url, introspection)
+            except (IOError, OSError):
+                log.warning('Could not cache the schema of %s in %s', url, self.directory, exc_info=True)
+        return introspection
+
+    def get_introspection(self, transport):
+        """
+        Return the introspection of the schema of the transport, and whether it's
+        stale and should be refreshed.
+        """
+        url = getattr(transport, 'url', None)
+        entry = self.load(url) if url else None
+        if entry is None:
+            return self.fetch(transport), False
+        return entry['introspection'], self.is_stale(entry)
+
+    def refresh_in_background(self, transport, callback):
+        """
+        Fetch the introspection again in a daemon thread, calling callback with
+        it when succeeded. Failures are logged and keep the cached introspection.
+        """
+        def refresh():
+            try:
+                introspection = self.fetch(transport)
+            except Exception:
+                log.warning('Could not refresh the schema of %s', getattr(transport, 'url', None), exc_info=True)
+                return
+            callback(introspection)
+
+        thread = threading.Thread(target=refresh, name='pygql-schema-refresh')
+        thread.daemon = True
+        thread.start()
+        return thread
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import logging
+import threading
+
+from .schema_cache import fetch_introspection
+
+log = logging.getLogger(__name__)
+
+# Key of the hash of everything in a schema that isn't a type
+SCHEMA_KEY = ''
+
+
+def _hash(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def introspection_hash(introspection):
+    return _hash(introspection)
+
+
+def type_hashes(introspection):
+    """
+    Return a dict of the hash of every type of the introspection, including
+    one with the SCHEMA_KEY for the root types and directives.
+    """
+    schema = introspection['__schema']
+    hashes = dict((type['name'], _hash(type)) for type in schema['types'])
+    hashes[SCHEMA_KEY] = _hash(dict((key, value) for key, value in schema.items() if key != 'types'))
+    return hashes
+
+
+def changed_types(old_hashes, new_hashes):
+    """
+    Return the names of the types added, removed or changed between two
+    introspections, or None if anything else in the schema changed.
+    """
+    if old_hashes.get(SCHEMA_KEY) != new_hashes.get(SCHEMA_KEY):
+        return None
+    names = set(old_hashes) | set(new_hashes)
+    return set(name for name in names if old_hashes.get(name) != new_hashes.get(name))
+
+
+class SchemaPoller(object):
+    def __init__(self, client, interval=60):
+        """
+        Fetch the introspection of the client transport periodically, updating
+        the client schema when it changes.
+
+        :param client: Client with a transport to fetch the introspection from
+        :param interval: Seconds between polls
+        """
+        self.client = client
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """
+        Fetch the introspection once, return the names of the changed types
+        (None if the whole schema changed) or an empty set when unchanged.
+        """
+        return self.client.update_schema(fetch_introspection(self.client.transport))
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                changed = self.poll()
+            except Exception:
+                log.warning('Could not poll the schema', exc_info=True)
+                continue
+            if changed != set():
+                log.info('The schema changed, types: %s', 'all' if changed is None else sorted(changed))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='pygql-schema-poller')
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
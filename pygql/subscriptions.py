@@ -0,0 +1,82 @@
+"""
+Subscriptions of a local schema.
+
+graphql-core only resolves the subscription operations once, as queries. Here
+the resolver of the root subscription field returns the stream of events
+instead, an iterable or an async iterable, and every event is the value of
+the field in the result executed for it, as the source event stream and the
+response stream of the GraphQL specification.
+"""
+from graphql.error import GraphQLError
+from graphql.execution.base import (ExecutionContext, ResolveInfo, collect_fields, default_resolve_fn,
+                                    get_field_def, get_operation_root_type)
+from graphql.execution.executors.sync import SyncExecutor
+from graphql.execution.middleware import MiddlewareManager
+from graphql.pyutils.default_ordered_dict import DefaultOrderedDict
+
+
+def is_async_iterable(value):
+    return hasattr(value, '__aiter__')
+
+
+def create_source_event_stream(schema, document, root_value=None, context_value=None, variable_values=None,
+                               operation_name=None):
+    """
+    Call the resolver of the root field of the subscription, return the
+    iterable or async iterable of its events.
+    """
+    context = ExecutionContext(
+        schema, document, root_value, context_value, variable_values, operation_name, SyncExecutor(), None
+    )
+    operation = context.operation
+    if operation.operation != 'subscription':
+        raise GraphQLError('Only subscriptions can be subscribed, not a {}.'.format(operation.operation), [operation])
+
+    subscription_type = get_operation_root_type(schema, operation)
+    fields = collect_fields(context, subscription_type, operation.selection_set, DefaultOrderedDict(list), set())
+    if len(fields) != 1:
+        raise GraphQLError('A subscription must select only one top level field.', [operation])
+    field_asts = next(iter(fields.values()))
+    field_name = field_asts[0].name.value
+    field_def = get_field_def(schema, subscription_type, field_name)
+    if not field_def:
+        raise GraphQLError('Cannot subscribe to "{}".'.format(field_name), field_asts)
+
+    info = ResolveInfo(
+        field_name, field_asts, field_def.type, subscription_type, schema, context.fragments, root_value,
+        operation, context.variable_values
+    )
+    resolver = field_def.resolver or default_resolve_fn
+    events = resolver(root_value, context.get_argument_values(field_def, field_asts[0]), context_value, info)
+    if not is_async_iterable(events) and not hasattr(events, '__iter__'):
+        raise GraphQLError(
+            'The subscription field "{}" must return an iterable or an async iterable, not {!r}.'.format(
+                field_name, events
+            ),
+            field_asts
+        )
+    return events
+
+
+class EventMiddleware(object):
+    """
+    Resolve the root subscription field to the event, instead of calling its resolver.
+    """
+
+    def __init__(self, event):
+        self.event = event
+
+    def resolve(self, next, source, args, context, info):
+        if info.parent_type is info.schema.get_subscription_type():
+            return self.event
+        return next(source, args, context, info)
+
+
+def event_middleware(event, middleware=None):
+    """
+    Return the middleware of the execution of an event, with the other
+    middleware of the execution.
+    """
+    if isinstance(middleware, MiddlewareManager):
+        middleware = middleware.middlewares
+    return MiddlewareManager(EventMiddleware(event), *(middleware or ()), wrap_in_promise=False)
@@ -1,20 +1,87 @@
 from pygql.transport.requests import RequestsHTTPTransport
 import requests
-from graphql.language.printer import print_ast
 from graphql.execution import ExecutionResult
+import collections
 import concurrent.futures
+import logging
 import time
 import threading
 
 import sys
 
 if sys.version_info >= (3, 0):
-    import queue
-else:
-    import Queue as queue
+    import asyncio
+
+QUEUE_BLOCK = 'block'
+QUEUE_REJECT = 'reject'
+QUEUE_SHED_OLDEST = 'shed_oldest'
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BULK = 'bulk'
+
+log = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a query doesn't fit in the BatchTransport queue"""
+
+
+class DeadlineExceededError(Exception):
+    """Set on the queries whose deadline expired while waiting in the queue"""
+
+
+class BatchResponseError(Exception):
+    """Set on the queries without a valid result in the batch response"""
+
+
+class TransportClosedError(Exception):
+    """Raised when using a closed BatchTransport, and set on the queries it couldn't send"""
+
+
+def set_future_exception(future, exception):
+    """
+    Fail the future unless it's already done or cancelled, returns whether it was failed.
+    """
+    # The future can be resolved concurrently while closing the transport
+    try:
+        if not future.done():
+            future.set_exception(exception)
+            return True
+    except Exception:
+        pass
+    return False
+
+
+def set_future_result(future, result):
+    """
+    Resolve the future unless it's already done or cancelled, returns whether it was resolved.
+    """
+    # Late responses arrive after closing the transport failed the future
+    try:
+        if not future.done():
+            future.set_result(result)
+            return True
+    except Exception:
+        pass
+    return False
+
+
+def is_retryable(exception):
+    if isinstance(exception, requests.HTTPError):
+        status_code = exception.response.status_code
+        return status_code == 429 or status_code >= 500
+    return isinstance(exception, (requests.ConnectionError, requests.Timeout))
 
 
 class FutureExecResult(ExecutionResult):
+    """
+    Result of a query sent by BatchTransport, it is filled when the batch it
+    belongs to gets its response.
+
+    Accessing data, errors or invalid blocks until then, use add_done_callback,
+    wait, as_completed or await it to consume many results without blocking.
+    """
+
     def __init__(self, future):
         self.future = future
         self._data = None
@@ -22,9 +89,12 @@ class FutureExecResult(ExecutionResult):
         self._invalid = False
         self.filled = False
 
-    def _fill_data(self):
+    def __hash__(self):
+        return id(self)
+
+    def _fill_data(self, timeout=None):
         if not self.filled:
-            result = self.future.result()
+            result = self.future.result(timeout)
             self._errors = result.get('errors')
             self._data = result.get('data')
             self.filled = True
@@ -44,19 +114,333 @@ class FutureExecResult(ExecutionResult):
         self._fill_data()
         return self._invalid
 
+    def result(self, timeout=None):
+        """
+        Wait at most timeout seconds for the response and return this result filled.
+        Raises concurrent.futures.TimeoutError if it isn't ready by then.
+        """
+        self._fill_data(timeout)
+        return self
+
+    def exception(self, timeout=None):
+        return self.future.exception(timeout)
+
+    def done(self):
+        return self.future.done()
+
+    def running(self):
+        return self.future.running()
+
+    def cancelled(self):
+        return self.future.cancelled()
+
+    def cancel(self):
+        """
+        Cancel the query if it hasn't been sent yet, returns whether it was cancelled.
+        """
+        return self.future.cancel()
+
+    def add_done_callback(self, fn):
+        """
+        Call fn with this result once the response arrives or the query fails or is cancelled.
+        """
+        self.future.add_done_callback(lambda future: fn(self))
+
+    def __await__(self):
+        loop = asyncio.get_event_loop()
+        awaitable = loop.create_future()
+
+        def cancel(awaitable):
+            if awaitable.cancelled():
+                self.future.cancel()
+
+        def transfer():
+            if awaitable.done():
+                return
+            if self.future.cancelled():
+                awaitable.cancel()
+            elif self.future.exception() is not None:
+                awaitable.set_exception(self.future.exception())
+            else:
+                awaitable.set_result(self.result())
+
+        awaitable.add_done_callback(cancel)
+        self.future.add_done_callback(lambda future: loop.call_soon_threadsafe(transfer))
+        return awaitable.__await__()
+
+
+def wait(results, timeout=None, return_when=concurrent.futures.ALL_COMPLETED):
+    """
+    concurrent.futures.wait for FutureExecResult, returns the (done, not_done) sets of results.
+    """
+    results_by_future = dict((result.future, result) for result in results)
+    done, not_done = concurrent.futures.wait(results_by_future, timeout, return_when)
+    return (
+        set(results_by_future[future] for future in done),
+        set(results_by_future[future] for future in not_done)
+    )
+
+
+def as_completed(results, timeout=None):
+    """
+    concurrent.futures.as_completed for FutureExecResult, yields the results as they are filled.
+    """
+    results_by_future = dict((result.future, result) for result in results)
+    for future in concurrent.futures.as_completed(results_by_future, timeout):
+        yield results_by_future[future]
+
+
+class QueuedQuery(object):
+    __slots__ = ('payload', 'future', 'deadline', 'priority', 'queued_at', 'attempt', 'not_before')
+
+    def __init__(self, payload, future, deadline=None, priority=PRIORITY_INTERACTIVE):
+        self.payload = payload
+        self.future = future
+        self.deadline = deadline
+        self.priority = priority
+        self.queued_at = time.time()
+        # Times the query was sent, and when it can be sent again after failing
+        self.attempt = 0
+        self.not_before = None
+
+    def expired(self, now):
+        return self.deadline is not None and now > self.deadline
+
+
+class Lane(object):
+    def __init__(self, weight=1, batch_window=0.01, max_queue_size=None, max_in_flight=1):
+        """
+        Settings of a priority lane of BatchTransport.
+
+        :param weight: Share of the batches taken from this lane when several lanes have a batch ready
+        :param batch_window: Seconds the oldest query of the lane waits for others to join its batch
+        :param max_queue_size: Maximum number of queries waiting in the lane (Default: the transport max_queue_size)
+        :param max_in_flight: Maximum number of batches of the lane sent at the same time. BatchTransport
+            starts a sender thread per batch in flight of its lanes, so a slow batch only delays the
+            next batches of its own lane (Default: 1)
+        """
+        assert max_in_flight >= 1, 'A lane needs at least a batch in flight'
+        self.weight = weight
+        self.batch_window = batch_window
+        self.max_queue_size = max_queue_size
+        self.max_in_flight = max_in_flight
+
+
+DEFAULT_LANES = {
+    PRIORITY_INTERACTIVE: Lane(weight=4, batch_window=0.01),
+    PRIORITY_BULK: Lane(weight=1, batch_window=0.05),
+}
+
+
+class _LaneQueue(object):
+    __slots__ = ('lane', 'maxsize', 'items', 'retries', 'current_weight', 'in_flight')
+
+    def __init__(self, lane, maxsize):
+        self.lane = lane
+        self.maxsize = lane.max_queue_size if lane.max_queue_size is not None else maxsize
+        self.items = collections.deque()
+        # The failed queries waiting for their backoff, they don't count for the maxsize
+        self.retries = []
+        self.current_weight = 0
+        self.in_flight = 0
+
+    def __len__(self):
+        return len(self.items) + len(self.retries)
+
+    def full(self):
+        return self.maxsize and len(self.items) >= self.maxsize
+
+    def can_send(self):
+        return len(self) and self.in_flight < self.lane.max_in_flight
+
+    def ready_at(self):
+        times = [item.not_before for item in self.retries]
+        if self.items:
+            times.append(self.items[0].queued_at + self.lane.batch_window)
+        return min(times)
+
+    def take(self, now, closed=False):
+        items, waiting = [], []
+        for item in self.retries:
+            (items if closed or item.not_before <= now else waiting).append(item)
+        self.retries = waiting
+        if self.items and (closed or self.items[0].queued_at + self.lane.batch_window <= now):
+            items.extend(self.items)
+            self.items.clear()
+        return items
+
+
+class BatchQueue(object):
+    def __init__(self, maxsize=0, policy=QUEUE_BLOCK, put_timeout=None, lanes=None):
+        """
+        Queues of the queries waiting to be batched, one FIFO queue per priority lane.
+
+        :param maxsize: Maximum number of queued queries per lane, 0 for no limit
+        :param policy: What to do when a lane is full: block the caller until there is room
+            (QUEUE_BLOCK), raise QueueFullError (QUEUE_REJECT) or drop the oldest query (QUEUE_SHED_OLDEST)
+        :param put_timeout: Seconds to block with QUEUE_BLOCK before raising QueueFullError (Default: None, forever)
+        :param lanes: Dict of priority names to Lane settings (Default: DEFAULT_LANES)
+        """
+        assert policy in (QUEUE_BLOCK, QUEUE_REJECT, QUEUE_SHED_OLDEST), 'Unknown queue policy "{}"'.format(policy)
+        self.maxsize = maxsize
+        self.policy = policy
+        self.put_timeout = put_timeout
+        self.lanes = dict(
+            (priority, _LaneQueue(lane, maxsize))
+            for priority, lane in (lanes or DEFAULT_LANES).items()
+        )
+        self.condition = threading.Condition()
+        self.closed = False
+        self.stats = {
+            'enqueued': 0,
+            'rejected': 0,
+            'shed': 0,
+            'expired': 0,
+            'max_depth': 0,
+        }
+
+    def __len__(self):
+        return sum(len(lane) for lane in self.lanes.values())
+
+    def depths(self):
+        return dict((priority, len(lane)) for priority, lane in self.lanes.items())
+
+    def _wait_not_full(self, lane):
+        end = None if self.put_timeout is None else time.time() + self.put_timeout
+        while lane.full():
+            remaining = None if end is None else end - time.time()
+            if remaining is not None and remaining <= 0:
+                return
+            self.condition.wait(remaining)
+
+    def put(self, item):
+        assert item.priority in self.lanes, 'Unknown priority "{}"'.format(item.priority)
+        lane = self.lanes[item.priority]
+        shed = None
+        with self.condition:
+            if lane.full():
+                if self.policy == QUEUE_BLOCK:
+                    self._wait_not_full(lane)
+                if self.policy == QUEUE_SHED_OLDEST:
+                    shed = lane.items.popleft()
+                elif lane.full():
+                    self.stats['rejected'] += 1
+                    raise QueueFullError('The "{}" batch queue is full ({} queries).'.format(
+                        item.priority, lane.maxsize))
+
+            lane.items.append(item)
+            self.stats['enqueued'] += 1
+            self.stats['max_depth'] = max(self.stats['max_depth'], len(lane.items))
+            self.condition.notify_all()
+
+        # A cancelled query makes room too, but it isn't counted as shed
+        if shed is not None and set_future_exception(
+                shed.future, QueueFullError('Dropped from the full batch queue by a newer query.')):
+            with self.condition:
+                self.stats['shed'] += 1
+
+    def _next_lane(self, lanes):
+        # Smooth weighted round robin, so lanes get batches in proportion to their weight
+        total = 0
+        for lane in lanes:
+            lane.current_weight += lane.lane.weight
+            total += lane.lane.weight
+        chosen = max(lanes, key=lambda lane: lane.current_weight)
+        chosen.current_weight -= total
+        return chosen
+
+    def get_batch(self):
+        """
+        Wait until a lane has a batch ready and remove its queries, returning them.
+        Once the queue is closed, returns None when there are no queries left.
+
+        The lanes with max_in_flight batches not marked with batch_done are skipped.
+        """
+        with self.condition:
+            while True:
+                waiting = [lane for lane in self.lanes.values() if lane.can_send()]
+                if not waiting:
+                    if self.closed:
+                        return None
+                    self.condition.wait()
+                    continue
+
+                now = time.time()
+                ready = [lane for lane in waiting if self.closed or lane.ready_at() <= now]
+                if not ready:
+                    self.condition.wait(min(lane.ready_at() for lane in waiting) - now)
+                    continue
+
+                lane = self._next_lane(ready)
+                items = lane.take(now, self.closed)
+                lane.in_flight += 1
+                self.condition.notify_all()
+                return items
+
+    def batch_done(self, items):
+        """
+        Mark a batch returned by get_batch as sent, so its lane can send the next one.
+        """
+        with self.condition:
+            self.lanes[items[0].priority].in_flight -= 1
+            self.condition.notify_all()
+
+    def retry(self, item, delay):
+        """
+        Queue a failed query again, to be sent after the delay.
+        """
+        with self.condition:
+            item.attempt += 1
+            item.not_before = time.time() + delay
+            self.lanes[item.priority].retries.append(item)
+            self.condition.notify_all()
+
+    def close(self):
+        """
+        Wake up the consumers waiting for queries and remove the queued ones, returning them.
+        """
+        with self.condition:
+            self.closed = True
+            items = []
+            for lane in self.lanes.values():
+                items.extend(lane.retries)
+                items.extend(lane.items)
+                lane.retries = []
+                lane.items.clear()
+            self.condition.notify_all()
+            return items
+
+    def expire(self, item):
+        if set_future_exception(item.future, DeadlineExceededError('The query deadline expired before it was sent.')):
+            with self.condition:
+                self.stats['expired'] += 1
+
 
 class BatchTransport(RequestsHTTPTransport):
-    def __init__(self, url, **kwargs):
+    def __init__(self, url, max_queue_size=0, queue_policy=QUEUE_BLOCK, queue_timeout=None, deadline=None,
+                 max_retries=0, retry_backoff=0.1, lanes=None, **kwargs):
         """
         :param url: The GraphQL URL
         :param auth: Auth tuple or callable to enable Basic/Digest/Custom HTTP Auth
         :param use_json: Send request body as JSON instead of form-urlencoded
         :param timeout: Specifies a default timeout for requests (Default: None)
+        :param pool: ConnectionPool used to reuse the connections, it can be shared
+            between transports (Default: a new ConnectionPool with 10 connections)
+        :param normalize_query: Send the queries normalized and minified, see pygql.normalize (Default: False)
+        :param max_queue_size: Maximum number of queries waiting to be sent per lane (Default: 0, no limit)
+        :param queue_policy: QUEUE_BLOCK, QUEUE_REJECT or QUEUE_SHED_OLDEST, see BatchQueue (Default: QUEUE_BLOCK)
+        :param queue_timeout: Seconds execute blocks on a full queue before raising QueueFullError (Default: None)
+        :param deadline: Default seconds a query can wait in the queue, expired queries fail
+            with DeadlineExceededError instead of being sent (Default: None)
+        :param max_retries: Times a query is sent again after a connection error, a 429 or 5xx response
+            or a response missing its result. Only the failed queries of a batch are retried (Default: 0)
+        :param retry_backoff: Seconds to wait before the first retry, doubled in the next ones (Default: 0.1)
+        :param lanes: Dict of priority names to Lane settings, the queries of each priority are queued,
+            batched and sent separately (Default: DEFAULT_LANES, with PRIORITY_INTERACTIVE and PRIORITY_BULK lanes)
         """
         super(BatchTransport, self).__init__(url, **kwargs)
-        self.session = requests.Session()
-        if self.cookies:
-            self.session.cookies = requests.utils.cookiejar_from_dict(self.cookies)
+        # The session keeps the cookies of the responses
+        self.session.cookies = requests.utils.cookiejar_from_dict(self.cookies or {})
         if self.headers:
             self.session.headers.update(self.headers)
 
@@ -64,70 +448,184 @@ class BatchTransport(RequestsHTTPTransport):
         self.query_batcher_active = True
 
         self.timeout = self.default_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
         self.data_key = 'json' if self.use_json else 'data'
 
-        self.query_batcher_queue = queue.Queue()
-        self.query_batcher = threading.Thread(target=self._batch_query, daemon=True)
-        self.query_batcher.start()
+        self.query_batcher_queue = BatchQueue(max_queue_size, queue_policy, queue_timeout, lanes)
+        self.closed = False
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        # The sender threads share the queue, which gives them the batches of the lanes with room in flight
+        senders = sum(lane.lane.max_in_flight for lane in self.query_batcher_queue.lanes.values())
+        self.query_batchers = [threading.Thread(target=self._batch_query, daemon=True) for _ in range(senders)]
+        for query_batcher in self.query_batchers:
+            query_batcher.start()
 
     def _batch_query(self):
         while self.query_batcher_active:
-            query_payloads = []
-            futures = []
-            payload, future = self.query_batcher_queue.get()
-
-            if not self.query_batcher_active:
+            items = self.query_batcher_queue.get_batch()
+            if items is None:
                 break
-            query_payloads.append(payload)
-            futures.append(future)
-            # wait 10 ms
-            time.sleep(0.01)
-            while not self.query_batcher_queue.empty():
-                if not self.query_batcher_active:
-                    break
-                payload, future = self.query_batcher_queue.get()
-                query_payloads.append(payload)
-                futures.append(future)
-
-            new_futures = []
-            new_query_payloads = []
-            for payload, future in zip(query_payloads, futures):
-
-                if future.set_running_or_notify_cancel():
-                    new_futures.append(future)
-                    new_query_payloads.append(payload)
 
             try:
-                post_args = {
-                    'timeout': self.timeout,
-                    self.data_key: new_query_payloads
-                }
-
-                request = self.session.post(self.url, **post_args)
-                request.raise_for_status()
-                results = request.json()
-                for result, future in zip(results, new_futures):
-                    try:
-
-                        assert 'errors' in result or 'data' in result, \
-                                'Received non-compatible response "{}"'.format(result)
-                        future.set_result(result)
-                    except Exception as exc:
-                        future.set_exception(exc)
+                now = time.time()
+                sending = []
+                for item in items:
+                    # The retried queries are already running
+                    if not item.attempt and not item.future.set_running_or_notify_cancel():
+                        continue
+                    if item.expired(now):
+                        self.query_batcher_queue.expire(item)
+                    else:
+                        sending.append(item)
+
+                if sending:
+                    self._send_with_retries(sending)
             except Exception as exc:
-                for future in new_futures:
-                    future.set_exception(exc)
+                # The worker keeps sending the next batches
+                log.exception('Could not send a batch of %s queries', len(items))
+                for item in items:
+                    set_future_exception(item.future, exc)
+            finally:
+                self.query_batcher_queue.batch_done(items)
+
+    def _send_with_retries(self, items):
+        # Only the queries that failed with a retryable error are sent again. They wait for
+        # their backoff in the queue, so the worker sends the other batches meanwhile
+        now = time.time()
+        for item, exception in self._send_batch(items):
+            if item.attempt >= self.max_retries or not self.query_batcher_active:
+                set_future_exception(item.future, exception)
+            elif item.expired(now):
+                self.query_batcher_queue.expire(item)
+            else:
+                self.query_batcher_queue.retry(item, self.retry_backoff * 2 ** item.attempt)
+
+    def _send_batch(self, items):
+        """
+        Send the queries in a single request and resolve their futures.
+
+        :return: List of (query, exception) for the queries that failed with a retryable error
+        """
+        post_args = {
+            'timeout': self.timeout,
+            self.data_key: [item.payload for item in items]
+        }
+        try:
+            request = self.session.post(self.url, **post_args)
+            if request.status_code == 413 and len(items) > 1:
+                # The batch is too large for the server, send each half separately
+                middle = len(items) // 2
+                return self._send_batch(items[:middle]) + self._send_batch(items[middle:])
+            request.raise_for_status()
+            results = request.json()
+        except Exception as exc:
+            if is_retryable(exc):
+                return [(item, exc) for item in items]
+            for item in items:
+                set_future_exception(item.future, exc)
+            return []
+
+        if not isinstance(results, list) or len(results) > len(items):
+            exc = BatchResponseError('Expected a list of {} results, received "{}"'.format(len(items), results))
+            for item in items:
+                set_future_exception(item.future, exc)
+            return []
+
+        for result, item in zip(results, items):
+            if isinstance(result, dict) and ('errors' in result or 'data' in result):
+                set_future_result(item.future, result)
+            else:
+                exc = BatchResponseError('Received non-compatible response "{}"'.format(result))
+                set_future_exception(item.future, exc)
+
+        # Servers stopping midway answer the first queries of the batch only
+        exc = BatchResponseError('Received {} results for {} queries'.format(len(results), len(items)))
+        return [(item, exc) for item in items[len(results):]]
 
     def set_timeout(self, timeout):
         self.timeout = timeout
 
-    def execute(self, document, variable_values=None, timeout=None):
-        query_str = print_ast(document)
+    def queue_stats(self):
+        """
+        Return the queue counters and its current depth.
+        """
+        queue = self.query_batcher_queue
+        with queue.condition:
+            return dict(queue.stats, depth=len(queue), lanes=queue.depths())
+
+    def execute(self, document, variable_values=None, timeout=None, deadline=None, priority=PRIORITY_INTERACTIVE):
+        """
+        Queue the query to be sent in the next batch.
+
+        :param deadline: Seconds the query can wait in the queue (Default: the transport deadline)
+        :param priority: Lane of the query (Default: PRIORITY_INTERACTIVE)
+        :raises QueueFullError: If the queue is full and the policy doesn't make room for the query
+        """
+        query_str = self.print_query(document)
         payload = {
             'query': query_str,
             'variables': variable_values or {}
         }
         future = concurrent.futures.Future()
-        self.query_batcher_queue.put((payload, future))
+        deadline = deadline if deadline is not None else self.deadline
+        expires_at = time.time() + deadline if deadline is not None else None
+        with self._pending_lock:
+            if self.closed:
+                raise TransportClosedError('The transport is closed.')
+            self._pending.add(future)
+        future.add_done_callback(self._discard_pending)
+        try:
+            self.query_batcher_queue.put(QueuedQuery(payload, future, expires_at, priority))
+        except Exception:
+            self._discard_pending(future)
+            raise
 
         return FutureExecResult(future)
+
+    def _discard_pending(self, future):
+        with self._pending_lock:
+            self._pending.discard(future)
+
+    def flush(self, timeout=None):
+        """
+        Wait until the queries executed so far are sent and answered.
+
+        :return: Whether all of them completed before the timeout
+        """
+        with self._pending_lock:
+            pending = list(self._pending)
+        done, not_done = concurrent.futures.wait(pending, timeout)
+        return not not_done
+
+    def close(self, timeout=None):
+        """
+        Stop accepting queries, send the queued ones and stop the worker thread.
+        The queries still pending after the timeout fail with TransportClosedError.
+
+        :return: Whether all the queries completed before the timeout
+        """
+        with self._pending_lock:
+            already_closed = self.closed
+            self.closed = True
+        if already_closed:
+            return True
+
+        end = None if timeout is None else time.time() + timeout
+        drained = self.flush(timeout)
+        self.query_batcher_active = False
+        for item in self.query_batcher_queue.close():
+            exception = TransportClosedError('The transport was closed before sending the query.')
+            set_future_exception(item.future, exception)
+        for query_batcher in self.query_batchers:
+            query_batcher.join(None if end is None else max(0, end - time.time()))
+
+        with self._pending_lock:
+            pending = list(self._pending)
+        for future in pending:
+            set_future_exception(future, TransportClosedError('The transport was closed before getting a response.'))
+
+        super(BatchTransport, self).close()
+        return drained
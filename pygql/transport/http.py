@@ -1,6 +1,15 @@
+from graphql.language.printer import print_ast
+
+from ..normalize import QueryPrinter
+
+
 class HTTPTransport(object):
 
-    def __init__(self, url, headers=None, cookies=None):
+    def __init__(self, url, headers=None, cookies=None, normalize_query=False):
         self.url = url
         self.headers = headers
         self.cookies = cookies
+        self.query_printer = QueryPrinter() if normalize_query else print_ast
+
+    def print_query(self, document):
+        return self.query_printer(document)
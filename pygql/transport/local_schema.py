@@ -1,15 +1,178 @@
+import sys
+import threading
+
 from graphql.execution import execute
+from promise import Promise
+
+from ..compiled import CompiledQueryCache, execute_compiled
+from ..dataloader import DataLoaders
+from ..executors import EXECUTOR_SYNC, ExecutorFactory
+from ..subscriptions import create_source_event_stream, event_middleware, is_async_iterable
+from .stream import ResultStream
+
+if sys.version_info >= (3, 0):
+    import asyncio
+
+
+class LocalContext(object):
+    """
+    Default context value of the executions with loaders.
+    """
+
+    def __init__(self, loaders):
+        self.loaders = loaders
 
 
 class LocalSchemaTransport(object):
 
-    def __init__(self, schema):
+    def __init__(self, schema, compiled=False, cache_size=128, executor=EXECUTOR_SYNC, max_workers=None, loop=None,
+                 loaders=None, max_buffered_events=100):
+        """
+        :param schema: The GraphQLSchema used to execute the documents
+        :param compiled: Resolve the documents with an execution plan reused in later executions,
+            instead of collecting their fields and checking their types every time (Default: False)
+        :param cache_size: Maximum number of execution plans kept when compiled (Default: 128)
+        :param executor: How the resolvers run: ``sync``, ``thread`` to resolve sibling fields in
+            parallel in a thread pool, ``process`` to run the resolvers marked with
+            pygql.executors.cpu_bound in a process pool, ``asyncio`` for resolvers returning
+            coroutines, or a graphql-core executor instance (Default: sync)
+        :param max_workers: Size of the thread or process pool
+        :param loop: Event loop of the asyncio executor
+        :param loaders: Dict of name to the batch_load_fn of a pygql.dataloader.DataLoader.
+            Every execution gets new loaders, available to the resolvers as ``context.loaders.<name>``
+            (or ``context['loaders']`` when the context value is a dict)
+        :param max_buffered_events: Maximum number of results of a subscription waiting for its
+            consumer. The next events are not read from the source until there's room (Default: 100)
+        """
         self.schema = schema
+        self.compiled = compiled
+        self.cache = CompiledQueryCache(cache_size) if compiled else None
+        self.executors = ExecutorFactory(executor, max_workers=max_workers, loop=loop)
+        self.loaders = loaders
+        self.max_buffered_events = max_buffered_events
 
     def execute(self, document, *args, **kwargs):
+        kwargs.setdefault('executor', self.executors.create())
+        if not self.loaders:
+            return self._execute(document, *args, **kwargs)
+
+        # The loaders are dispatched while waiting for the result, instead of inside the execution
+        loaders = DataLoaders(self.loaders, loop=getattr(kwargs['executor'], 'loop', None))
+        context_value = kwargs.get('context_value')
+        if context_value is None:
+            kwargs['context_value'] = LocalContext(loaders)
+        elif isinstance(context_value, dict):
+            context_value['loaders'] = loaders
+        else:
+            context_value.loaders = loaders
+        kwargs['return_promise'] = True
+        return loaders.run(self._execute(document, *args, **kwargs), kwargs['executor'])
+
+    def _execute(self, document, *args, **kwargs):
+        if self.compiled:
+            return execute_compiled(
+                self.schema,
+                document,
+                *args,
+                cache=self.cache,
+                **kwargs
+            )
         return execute(
             self.schema,
             document,
             *args,
             **kwargs
         )
+
+    def subscribe(self, document, variable_values=None, operation_name=None, root_value=None, context_value=None,
+                  **kwargs):
+        """
+        Start a subscription, return the ResultStream of the results of its events.
+
+        The resolver of the subscription field returns the events, see pygql.subscriptions.
+        The events of an iterable are read and resolved in a thread, the ones of an async
+        iterable on the event loop, where their results are resolved without blocking.
+        """
+        events = create_source_event_stream(
+            self.schema, document, root_value, context_value, variable_values, operation_name
+        )
+        middleware = kwargs.pop('middleware', None)
+
+        def execute_event(event, **options):
+            options.update(kwargs)
+            return self.execute(
+                document, root_value=root_value, context_value=context_value, variable_values=variable_values,
+                operation_name=operation_name, middleware=event_middleware(event, middleware), **options
+            )
+
+        if is_async_iterable(events):
+            return self._subscribe_async(events, execute_event)
+
+        stream = ResultStream(maxsize=self.max_buffered_events)
+        thread = threading.Thread(target=self._read_events, args=(events, stream, execute_event),
+                                  name='pygql-subscription')
+        thread.daemon = True
+        thread.start()
+        return stream
+
+    @staticmethod
+    def _read_events(events, stream, execute_event):
+        iterator = iter(events)
+        try:
+            for event in iterator:
+                # Waits for room, so no more events are read than the consumer can take
+                if not stream.put(execute_event(event)):
+                    break
+            else:
+                stream.complete()
+        except Exception as e:
+            stream.fail(e)
+        finally:
+            if hasattr(iterator, 'close'):
+                iterator.close()
+
+    def _subscribe_async(self, events, execute_event):
+        loop = self.executors.loop or asyncio.get_event_loop()
+        iterator = events.__aiter__()
+        state = {'next': None, 'closed': False}
+
+        def read_next():
+            if stream.done:
+                return stop()
+            state['next'] = asyncio.ensure_future(iterator.__anext__(), loop=loop)
+            state['next'].add_done_callback(on_event)
+
+        def on_event(future):
+            if future.cancelled():
+                return stop()
+            error = future.exception()
+            if isinstance(error, StopAsyncIteration):
+                return stream.complete()
+            if error is not None:
+                return stream.fail(error)
+            Promise.resolve(execute_event(future.result(), return_promise=True)).then(
+                on_result, stream.fail
+            )
+
+        def on_result(result):
+            stream.put(result)
+            # The next event is read once the consumer made room for its result
+            stream.when_writable(lambda: loop.call_soon_threadsafe(read_next))
+
+        def stop():
+            if state['closed']:
+                return
+            state['closed'] = True
+            if hasattr(iterator, 'aclose'):
+                asyncio.ensure_future(iterator.aclose(), loop=loop).add_done_callback(lambda future: future.exception())
+
+        def cancel():
+            if state['next'] is not None and not state['next'].done():
+                state['next'].cancel()
+
+        stream = ResultStream(on_close=lambda: loop.call_soon_threadsafe(cancel), maxsize=self.max_buffered_events)
+        loop.call_soon_threadsafe(read_next)
+        return stream
+
+    def close(self):
+        self.executors.shutdown()
@@ -0,0 +1,250 @@
+import copy
+import re
+
+from graphql.execution import ExecutionResult
+from graphql.language import ast
+from graphql.language.visitor import Visitor, visit
+
+
+class _PrefixVisitor(Visitor):
+    """
+    Renames the variables and fragments of a document by prepending a prefix.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+
+    def _name(self, name):
+        return ast.Name(value=self.prefix + name.value, loc=name.loc)
+
+    def leave_Variable(self, node, *args):  # noqa
+        return ast.Variable(name=self._name(node.name), loc=node.loc)
+
+    def leave_FragmentSpread(self, node, *args):  # noqa
+        return ast.FragmentSpread(name=self._name(node.name), directives=node.directives, loc=node.loc)
+
+    def leave_FragmentDefinition(self, node, *args):  # noqa
+        return ast.FragmentDefinition(
+            name=self._name(node.name),
+            type_condition=node.type_condition,
+            selection_set=node.selection_set,
+            directives=node.directives,
+            loc=node.loc
+        )
+
+
+def _get_operation(document):
+    operations = [d for d in document.definitions if isinstance(d, ast.OperationDefinition)]
+    if len(operations) != 1:
+        raise Exception('Only documents with a single operation can be merged.')
+    operation = operations[0]
+    if operation.operation != 'query':
+        raise Exception('Only query operations can be merged, received "{}".'.format(operation.operation))
+    return operation
+
+
+def _flatten_selections(selections, fragments, directives=None):
+    """
+    Expands the fragments used at the root of an operation into plain fields,
+    moving the fragment directives to each of the fields.
+    """
+    directives = directives or []
+    for selection in selections:
+        own_directives = directives + (selection.directives or [])
+        if isinstance(selection, ast.Field):
+            yield selection, own_directives
+        elif isinstance(selection, ast.FragmentSpread):
+            fragment = fragments[selection.name.value]
+            for item in _flatten_selections(fragment.selection_set.selections, fragments, own_directives):
+                yield item
+        elif isinstance(selection, ast.InlineFragment):
+            for item in _flatten_selections(selection.selection_set.selections, fragments, own_directives):
+                yield item
+
+
+def _collect_fragment_spreads(selection_set, fragments, used):
+    if not selection_set:
+        return
+    for selection in selection_set.selections:
+        if isinstance(selection, ast.FragmentSpread):
+            name = selection.name.value
+            if name not in used:
+                used.add(name)
+                _collect_fragment_spreads(fragments[name].selection_set, fragments, used)
+        else:
+            _collect_fragment_spreads(selection.selection_set, fragments, used)
+
+
+PREFIX_RE = re.compile(r'^q(\d+)_')
+
+
+def query_prefix(index):
+    return 'q{}_'.format(index)
+
+
+def merge_documents(queries):
+    """
+    Combine independent query documents into a single one.
+
+    The root fields of every query are aliased with a ``q<index>_`` prefix, and
+    the variables and fragments are renamed the same way, so the queries can't
+    collide with each other.
+
+    :param queries: List of (document, variable_values) pairs
+    :return: Tuple with the merged document and its variable values
+    """
+    selections = []
+    variable_definitions = []
+    variable_values = {}
+    fragments = {}
+
+    seen = set()
+    for index, (document, variables) in enumerate(queries):
+        prefix = query_prefix(index)
+        # The unchanged nodes are shared with the visited document, they must belong to a single query
+        if id(document) in seen:
+            document = copy.deepcopy(document)
+        seen.add(id(document))
+        document = visit(document, _PrefixVisitor(prefix))
+        operation = _get_operation(document)
+        query_fragments = {}
+        for definition in document.definitions:
+            if isinstance(definition, ast.FragmentDefinition):
+                query_fragments[definition.name.value] = definition
+        fragments.update(query_fragments)
+
+        for field, directives in _flatten_selections(operation.selection_set.selections, query_fragments):
+            response_key = (field.alias or field.name).value
+            selections.append(ast.Field(
+                name=field.name,
+                alias=ast.Name(value=prefix + response_key),
+                arguments=field.arguments,
+                directives=directives,
+                selection_set=field.selection_set
+            ))
+
+        variable_definitions.extend(operation.variable_definitions or [])
+        for name, value in (variables or {}).items():
+            variable_values[prefix + name] = value
+
+    selection_set = ast.SelectionSet(selections=selections)
+    used_fragments = set()
+    _collect_fragment_spreads(selection_set, fragments, used_fragments)
+
+    definitions = [ast.OperationDefinition(
+        operation='query',
+        selection_set=selection_set,
+        variable_definitions=variable_definitions
+    )]
+    definitions.extend(fragments[name] for name in sorted(used_fragments))
+    return ast.Document(definitions=definitions), variable_values
+
+
+def _error_path(error):
+    if isinstance(error, dict):
+        return error.get('path')
+    return getattr(error, 'path', None)
+
+
+def _strip_error_path(error, prefix):
+    path = _error_path(error)
+    path = [path[0][len(prefix):]] + list(path[1:])
+    if isinstance(error, dict):
+        return dict(error, path=path)
+    # The errors of the merged result are not shared, so they are patched in place
+    error.path = path
+    return error
+
+
+def _add_selection_owners(selection_set, index, owners):
+    for selection in selection_set.selections if selection_set else ():
+        owners[id(selection)] = index
+        _add_selection_owners(selection.selection_set, index, owners)
+
+
+def _node_owners(document):
+    """
+    Return the index of the query owning each selection of a merged document, by node id.
+    """
+    owners = {}
+    for definition in document.definitions:
+        if isinstance(definition, ast.FragmentDefinition):
+            _add_selection_owners(definition.selection_set, int(PREFIX_RE.match(definition.name.value).group(1)),
+                                  owners)
+        elif isinstance(definition, ast.OperationDefinition):
+            for field in definition.selection_set.selections:
+                index = int(PREFIX_RE.match(field.alias.value).group(1))
+                owners[id(field)] = index
+                _add_selection_owners(field.selection_set, index, owners)
+    return owners
+
+
+def split_result(result, count, document=None):
+    """
+    Split the result of a merged document back into one result per query.
+
+    Errors with a path are given to the query that owns the root field, as
+    the errors located in the merged document when given (graphql-core
+    doesn't set their path). The other errors are reported for every query.
+    """
+    owners = _node_owners(document) if document is not None else {}
+    results = []
+    for index in range(count):
+        prefix = query_prefix(index)
+        data = None
+        if result.data is not None:
+            data = dict(
+                (key[len(prefix):], value)
+                for key, value in result.data.items()
+                if key.startswith(prefix)
+            )
+
+        errors = []
+        for error in result.errors or []:
+            path = _error_path(error)
+            nodes = getattr(error, 'nodes', None)
+            if path:
+                if str(path[0]).startswith(prefix):
+                    errors.append(_strip_error_path(error, prefix))
+            elif nodes and id(nodes[0]) in owners:
+                if owners[id(nodes[0])] == index:
+                    errors.append(error)
+            else:
+                errors.append(error)
+
+        results.append(ExecutionResult(data=data, errors=errors or None))
+    return results
+
+
+class MergingTransport(object):
+    def __init__(self, transport, max_queries=None):
+        """
+        Send several independent queries as a single document, which works with
+        any GraphQL server, unlike the array batching of BatchTransport.
+
+        :param transport: The transport used to send the merged documents
+        :param max_queries: Maximum number of queries merged into a single request (Default: no limit)
+        """
+        self.transport = transport
+        self.max_queries = max_queries
+
+    def execute(self, document, *args, **kwargs):
+        return self.transport.execute(document, *args, **kwargs)
+
+    def close(self):
+        if hasattr(self.transport, 'close'):
+            self.transport.close()
+
+    def execute_many(self, queries):
+        chunk_size = self.max_queries or len(queries) or 1
+        results = []
+        for start in range(0, len(queries), chunk_size):
+            chunk = queries[start:start + chunk_size]
+            if len(chunk) == 1:
+                document, variable_values = chunk[0]
+                results.append(self.transport.execute(document, variable_values=variable_values))
+                continue
+            document, variable_values = merge_documents(chunk)
+            result = self.transport.execute(document, variable_values=variable_values)
+            results.extend(split_result(result, len(chunk), document))
+        return results
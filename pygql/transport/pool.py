@@ -0,0 +1,95 @@
+import socket
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.connection import HTTPConnection
+
+
+def keepalive_socket_options(idle):
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    # The fine grained settings are not available in every platform
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle))
+    if hasattr(socket, 'TCP_KEEPINTVL'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(1, idle // 6)))
+    return options
+
+
+class ConnectionPool(HTTPAdapter):
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False, idle_timeout=None,
+                 tcp_keepalive=60, max_retries=0):
+        """
+        Keep-alive connection pools for the requests transports, a single instance
+        can be shared by several transports.
+
+        :param pool_connections: Number of hosts to keep a connection pool for
+        :param pool_maxsize: Maximum number of connections kept open per host
+        :param pool_block: Wait for a free connection when all the connections of a host are busy,
+            instead of opening a new one that is discarded after the request
+        :param idle_timeout: Drop the pooled connections after being idle for this many seconds,
+            as the server has probably closed them (Default: None, never)
+        :param tcp_keepalive: Seconds of inactivity before sending TCP keep-alive probes,
+            None disables them (Default: 60)
+        :param max_retries: Retries for failed connections, as in requests' HTTPAdapter
+        """
+        self.idle_timeout = idle_timeout
+        self.tcp_keepalive = tcp_keepalive
+        self._lock = threading.Lock()
+        self._last_used = None
+        self._in_flight = 0
+        self._requests = 0
+        super(ConnectionPool, self).__init__(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=max_retries
+        )
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        if self.tcp_keepalive:
+            pool_kwargs.setdefault('socket_options', keepalive_socket_options(self.tcp_keepalive))
+        super(ConnectionPool, self).init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+
+    def send(self, request, **kwargs):
+        with self._lock:
+            if (self.idle_timeout is not None and self._last_used is not None and not self._in_flight and
+                    time.time() - self._last_used > self.idle_timeout):
+                self.poolmanager.clear()
+            self._in_flight += 1
+            self._requests += 1
+        try:
+            return super(ConnectionPool, self).send(request, **kwargs)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._last_used = time.time()
+
+    def stats(self):
+        """
+        Return the pool utilization: requests sent, requests in flight and,
+        for every host, the connections opened and the idle ones ready for reuse.
+        """
+        hosts = {}
+        pools = self.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            idle = 0
+            if pool.pool is not None:
+                idle = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+            hosts['{}://{}:{}'.format(pool.scheme, pool.host, pool.port)] = {
+                'maxsize': self._pool_maxsize,
+                'connections': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle': idle,
+            }
+
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'in_flight': self._in_flight,
+                'hosts': hosts,
+            }
@@ -2,41 +2,86 @@ from __future__ import absolute_import
 
 import requests
 from graphql.execution import ExecutionResult
-from graphql.language.printer import print_ast
+from six.moves import http_cookiejar
 
+from ..incremental import ACCEPT_INCREMENTAL, is_multipart, iter_results, merge_response
 from .http import HTTPTransport
+from .pool import ConnectionPool
+
+# Policy of the cookie jar of the stateless sessions, which never keeps the cookies of the responses
+REJECT_COOKIES = http_cookiejar.DefaultCookiePolicy(allowed_domains=[])
 
 
 class RequestsHTTPTransport(HTTPTransport):
-    def __init__(self, url, auth=None, use_json=False, timeout=None, **kwargs):
+    def __init__(self, url, auth=None, use_json=False, timeout=None, pool=None, **kwargs):
         """
         :param url: The GraphQL URL
         :param auth: Auth tuple or callable to enable Basic/Digest/Custom HTTP Auth
         :param use_json: Send request body as JSON instead of form-urlencoded
         :param timeout: Specifies a default timeout for requests (Default: None)
+        :param pool: ConnectionPool used to reuse the connections, it can be shared
+            between transports (Default: a new ConnectionPool with 10 connections)
+        :param normalize_query: Send the queries normalized and minified, see pygql.normalize (Default: False)
         """
         super(RequestsHTTPTransport, self).__init__(url, **kwargs)
         self.auth = auth
         self.default_timeout = timeout
         self.use_json = use_json
+        self.pool = pool or ConnectionPool()
+        self._own_pool = pool is None
+        self.session = self._create_session()
+        # The session is only used for its connections, every request is independent like with requests.post
+        self.session.cookies.set_policy(REJECT_COOKIES)
 
-    def execute(self, document, variable_values=None, timeout=None):
-        query_str = print_ast(document)
-        payload = {
-            'query': query_str,
-            'variables': variable_values or {}
-        }
+    def _create_session(self):
+        session = requests.Session()
+        session.mount('http://', self.pool)
+        session.mount('https://', self.pool)
+        return session
+
+    def pool_stats(self):
+        return self.pool.stats()
 
+    def close(self):
+        if not self._own_pool:
+            # The shared pool stays open for the other transports
+            self.session.adapters.clear()
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _post(self, payload, timeout=None, headers=None, stream=False):
         data_key = 'json' if self.use_json else 'data'
         post_args = {
-            'headers': self.headers,
+            'headers': dict(self.headers or {}, **headers) if headers else self.headers,
             'auth': self.auth,
             'cookies': self.cookies,
             'timeout': timeout or self.default_timeout,
+            'stream': stream,
             data_key: payload
         }
-        request = requests.post(self.url, **post_args)
+        request = self.session.post(self.url, **post_args)
         request.raise_for_status()
+        return request
+
+    def _payload(self, document, variable_values):
+        return {
+            'query': self.print_query(document),
+            'variables': variable_values or {}
+        }
+
+    def execute(self, document, variable_values=None, timeout=None):
+        request = self._post(self._payload(document, variable_values), timeout)
+
+        content_type = request.headers.get('Content-Type')
+        if is_multipart(content_type):
+            # Incremental delivery the caller didn't ask for, the payloads are merged in a result
+            result = merge_response(content_type, request.content)
+            return ExecutionResult(errors=result.errors, data=result.data)
 
         result = request.json()
         assert 'errors' in result or 'data' in result, 'Received non-compatible response "{}"'.format(result)
@@ -44,3 +89,24 @@ class RequestsHTTPTransport(HTTPTransport):
             errors=result.get('errors'),
             data=result.get('data')
         )
+
+    def execute_incremental(self, document, variable_values=None, timeout=None):
+        """
+        Execute a document using @defer or @stream, asking for the incremental delivery.
+
+        Return an iterator of the IncrementalResult merged so far, yielded as every payload
+        arrives, see pygql.incremental. A server without incremental delivery answers a single
+        result. The request is sent on its own, also by the transports batching the others.
+        """
+        request = self._post(
+            self._payload(document, variable_values), timeout, headers={'Accept': ACCEPT_INCREMENTAL}, stream=True
+        )
+        return self._iter_results(request)
+
+    @staticmethod
+    def _iter_results(request):
+        try:
+            for result in iter_results(request.headers.get('Content-Type'), request.iter_content(chunk_size=None)):
+                yield result
+        finally:
+            request.close()
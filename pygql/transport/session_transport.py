@@ -1,43 +1,84 @@
 from pygql.transport.requests import RequestsHTTPTransport
 import requests
-from graphql.language.printer import print_ast
-from graphql.execution import ExecutionResult
+import threading
+
+
+class SharedCookieJar(requests.cookies.RequestsCookieJar):
+    """
+    Cookie jar that can be used by several sessions at the same time.
+
+    Adding and extracting cookies is already locked by the CookieJar, but the
+    iteration done by requests to merge the cookies in a request isn't.
+    """
+
+    def __iter__(self):
+        with self._cookies_lock:
+            cookies = list(super(SharedCookieJar, self).__iter__())
+        return iter(cookies)
 
 
 class SessionTransport(RequestsHTTPTransport):
-    def __init__(self, url, **kwargs):
+    def __init__(self, url, per_thread_session=False, **kwargs):
         """
         :param url: The GraphQL URL
         :param auth: Auth tuple or callable to enable Basic/Digest/Custom HTTP Auth
         :param use_json: Send request body as JSON instead of form-urlencoded
         :param timeout: Specifies a default timeout for requests (Default: None)
+        :param pool: ConnectionPool used to reuse the connections, it can be shared
+            between transports (Default: a new ConnectionPool with 10 connections)
+        :param normalize_query: Send the queries normalized and minified, see pygql.normalize (Default: False)
+        :param per_thread_session: Give every thread its own session, all of them sharing
+            the connection pool, cookies and auth of the transport (Default: False)
         """
         super(SessionTransport, self).__init__(url, **kwargs)
-        self.session = requests.Session()
-        if self.cookies:
-            self.session.cookies = requests.utils.cookiejar_from_dict(self.cookies)
+        self.session.cookies = requests.utils.cookiejar_from_dict(self.cookies or {}, cookiejar=SharedCookieJar())
         if self.headers:
             self.session.headers.update(self.headers)
         self.session.auth = self.auth
 
-    def execute(self, document, variable_values=None, timeout=None):
-        query_str = print_ast(document)
-        payload = {
-            'query': query_str,
-            'variables': variable_values or {}
-        }
+        self.per_thread_session = per_thread_session
+        self._local = threading.local()
+        self._headers_lock = threading.Lock()
+        self._headers_version = 0
+
+    def update_headers(self, headers):
+        """
+        Update the headers sent in every request, including the ones of the
+        sessions already created for other threads.
+        """
+        with self._headers_lock:
+            self.session.headers.update(headers)
+            self._headers_version += 1
+
+    def get_session(self):
+        if not self.per_thread_session:
+            return self.session
 
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._create_session()
+            session.cookies = self.session.cookies
+            session.auth = self.session.auth
+            self._local.session = session
+            self._local.headers_version = None
+
+        # Only copy the headers when they changed, so the common path doesn't take the lock
+        if self._local.headers_version != self._headers_version:
+            with self._headers_lock:
+                session.headers = requests.structures.CaseInsensitiveDict(self.session.headers)
+                self._local.headers_version = self._headers_version
+        return session
+
+    def _post(self, payload, timeout=None, headers=None, stream=False):
+        # The sessions have the headers, cookies and auth of the transport
         data_key = 'json' if self.use_json else 'data'
         post_args = {
             'timeout': timeout or self.default_timeout,
+            'stream': stream,
             data_key: payload
         }
-        request = self.session.post(self.url, **post_args)
+        if headers:
+            post_args['headers'] = headers
+        request = self.get_session().post(self.url, **post_args)
         request.raise_for_status()
-
-        result = request.json()
-        assert 'errors' in result or 'data' in result, 'Received non-compatible response "{}"'.format(result)
-        return ExecutionResult(
-            errors=result.get('errors'),
-            data=result.get('data')
-        )
+        return request
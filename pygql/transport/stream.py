@@ -0,0 +1,192 @@
+import collections
+import sys
+import threading
+import time
+
+if sys.version_info >= (3, 0):
+    import asyncio
+
+# Marks the end of the stream in its queue
+_END = object()
+
+
+class StreamTimeoutError(Exception):
+    pass
+
+
+class ResultStream(object):
+    """
+    Results of a subscription, filled by the transport as the events arrive.
+
+    Iterate it to wait for the results, or use ``async for`` with asyncio.
+    The iteration ends when the subscription completes, and raises the error
+    that stopped it if any.
+    """
+
+    def __init__(self, on_close=None, maxsize=0):
+        """
+        :param on_close: Called once when the stream is closed by the consumer before its end
+        :param maxsize: Maximum number of results waiting for the consumer, put() waits for
+            room beyond it (Default: 0, no limit)
+        """
+        self.on_close = on_close
+        self.maxsize = maxsize
+        self.done = False
+        self._items = collections.deque()
+        self._condition = threading.Condition()
+        # Futures of the ``async for`` waiting for an item, with their loops
+        self._waiters = collections.deque()
+        # Callbacks of the producers waiting for room, see when_writable
+        self._writable_callbacks = []
+
+    def _full(self):
+        return bool(self.maxsize) and len(self._items) >= self.maxsize
+
+    def _add(self, item):
+        # Called with the lock, returns the callbacks to call without it
+        if self.done:
+            return ()
+        if item[0] is _END:
+            self.done = True
+        while self._waiters:
+            loop, future = self._waiters.popleft()
+            if not future.done():
+                loop.call_soon_threadsafe(self._resolve, future, item)
+                break
+        else:
+            self._items.append(item)
+        self._condition.notify_all()
+        return self._ready_callbacks()
+
+    def _ready_callbacks(self):
+        if not self._writable_callbacks or (self._full() and not self.done):
+            return ()
+        callbacks, self._writable_callbacks = self._writable_callbacks, []
+        return callbacks
+
+    @staticmethod
+    def _call(callbacks):
+        for callback in callbacks:
+            callback()
+
+    def put(self, result, timeout=None):
+        """
+        Add a result, waiting while the stream is full.
+
+        Return False, dropping the result, if the stream was closed meanwhile.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while self._full() and not self.done:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise StreamTimeoutError('No room in {} seconds.'.format(timeout))
+                self._condition.wait(remaining)
+            if self.done:
+                return False
+            callbacks = self._add((result, None))
+        self._call(callbacks)
+        return True
+
+    def when_writable(self, callback):
+        """
+        Call the callback, without arguments, once the stream has room for a
+        result or is done. It's how the producers that can't block wait.
+        """
+        with self._condition:
+            if self._full() and not self.done:
+                self._writable_callbacks.append(callback)
+                return
+        callback()
+
+    def fail(self, error):
+        with self._condition:
+            callbacks = self._add((_END, error))
+        self._call(callbacks)
+
+    def complete(self):
+        with self._condition:
+            callbacks = self._add((_END, None))
+        self._call(callbacks)
+
+    def close(self):
+        """
+        Stop the subscription, ending the iteration.
+        """
+        with self._condition:
+            if self.done:
+                return
+        if self.on_close:
+            self.on_close()
+        self.complete()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __iter__(self):
+        return self
+
+    def _pop(self):
+        # Called with the lock, the end is kept so the later iterations end too
+        item = self._items.popleft()
+        if item[0] is _END:
+            self._items.appendleft(item)
+            return item, ()
+        self._condition.notify_all()
+        return item, self._ready_callbacks()
+
+    def get(self, timeout=None):
+        """
+        Wait for the next result, return None at the end of the stream.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while not self._items:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise StreamTimeoutError('No result in {} seconds.'.format(timeout))
+                self._condition.wait(remaining)
+            (result, error), callbacks = self._pop()
+        self._call(callbacks)
+        if result is _END:
+            if error is not None:
+                raise error
+            return None
+        return result
+
+    def __next__(self):
+        result = self.get()
+        if result is None:
+            raise StopIteration
+        return result
+
+    next = __next__
+
+    def __aiter__(self):
+        return self
+
+    @staticmethod
+    def _resolve(future, item):
+        if future.done():
+            return
+        result, error = item
+        if result is not _END:
+            future.set_result(result)
+        else:
+            future.set_exception(error if error is not None else StopAsyncIteration())
+
+    def __anext__(self):
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        callbacks = ()
+        with self._condition:
+            if self._items:
+                item, callbacks = self._pop()
+                self._resolve(future, item)
+            else:
+                self._waiters.append((loop, future))
+        self._call(callbacks)
+        return future
@@ -0,0 +1,455 @@
+"""
+Subscriptions over WebSocket, with the graphql-ws protocol of
+subscriptions-transport-ws.
+
+All the subscriptions of a transport share one connection, their messages
+are told apart by their ids. When the connection is lost the transport
+connects again and restarts the active subscriptions, so their events can be
+received again from the start.
+"""
+import base64
+import hashlib
+import itertools
+import json
+import logging
+import os
+import socket
+import ssl
+import struct
+import threading
+import time
+
+from graphql.execution import ExecutionResult
+from graphql.language.printer import print_ast
+from six.moves.urllib.parse import urlparse
+
+from ..normalize import QueryPrinter
+from .stream import ResultStream
+
+log = logging.getLogger(__name__)
+
+GRAPHQL_WS = 'graphql-ws'
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xa
+
+GQL_CONNECTION_INIT = 'connection_init'
+GQL_CONNECTION_ACK = 'connection_ack'
+GQL_CONNECTION_ERROR = 'connection_error'
+GQL_CONNECTION_KEEP_ALIVE = 'ka'
+GQL_CONNECTION_TERMINATE = 'connection_terminate'
+GQL_START = 'start'
+GQL_DATA = 'data'
+GQL_ERROR = 'error'
+GQL_COMPLETE = 'complete'
+GQL_STOP = 'stop'
+
+
+class WebSocketError(Exception):
+    pass
+
+
+class WebSocketClosedError(WebSocketError):
+    def __init__(self, code=None, reason=''):
+        message = 'The WebSocket connection was closed'
+        if code is not None:
+            message += ' ({}{})'.format(code, ': ' + reason if reason else '')
+        super(WebSocketClosedError, self).__init__(message)
+        self.code = code
+        self.reason = reason
+
+
+class SubscriptionError(Exception):
+    """The server stopped a subscription with an error"""
+    def __init__(self, payload):
+        message = payload.get('message') if isinstance(payload, dict) else None
+        super(SubscriptionError, self).__init__(message or str(payload))
+        self.payload = payload
+
+
+def accept_key(key):
+    """
+    Return the Sec-WebSocket-Accept a server answers to the Sec-WebSocket-Key.
+    """
+    digest = hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+if hasattr(int, 'from_bytes'):
+    def _mask(payload, key):
+        length = len(payload)
+        key = (key * (length // 4 + 1))[:length]
+        return (int.from_bytes(payload, 'big') ^ int.from_bytes(key, 'big')).to_bytes(length, 'big')
+else:
+    def _mask(payload, key):
+        data = bytearray(payload)
+        key = bytearray(key)
+        for index in range(len(data)):
+            data[index] ^= key[index % 4]
+        return bytes(data)
+
+
+def encode_frame(opcode, payload, mask=True):
+    """
+    Return a final frame with the payload. The clients mask their frames,
+    the servers don't.
+    """
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126)
+        header.extend(struct.pack('!H', length))
+    else:
+        header.append(mask_bit | 127)
+        header.extend(struct.pack('!Q', length))
+    if mask:
+        key = os.urandom(4)
+        header.extend(key)
+        payload = _mask(payload, key)
+    return bytes(header) + payload
+
+
+def _read_exactly(rfile, size):
+    data = rfile.read(size) if size else b''
+    if len(data) < size:
+        raise WebSocketClosedError()
+    return data
+
+
+def read_frame(rfile):
+    """
+    Read a frame, return a (final, opcode, payload) tuple.
+    """
+    first, second = bytearray(_read_exactly(rfile, 2))
+    length = second & 0x7f
+    if length == 126:
+        length, = struct.unpack('!H', _read_exactly(rfile, 2))
+    elif length == 127:
+        length, = struct.unpack('!Q', _read_exactly(rfile, 8))
+    key = _read_exactly(rfile, 4) if second & 0x80 else None
+    payload = _read_exactly(rfile, length)
+    if key and payload:
+        payload = _mask(payload, key)
+    return bool(first & 0x80), first & 0x0f, payload
+
+
+class WebSocket(object):
+
+    def __init__(self, sock, rfile=None, mask=True, subprotocol=None):
+        """
+        A WebSocket connection (RFC 6455) on a connected socket.
+
+        :param sock: The socket, after the opening handshake
+        :param rfile: Buffered file reading the socket (Default: a new one)
+        :param mask: Mask the frames sent, as the clients must do (Default: True)
+        :param subprotocol: The subprotocol agreed in the handshake
+        """
+        self.sock = sock
+        self.rfile = rfile or sock.makefile('rb')
+        self.mask = mask
+        self.subprotocol = subprotocol
+        self.closed = False
+        self._send_lock = threading.Lock()
+
+    @classmethod
+    def connect(cls, url, headers=None, subprotocols=(GRAPHQL_WS,), timeout=10):
+        """
+        Open a WebSocket connection to a ws:// or wss:// URL.
+        """
+        parsed = urlparse(url)
+        assert parsed.scheme in ('ws', 'wss'), 'The WebSocket URL must be ws:// or wss://, not {}'.format(url)
+        secure = parsed.scheme == 'wss'
+        sock = socket.create_connection((parsed.hostname, parsed.port or (443 if secure else 80)), timeout)
+        if secure:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parsed.hostname)
+
+        key = base64.b64encode(os.urandom(16)).decode('ascii')
+        lines = [
+            'GET {}{} HTTP/1.1'.format(parsed.path or '/', '?' + parsed.query if parsed.query else ''),
+            'Host: {}'.format(parsed.netloc),
+            'Upgrade: websocket',
+            'Connection: Upgrade',
+            'Sec-WebSocket-Key: {}'.format(key),
+            'Sec-WebSocket-Version: 13',
+        ]
+        if subprotocols:
+            lines.append('Sec-WebSocket-Protocol: {}'.format(', '.join(subprotocols)))
+        lines.extend('{}: {}'.format(name, value) for name, value in (headers or {}).items())
+        websocket = cls(sock)
+        try:
+            sock.sendall(('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8'))
+            status = websocket.rfile.readline().decode('latin-1').strip()
+            response_headers = {}
+            while True:
+                line = websocket.rfile.readline().decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                response_headers[name.strip().lower()] = value.strip()
+
+            if status.split(' ')[1:2] != ['101']:
+                raise WebSocketError('The server refused the WebSocket connection: {}'.format(status))
+            if response_headers.get('sec-websocket-accept') != accept_key(key):
+                raise WebSocketError('The server answered a wrong Sec-WebSocket-Accept')
+        except Exception:
+            websocket.close()
+            raise
+        websocket.subprotocol = response_headers.get('sec-websocket-protocol')
+        return websocket
+
+    def _send(self, opcode, payload):
+        frame = encode_frame(opcode, payload, self.mask)
+        with self._send_lock:
+            self.sock.sendall(frame)
+
+    def send_text(self, text):
+        self._send(OPCODE_TEXT, text.encode('utf-8'))
+
+    def recv(self):
+        """
+        Wait for the next message, a text or the bytes of a binary message.
+        The pings are answered meanwhile.
+        """
+        message = b''
+        opcode = OPCODE_TEXT
+        while True:
+            final, frame_opcode, payload = read_frame(self.rfile)
+            if frame_opcode == OPCODE_PING:
+                self._send(OPCODE_PONG, payload)
+                continue
+            if frame_opcode == OPCODE_PONG:
+                continue
+            if frame_opcode == OPCODE_CLOSE:
+                code, = struct.unpack('!H', payload[:2]) if len(payload) >= 2 else (None,)
+                self.close(code)
+                raise WebSocketClosedError(code, payload[2:].decode('utf-8', 'replace'))
+            if frame_opcode != OPCODE_CONTINUATION:
+                opcode = frame_opcode
+            message += payload
+            if final:
+                return message.decode('utf-8') if opcode == OPCODE_TEXT else message
+
+    def close(self, code=1000):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if code is not None:
+                self._send(OPCODE_CLOSE, struct.pack('!H', code))
+        except (socket.error, ValueError):
+            pass
+        try:
+            # Wakes up the thread waiting for a message
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except (socket.error, ValueError):
+            pass
+        self.sock.close()
+
+
+class WebSocketTransport(object):
+
+    def __init__(self, url, headers=None, init_payload=None, timeout=10, keep_alive_timeout=None, reconnect=True,
+                 max_reconnect_attempts=5, reconnect_delay=0.1, max_reconnect_delay=10, normalize_query=False):
+        """
+        :param url: The GraphQL ws:// or wss:// URL
+        :param headers: Headers of the opening handshake
+        :param init_payload: Payload of the connection_init message, e.g. the credentials
+        :param timeout: Seconds to wait for the connection and for the result of execute (Default: 10)
+        :param keep_alive_timeout: Consider the connection lost if nothing, not even a keep alive,
+            is received in this number of seconds (Default: None, no limit)
+        :param reconnect: Connect again and restart the active subscriptions when the connection
+            is lost, instead of stopping them with an error (Default: True)
+        :param max_reconnect_attempts: Attempts to connect again before giving up (Default: 5)
+        :param reconnect_delay: Seconds before the first attempt, doubled after every failure (Default: 0.1)
+        :param max_reconnect_delay: Maximum seconds between two attempts (Default: 10)
+        :param normalize_query: Send the queries normalized and minified, see pygql.normalize (Default: False)
+        """
+        self.url = url
+        self.headers = headers
+        self.init_payload = init_payload
+        self.timeout = timeout
+        self.keep_alive_timeout = keep_alive_timeout
+        self.reconnect = reconnect
+        self.max_reconnect_attempts = max_reconnect_attempts
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.query_printer = QueryPrinter() if normalize_query else print_ast
+        self.websocket = None
+        # Operation id to the (payload, ResultStream) of the active subscriptions
+        self.subscriptions = {}
+        self.closed = False
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def print_query(self, document):
+        return self.query_printer(document)
+
+    def _connect(self):
+        websocket = WebSocket.connect(self.url, self.headers, timeout=self.timeout)
+        try:
+            self._send(websocket, GQL_CONNECTION_INIT, payload=self.init_payload or {})
+            while True:
+                message = json.loads(websocket.recv())
+                if message.get('type') == GQL_CONNECTION_ACK:
+                    break
+                if message.get('type') == GQL_CONNECTION_ERROR:
+                    raise WebSocketError('The server refused the connection: {}'.format(message.get('payload')))
+            websocket.sock.settimeout(self.keep_alive_timeout)
+        except Exception:
+            websocket.close()
+            raise
+
+        reader = threading.Thread(target=self._read, args=(websocket,), name='pygql-websocket-reader')
+        reader.daemon = True
+        reader.start()
+        return websocket
+
+    def _get_websocket(self):
+        # Called with the lock, the connection is opened on the first use
+        if self.closed:
+            raise WebSocketError('The transport is closed.')
+        if self.websocket is None:
+            self.websocket = self._connect()
+        return self.websocket
+
+    @staticmethod
+    def _send(websocket, message_type, operation_id=None, payload=None):
+        message = {'type': message_type}
+        if operation_id is not None:
+            message['id'] = operation_id
+        if payload is not None:
+            message['payload'] = payload
+        websocket.send_text(json.dumps(message))
+
+    def subscribe(self, document, variable_values=None, operation_name=None):
+        """
+        Start a subscription, return the ResultStream of its ExecutionResults.
+        """
+        payload = {
+            'query': self.print_query(document),
+            'variables': variable_values or {},
+            'operationName': operation_name
+        }
+        with self._lock:
+            websocket = self._get_websocket()
+            operation_id = str(next(self._ids))
+            stream = ResultStream(on_close=lambda: self._stop(operation_id))
+            self.subscriptions[operation_id] = payload, stream
+            try:
+                self._send(websocket, GQL_START, operation_id, payload)
+            except socket.error:
+                # The reader finds the connection lost, and starts it again once reconnected
+                log.debug('Could not start the subscription %s', operation_id, exc_info=True)
+        return stream
+
+    def execute(self, document, variable_values=None, operation_name=None, timeout=None):
+        with self.subscribe(document, variable_values, operation_name) as stream:
+            result = stream.get(timeout or self.timeout)
+        if result is None:
+            raise WebSocketError('The server completed the operation without a result.')
+        return result
+
+    def _stop(self, operation_id):
+        with self._lock:
+            if self.subscriptions.pop(operation_id, None) is None or self.websocket is None:
+                return
+            try:
+                self._send(self.websocket, GQL_STOP, operation_id)
+            except socket.error:
+                log.debug('Could not stop the subscription %s', operation_id, exc_info=True)
+
+    def _read(self, websocket):
+        try:
+            while True:
+                self._dispatch(json.loads(websocket.recv()))
+        except (socket.error, WebSocketError, ValueError) as e:
+            error = e
+        self._connection_lost(websocket, error)
+
+    def _dispatch(self, message):
+        message_type = message.get('type')
+        with self._lock:
+            if message_type in (GQL_ERROR, GQL_COMPLETE):
+                entry = self.subscriptions.pop(message.get('id'), None)
+            else:
+                entry = self.subscriptions.get(message.get('id'))
+        if entry is None:
+            # A keep alive, or a late message of a stopped subscription
+            return
+
+        stream = entry[1]
+        payload = message.get('payload') or {}
+        if message_type == GQL_DATA:
+            stream.put(ExecutionResult(data=payload.get('data'), errors=payload.get('errors')))
+        elif message_type == GQL_ERROR:
+            stream.fail(SubscriptionError(payload))
+        elif message_type == GQL_COMPLETE:
+            stream.complete()
+
+    def _connection_lost(self, websocket, error):
+        with self._lock:
+            if self.websocket is not websocket:
+                # Closed by close()
+                return
+            self.websocket = None
+            active = bool(self.subscriptions)
+        websocket.close(None)
+        if not active:
+            # The next subscription connects again
+            return
+
+        if self.reconnect:
+            delay = self.reconnect_delay
+            for attempt in range(self.max_reconnect_attempts):
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                with self._lock:
+                    if self.closed:
+                        return
+                    try:
+                        websocket = self._get_websocket()
+                        for operation_id, (payload, stream) in self.subscriptions.items():
+                            self._send(websocket, GQL_START, operation_id, payload)
+                        return
+                    except (socket.error, WebSocketError, ValueError) as e:
+                        # A failed start is a lost connection too, handled by the new reader
+                        if self.websocket is not None:
+                            return
+                        error = e
+                        log.debug('Could not connect again (attempt %s)', attempt + 1, exc_info=True)
+
+        with self._lock:
+            subscriptions, self.subscriptions = self.subscriptions, {}
+        for payload, stream in subscriptions.values():
+            stream.fail(WebSocketError('The connection was lost: {}'.format(error)))
+
+    def close(self):
+        """
+        Close the connection, completing the active subscriptions.
+        """
+        with self._lock:
+            self.closed = True
+            websocket, self.websocket = self.websocket, None
+            subscriptions, self.subscriptions = self.subscriptions, {}
+        if websocket is not None:
+            try:
+                self._send(websocket, GQL_CONNECTION_TERMINATE)
+            except socket.error:
+                pass
+            websocket.close()
+        for payload, stream in subscriptions.values():
+            stream.complete()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
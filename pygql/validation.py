@@ -0,0 +1,402 @@
+import collections
+import hashlib
+import threading
+
+import six
+
+from graphql.error import GraphQLError
+from graphql.language import ast
+from graphql.language.printer import print_ast
+from graphql.language.visitor import ParallelVisitor, TypeInfoVisitor, Visitor, visit
+from graphql.language.visitor_meta import QUERY_DOCUMENT_KEYS
+from graphql.type import get_named_type
+from graphql.utils.type_info import TypeInfo
+from graphql.validation.rules import (ArgumentsOfCorrectType, FieldsOnCorrectType, FragmentsOnCompositeTypes,
+                                      KnownArgumentNames, KnownDirectives, KnownFragmentNames, KnownTypeNames,
+                                      NoUndefinedVariables, NoUnusedFragments, NoUnusedVariables,
+                                      OverlappingFieldsCanBeMerged, PossibleFragmentSpreads,
+                                      ProvidedNonNullArguments, ScalarLeafs, UniqueArgumentNames,
+                                      UniqueInputFieldNames, VariablesInAllowedPosition, specified_rules)
+from graphql.validation.validation import ValidationContext
+
+# The rules checking the document against the schema, without the ones comparing every
+# pair of fields or following the variables and fragments through the whole document
+CHEAP_RULES = [rule for rule in specified_rules if rule not in (
+    NoUndefinedVariables,
+    NoUnusedFragments,
+    NoUnusedVariables,
+    OverlappingFieldsCanBeMerged,
+    VariablesInAllowedPosition,
+)]
+
+RULE_SETS = {
+    'all': specified_rules,
+    'cheap': CHEAP_RULES,
+    'none': [],
+}
+
+# Rules whose errors in a fragment only depend on the fragment and the fragments it spreads,
+# the rest check the document as a whole (e.g. unused fragments or variables)
+FRAGMENT_RULES = frozenset([
+    ArgumentsOfCorrectType,
+    FieldsOnCorrectType,
+    FragmentsOnCompositeTypes,
+    KnownArgumentNames,
+    KnownDirectives,
+    KnownFragmentNames,
+    KnownTypeNames,
+    OverlappingFieldsCanBeMerged,
+    PossibleFragmentSpreads,
+    ProvidedNonNullArguments,
+    ScalarLeafs,
+    UniqueArgumentNames,
+    UniqueInputFieldNames,
+])
+
+
+class ValidationError(Exception):
+    """Exception with all the errors found validating a document"""
+    def __init__(self, errors):
+        super(ValidationError, self).__init__('\n'.join(str(error) for error in errors))
+        self.errors = errors
+
+
+def get_rules(rules):
+    """
+    Return the validation rules of a rule set name of RULE_SETS, or the given
+    list of rules.
+    """
+    if isinstance(rules, six.string_types):
+        assert rules in RULE_SETS, 'Unknown validation rule set "{}", use one of: {}'.format(
+            rules, ', '.join(sorted(RULE_SETS))
+        )
+        return RULE_SETS[rules]
+    return list(rules)
+
+
+class OperationTypeInfo(TypeInfo):
+    """
+    TypeInfo knowing the type of the subscriptions too, so they are
+    validated like the queries and mutations.
+    """
+    __slots__ = ()
+
+    def enter_OperationDefinition(self, node):
+        if node.operation == 'subscription':
+            self._type_stack.append(self._schema.get_subscription_type())
+        else:
+            super(OperationTypeInfo, self).enter_OperationDefinition(node)
+
+
+class TypeNameCollector(Visitor):
+    """
+    Collects the names of the types a document depends on, including the
+    names it refers to that are not in the schema.
+    """
+    __slots__ = 'type_info', 'type_names'
+
+    def __init__(self, type_info):
+        self.type_info = type_info
+        self.type_names = set()
+
+    def enter(self, node, key, parent, path, ancestors):
+        if isinstance(node, ast.NamedType):
+            self.type_names.add(node.name.value)
+        for type in (self.type_info.get_parent_type(), self.type_info.get_type(), self.type_info.get_input_type()):
+            if type is not None:
+                self.type_names.add(get_named_type(type).name)
+
+
+class SkipFragments(Visitor):
+    """
+    Hides the fragment definitions from a visitor.
+    """
+    __slots__ = 'visitor',
+
+    def __init__(self, visitor):
+        self.visitor = visitor
+
+    def enter(self, node, key, parent, path, ancestors):
+        if isinstance(node, ast.FragmentDefinition):
+            return False
+        return self.visitor.enter(node, key, parent, path, ancestors)
+
+    def leave(self, node, key, parent, path, ancestors):
+        return self.visitor.leave(node, key, parent, path, ancestors)
+
+
+class FragmentHeaders(Visitor):
+    """
+    Shows the fragment definitions to a visitor, but not their selections.
+    """
+    __slots__ = 'visitor',
+
+    def __init__(self, visitor):
+        self.visitor = visitor
+
+    def enter(self, node, key, parent, path, ancestors):
+        if isinstance(node, ast.FragmentDefinition):
+            result = self.visitor.enter(node, key, parent, path, ancestors)
+            self.visitor.leave(node, key, parent, path, ancestors)
+            return False if result is None else result
+        return self.visitor.enter(node, key, parent, path, ancestors)
+
+    def leave(self, node, key, parent, path, ancestors):
+        return self.visitor.leave(node, key, parent, path, ancestors)
+
+
+class OnlyDefinition(Visitor):
+    """
+    Hides from a visitor every fragment definition but one.
+    """
+    __slots__ = 'visitor', 'definition'
+
+    def __init__(self, visitor, definition):
+        self.visitor = visitor
+        self.definition = definition
+
+    def enter(self, node, key, parent, path, ancestors):
+        if isinstance(node, ast.FragmentDefinition) and node is not self.definition:
+            return False
+        return self.visitor.enter(node, key, parent, path, ancestors)
+
+    def leave(self, node, key, parent, path, ancestors):
+        return self.visitor.leave(node, key, parent, path, ancestors)
+
+
+def _source(node):
+    if node.loc and node.loc.source:
+        return node.loc.source.body[node.loc.start:node.loc.end]
+    return print_ast(node)
+
+
+def _spread_names(selection_set, names):
+    for selection in selection_set.selections:
+        if isinstance(selection, ast.FragmentSpread):
+            names.add(selection.name.value)
+        elif selection.selection_set:
+            _spread_names(selection.selection_set, names)
+    return names
+
+
+def fragment_closure(fragment, fragments):
+    """
+    Return the names of the fragments spread by a fragment, directly or not.
+    """
+    closure = set()
+    pending = [fragment]
+    while pending:
+        for name in _spread_names(pending.pop().selection_set, set()):
+            if name not in closure:
+                closure.add(name)
+                if name in fragments:
+                    pending.append(fragments[name])
+    closure.discard(fragment.name.value)
+    return closure
+
+
+def fragment_key(fragment, fragments, closure):
+    key = hashlib.sha1(_source(fragment).encode('utf-8'))
+    for name in sorted(closure):
+        key.update(b'\0')
+        key.update(_source(fragments[name]).encode('utf-8') if name in fragments else name.encode('utf-8'))
+    return key.hexdigest()
+
+
+def validate_fragment(schema, fragment, fragments, closure, rules):
+    """
+    Validate a fragment with the rules of FRAGMENT_RULES, in a document with
+    only the fragments it spreads.
+    """
+    document = ast.Document(definitions=[fragment] + [fragments[name] for name in closure if name in fragments])
+    type_info = OperationTypeInfo(schema)
+    context = ValidationContext(schema, document, type_info)
+    collector = TypeNameCollector(type_info)
+    visitors = [rule(context) for rule in rules]
+    visitors.append(collector)
+    visit(document, OnlyDefinition(TypeInfoVisitor(type_info, ParallelVisitor(visitors)), fragment))
+    return context.get_errors(), collector.type_names
+
+
+def _node_paths(definition):
+    """
+    Return the path of attribute names and list indexes from the definition
+    to each of its nodes, by node id.
+    """
+    paths = {}
+    pending = [(definition, ())]
+    while pending:
+        node, path = pending.pop()
+        paths[id(node)] = path
+        for key in QUERY_DOCUMENT_KEYS.get(type(node), ()):
+            value = getattr(node, key)
+            if isinstance(value, list):
+                pending.extend((item, path + (key, index)) for index, item in enumerate(value)
+                               if isinstance(item, ast.Node))
+            elif isinstance(value, ast.Node):
+                pending.append((value, path + (key,)))
+    return paths
+
+
+def relative_errors(errors, definitions):
+    """
+    Return the errors as (message, [(fragment name, node path)]), so they can be
+    located in other documents with the same fragments. None if a node of the
+    errors is not in the fragments.
+    """
+    paths = {}
+    for definition in definitions:
+        for node_id, path in _node_paths(definition).items():
+            paths[node_id] = (definition.name.value, path)
+
+    relative = []
+    for error in errors:
+        nodes = error.nodes or []
+        if (not nodes and error.positions) or any(id(node) not in paths for node in nodes):
+            return None
+        relative.append((error.message, [paths[id(node)] for node in nodes]))
+    return relative
+
+
+def _resolve(node, path):
+    for step in path:
+        node = node[step] if isinstance(step, int) else getattr(node, step)
+    return node
+
+
+def located_errors(errors, fragments):
+    """
+    Return the GraphQLErrors of the relative_errors, located in the fragments of a document.
+    """
+    return [
+        GraphQLError(message, [_resolve(fragments[name], path) for name, path in nodes] or None)
+        for message, nodes in errors
+    ]
+
+
+def _sorted_errors(errors):
+    # In the order of the document, whether the fragments were cached or not
+    return sorted(errors, key=lambda error: error.positions[0] if error.positions else float('inf'))
+
+
+def validate_document(schema, document, rules=specified_rules, fragment_cache=None, generation=None):
+    """
+    Validate the document like graphql.validation.validate, returning the
+    errors and the names of the types it depends on.
+
+    With a fragment_cache (a ValidationCache), the fragments already validated
+    in other documents are not validated again, only their usage in this one.
+    Their errors are kept relative to the fragments, and located in this document.
+    The generation is the one of the fragment_cache when the schema was read,
+    by default its current one. The errors are in the order of the document.
+    """
+    fragments = {}
+    for definition in document.definitions:
+        if isinstance(definition, ast.FragmentDefinition):
+            fragments.setdefault(definition.name.value, definition)
+
+    fragment_rules = [rule for rule in rules if rule in FRAGMENT_RULES]
+    cached = fragment_cache is not None and fragments and fragment_rules and \
+        len(fragments) == sum(isinstance(definition, ast.FragmentDefinition) for definition in document.definitions)
+    if not cached:
+        type_info = OperationTypeInfo(schema)
+        context = ValidationContext(schema, document, type_info)
+        collector = TypeNameCollector(type_info)
+        visitors = [rule(context) for rule in rules]
+        visitors.append(collector)
+        visit(document, TypeInfoVisitor(type_info, ParallelVisitor(visitors)))
+        return _sorted_errors(context.get_errors()), collector.type_names
+
+    if generation is None:
+        generation = fragment_cache.generation
+    fragment_errors = []
+    type_names = set()
+    for fragment in fragments.values():
+        closure = fragment_closure(fragment, fragments)
+        key = fragment_key(fragment, fragments, closure)
+        entry = fragment_cache.get_entry(key)
+        if entry is None:
+            errors, names = validate_fragment(schema, fragment, fragments, closure, fragment_rules)
+            relative = relative_errors(errors, [fragment] + [fragments[name] for name in closure if name in fragments])
+            # The errors that can't be located in other documents are not cached
+            if relative is not None:
+                fragment_cache.put(key, relative, names, generation)
+        else:
+            errors, names = located_errors(entry[0], fragments), entry[1]
+        fragment_errors.extend(errors)
+        type_names.update(names)
+
+    # The operations are validated with all the rules, the fragments only with the document rules
+    type_info = OperationTypeInfo(schema)
+    context = ValidationContext(schema, document, type_info)
+    collector = TypeNameCollector(type_info)
+    visitors = [SkipFragments(rule(context)) if rule in FRAGMENT_RULES else rule(context) for rule in rules]
+    visitors.append(collector)
+    visit(document, FragmentHeaders(TypeInfoVisitor(type_info, ParallelVisitor(visitors))))
+    type_names.update(collector.type_names)
+    return _sorted_errors(context.get_errors() + fragment_errors), type_names
+
+
+class ValidationCache(object):
+    def __init__(self, maxsize=1024):
+        """
+        Least recently used cache of the validation errors of the documents,
+        which are compared by identity.
+
+        :param maxsize: Maximum number of documents kept
+        """
+        self.maxsize = maxsize
+        self.generation = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, document):
+        """
+        Return the validation errors of the document, or None if not cached.
+        """
+        entry = self.get_entry(document)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, document):
+        """
+        Return the validation errors of the document and the names of the
+        types it depends on, or None if not cached.
+        """
+        with self._lock:
+            entry = self._entries.pop(document, None)
+            if entry is not None:
+                self._entries[document] = entry
+            return entry
+
+    def put(self, document, errors, type_names, generation):
+        """
+        Cache the errors of a document validated when the cache was in the
+        given generation, unless it has been invalidated since then.
+        """
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[document] = (errors, frozenset(type_names))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, type_names=None):
+        """
+        Remove the documents depending on any of the types, or all of them
+        when type_names is None. Return the number of documents removed.
+        """
+        with self._lock:
+            self.generation += 1
+            if type_names is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+
+            type_names = set(type_names)
+            stale = [document for document, (_, names) in self._entries.items() if not names.isdisjoint(type_names)]
+            for document in stale:
+                del self._entries[document]
+            return len(stale)
@@ -4,7 +4,7 @@ from setuptools import setup, find_packages
 install_requires = [
     'six>=1.10.0',
     'graphql-core~=1.1',
-    'promise>=0.4.0'
+    'promise>=2.0'
 ]
 
 if sys.version_info < (3, 5):
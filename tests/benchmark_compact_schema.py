@@ -0,0 +1,51 @@
+"""
+Compares the load time of a large schema from its introspection and from its
+compact serialization.
+
+Run it with: python -m tests.benchmark_compact_schema [number of types]
+"""
+import json
+import sys
+import timeit
+
+from graphql import build_ast_schema, build_client_schema, graphql, parse
+from graphql.utils.introspection_query import introspection_query
+
+from pygql.compact_schema import dumps_schema, loads_schema
+
+
+def generate_type_def(types):
+    definitions = [
+        'schema { query: Query }',
+        'interface Node { id: ID! }',
+        'enum Color { RED GREEN BLUE }',
+        'input Filter { name: String, color: Color = RED, tags: [String!] }',
+        'type Query { node(id: ID!): Node ' + ' '.join(
+            'list{0}(first: Int = 10, filter: Filter): [Type{0}]'.format(index) for index in range(0, types, 10)
+        ) + ' }',
+    ]
+    for index in range(types):
+        fields = ' '.join('field{}(arg: String = "value"): String'.format(field) for field in range(8))
+        definitions.append('type Type{} implements Node {{ id: ID! {} color: Color next: Type{} }}'.format(
+            index, fields, index % 10
+        ))
+    return '\n'.join(definitions)
+
+
+def main(types=3000, number=3):
+    schema = build_ast_schema(parse(generate_type_def(types)))
+    introspection_json = json.dumps(graphql(schema, introspection_query).data)
+    compact = dumps_schema(schema)
+
+    introspection = min(timeit.repeat(
+        lambda: build_client_schema(json.loads(introspection_json)), repeat=number, number=1
+    ))
+    compiled = min(timeit.repeat(lambda: loads_schema(compact), repeat=number, number=1))
+    print('types:         {}'.format(types))
+    print('introspection: {:.1f} ms ({} KB)'.format(introspection * 1000, len(introspection_json) // 1024))
+    print('compact:       {:.1f} ms ({} KB)'.format(compiled * 1000, len(compact) // 1024))
+    print('speedup:       {:.1f}x'.format(introspection / compiled))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,244 @@
+import json
+import socket
+import threading
+
+import pytest
+from graphql import graphql
+from graphql.error import format_error
+from six.moves import BaseHTTPServer, socketserver
+
+from pygql.transport.websocket import GRAPHQL_WS, WebSocket, WebSocketError, accept_key
+
+from .starwars.schema import StarWarsSchema
+
+
+def execute_payload(payload):
+    if isinstance(payload, list):
+        return [execute_payload(item) for item in payload]
+
+    result = graphql(StarWarsSchema, payload['query'], variable_values=payload.get('variables'))
+    response = {'data': result.data}
+    if result.errors:
+        response['errors'] = [format_error(error) for error in result.errors]
+    return response
+
+
+class GraphQLRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):  # noqa
+        length = int(self.headers['Content-Length'])
+        payload = json.loads(self.rfile.read(length).decode('utf-8'))
+        with self.server.lock:
+            self.server.requests.append(payload)
+            self.server.request_headers.append(dict(self.headers))
+            self.server.client_addresses.add(self.client_address)
+
+        handler = self.server.handler or execute_payload
+        status, response = 200, handler(payload)
+        if isinstance(response, tuple):
+            status, response = response
+        if isinstance(response, Multipart):
+            return self.send_multipart(response)
+
+        body = json.dumps(response).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in self.server.response_headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_multipart(self, multipart):
+        self.send_response(200)
+        self.send_header('Content-Type', 'multipart/mixed; boundary="{}"'.format(multipart.boundary))
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for chunk in multipart.chunks():
+            if chunk:
+                self.wfile.write('{:x}\r\n'.format(len(chunk)).encode('ascii') + chunk + b'\r\n')
+                self.wfile.flush()
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, *args):
+        pass
+
+
+class Multipart(object):
+    """
+    Response of the incremental delivery of the payloads, an iterable of dicts
+    (or of callables, called before the next part is sent).
+    """
+
+    def __init__(self, payloads, boundary='-'):
+        self.payloads = payloads
+        self.boundary = boundary
+
+    def chunks(self):
+        delimiter = '\r\n--{}'.format(self.boundary).encode('ascii')
+        yield delimiter[2:]
+        for payload in self.payloads:
+            if callable(payload):
+                payload()
+                continue
+            yield b'\r\nContent-Type: application/json; charset=utf-8\r\n\r\n' + \
+                json.dumps(payload).encode('utf-8') + delimiter
+        yield b'--\r\n'
+
+
+class GraphQLServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), GraphQLRequestHandler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.request_headers = []
+        self.client_addresses = set()
+        # Callable receiving the payload and returning the response or a (status, response) tuple
+        self.handler = None
+        # Extra headers of the JSON responses
+        self.response_headers = {}
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}/graphql'.format(self.server_address[1])
+
+
+@pytest.fixture
+def graphql_server():
+    server = GraphQLServer()
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01})
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class WebSocketRequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        self.rfile.readline()
+        headers = {}
+        while True:
+            line = self.rfile.readline().decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        self.request.sendall((
+            'HTTP/1.1 101 Switching Protocols\r\n'
+            'Upgrade: websocket\r\n'
+            'Connection: Upgrade\r\n'
+            'Sec-WebSocket-Accept: {}\r\n'
+            'Sec-WebSocket-Protocol: {}\r\n\r\n'
+        ).format(accept_key(headers['sec-websocket-key']), GRAPHQL_WS).encode('latin-1'))
+
+        websocket = WebSocket(self.request, self.rfile, mask=False, subprotocol=GRAPHQL_WS)
+        with self.server.lock:
+            self.server.websockets.append(websocket)
+            self.server.request_headers.append(headers)
+        # Operation id to the event set when it's stopped
+        operations = {}
+        try:
+            while True:
+                message = json.loads(websocket.recv())
+                with self.server.lock:
+                    self.server.messages.append(message)
+                if message['type'] == 'connection_init':
+                    if self.server.connection_error:
+                        error = {'type': 'connection_error', 'payload': self.server.connection_error}
+                        self.server.send(websocket, error)
+                    else:
+                        self.server.send(websocket, {'type': 'ka'})
+                        self.server.send(websocket, {'type': 'connection_ack'})
+                elif message['type'] == 'start':
+                    operations[message['id']] = stopped = threading.Event()
+                    thread = threading.Thread(
+                        target=self.server.run_operation, args=(websocket, message['id'], message['payload'], stopped)
+                    )
+                    thread.daemon = True
+                    thread.start()
+                elif message['type'] == 'stop':
+                    operations.pop(message['id']).set()
+                elif message['type'] == 'connection_terminate':
+                    break
+        except (socket.error, WebSocketError, ValueError):
+            pass
+        finally:
+            for stopped in operations.values():
+                stopped.set()
+            websocket.close()
+
+
+class WebSocketServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        socketserver.TCPServer.__init__(self, ('127.0.0.1', 0), WebSocketRequestHandler)
+        self.lock = threading.Lock()
+        self.websockets = []
+        self.messages = []
+        self.request_headers = []
+        # Callable receiving the start payload and returning an iterable of results
+        self.handler = None
+        # Payload of the connection_error sent instead of the connection_ack
+        self.connection_error = None
+
+    @property
+    def url(self):
+        return 'ws://127.0.0.1:{}/graphql'.format(self.server_address[1])
+
+    def messages_of_type(self, message_type):
+        with self.lock:
+            return [message for message in self.messages if message['type'] == message_type]
+
+    @staticmethod
+    def send(websocket, message):
+        websocket.send_text(json.dumps(message))
+
+    def run_operation(self, websocket, operation_id, payload, stopped):
+        handler = self.handler or (lambda payload: [execute_payload(payload)])
+        try:
+            try:
+                for result in handler(payload):
+                    if stopped.is_set():
+                        return
+                    self.send(websocket, {'id': operation_id, 'type': 'data', 'payload': result})
+            except (socket.error, WebSocketError):
+                raise
+            except Exception as e:
+                self.send(websocket, {'id': operation_id, 'type': 'error', 'payload': {'message': str(e)}})
+                return
+            if not stopped.is_set():
+                self.send(websocket, {'id': operation_id, 'type': 'complete'})
+        except (socket.error, WebSocketError):
+            pass
+
+    def drop_connections(self):
+        """
+        Close the connections without the closing handshake, as a network failure.
+        """
+        with self.lock:
+            websockets, self.websockets = self.websockets, []
+        for websocket in websockets:
+            try:
+                websocket.sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+
+@pytest.fixture
+def websocket_server():
+    server = WebSocketServer()
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01})
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.drop_connections()
+    server.server_close()
@@ -0,0 +1,49 @@
+"""
+Compares the interpreted and compiled execution of LocalSchemaTransport.
+
+Run it with: python -m tests.starwars.benchmark_local_schema
+"""
+import timeit
+
+from pygql import gql
+from pygql.transport.local_schema import LocalSchemaTransport
+
+from .schema import StarWarsSchema
+
+QUERY = gql('''
+    query NestedQueryWithFragment($episode: Episode) {
+      hero(episode: $episode) {
+        ...NameAndAppearances
+        friends {
+          ...NameAndAppearances
+          friends {
+            ...NameAndAppearances
+          }
+        }
+      }
+    }
+    fragment NameAndAppearances on Character {
+      name
+      appearsIn
+    }
+''')
+
+
+def benchmark(compiled, number):
+    transport = LocalSchemaTransport(StarWarsSchema, compiled=compiled)
+    variable_values = {'episode': 'EMPIRE'}
+    assert not transport.execute(QUERY, variable_values=variable_values).errors
+    timer = timeit.Timer(lambda: transport.execute(QUERY, variable_values=variable_values))
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def main(number=500):
+    interpreted = benchmark(False, number)
+    compiled = benchmark(True, number)
+    print('interpreted: {:.3f} ms'.format(interpreted * 1000))
+    print('compiled:    {:.3f} ms'.format(compiled * 1000))
+    print('speedup:     {:.2f}x'.format(interpreted / compiled))
+
+
+if __name__ == '__main__':
+    main()
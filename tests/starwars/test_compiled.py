@@ -0,0 +1,62 @@
+from pygql import Client, gql
+from pygql.compiled import CompiledQueryCache
+from pygql.transport.local_schema import LocalSchemaTransport
+
+from .schema import StarWarsSchema
+
+
+def compiled_client():
+    return Client(schema=StarWarsSchema, transport=LocalSchemaTransport(StarWarsSchema, compiled=True))
+
+
+def test_plan_is_reused():
+    client = compiled_client()
+    query = gql('{ hero { name friends { name } } }')
+
+    first = client.execute(query)
+    plan = client.transport.cache.get(StarWarsSchema, query)
+    second = client.execute(query)
+
+    assert first == second
+    assert client.transport.cache.get(StarWarsSchema, query) is plan
+    assert plan.static_fields and plan.selection_plans
+
+
+def test_variable_arguments():
+    client = compiled_client()
+    query = gql('''
+        query FetchSomeIDQuery($someId: String!) {
+          human(id: $someId) { name }
+        }
+    ''')
+
+    assert client.execute(query, variable_values={'someId': '1000'}) == {'human': {'name': 'Luke Skywalker'}}
+    assert client.execute(query, variable_values={'someId': '1002'}) == {'human': {'name': 'Han Solo'}}
+
+
+def test_variable_directives():
+    client = compiled_client()
+    query = gql('''
+        query HeroQuery($withFriends: Boolean!) {
+          hero {
+            name
+            friends @include(if: $withFriends) { name }
+          }
+        }
+    ''')
+
+    assert client.execute(query, variable_values={'withFriends': False}) == {'hero': {'name': 'R2-D2'}}
+    result = client.execute(query, variable_values={'withFriends': True})
+    assert len(result['hero']['friends']) == 3
+    assert not client.transport.cache.get(StarWarsSchema, query).static_fields
+
+
+def test_cache_maxsize():
+    cache = CompiledQueryCache(maxsize=1)
+    first, second = gql('{ hero { name } }'), gql('{ hero { id } }')
+
+    plan = cache.get(StarWarsSchema, first)
+    cache.get(StarWarsSchema, second)
+
+    assert len(cache.plans) == 1
+    assert cache.get(StarWarsSchema, first) is not plan
@@ -0,0 +1,102 @@
+import pytest
+from graphql import GraphQLField, GraphQLList, GraphQLObjectType, GraphQLSchema, GraphQLString
+from promise import Promise
+
+from pygql import Client, gql
+from pygql.dataloader import DataLoader
+from pygql.transport.local_schema import LocalSchemaTransport
+
+from .fixtures import getCharacter, getHero
+
+
+def character_loader(calls):
+    def load_characters(ids):
+        calls.append(sorted(ids))
+        return [getCharacter(id) for id in ids]
+    return load_characters
+
+
+CharacterType = GraphQLObjectType('Character', fields=lambda: {
+    'name': GraphQLField(GraphQLString),
+    'friends': GraphQLField(
+        GraphQLList(CharacterType),
+        resolver=lambda character, args, context, info: context.loaders.character.load_many(character.friends)
+    ),
+})
+
+LoaderSchema = GraphQLSchema(query=GraphQLObjectType('Query', fields={
+    'hero': GraphQLField(CharacterType, resolver=lambda *_: getHero(None)),
+}))
+
+FRIENDS_OF_FRIENDS = gql('{ hero { name friends { name friends { name } } } }')
+
+
+@pytest.mark.parametrize('compiled', [False, True], ids=['interpreted', 'compiled'])
+@pytest.mark.parametrize('executor', ['sync', 'thread', 'asyncio'])
+def test_loads_are_batched_per_level(compiled, executor):
+    calls = []
+    transport = LocalSchemaTransport(LoaderSchema, compiled=compiled, executor=executor,
+                                     loaders={'character': character_loader(calls)})
+    client = Client(schema=LoaderSchema, transport=transport)
+
+    result = client.execute(FRIENDS_OF_FRIENDS)
+
+    assert [friend['name'] for friend in result['hero']['friends']] == ['Luke Skywalker', 'Han Solo', 'Leia Organa']
+    assert result['hero']['friends'][0]['friends'][0] == {'name': 'Han Solo'}
+    # One call for the friends of R2-D2 and another for their friends not loaded yet
+    assert calls == [['1000', '1002', '1003'], ['2000', '2001']]
+    transport.close()
+
+
+def test_loaders_are_not_shared_between_executions():
+    calls = []
+    client = Client(schema=LoaderSchema, transport=LocalSchemaTransport(
+        LoaderSchema, loaders={'character': character_loader(calls)}
+    ))
+
+    client.execute(FRIENDS_OF_FRIENDS)
+    client.execute(FRIENDS_OF_FRIENDS)
+
+    assert len(calls) == 4
+
+
+def test_loaders_with_context_value():
+    transport = LocalSchemaTransport(LoaderSchema, loaders={'character': character_loader([])})
+    context = {}
+
+    transport.execute(FRIENDS_OF_FRIENDS, context_value=context)
+
+    assert context['loaders'].character
+
+
+def test_load_caches_and_batches():
+    calls = []
+    loader = DataLoader(character_loader(calls), max_batch_size=2)
+
+    first = loader.load('1000')
+    assert loader.load('1000') is first
+    others = loader.load_many(['1001', '1002'])
+
+    assert loader.dispatch()
+    assert not loader.dispatch()
+    assert first.get().name == 'Luke Skywalker'
+    assert [character.name for character in others.get()] == ['Darth Vader', 'Han Solo']
+    assert calls == [['1000', '1001'], ['1002']]
+
+
+def test_load_errors():
+    loader = DataLoader(lambda keys: Promise.resolve([ValueError(key) for key in keys]))
+    failed = loader.load('1000')
+    loader.dispatch()
+
+    with pytest.raises(ValueError):
+        failed.get()
+
+    wrong_size = DataLoader(lambda keys: [])
+    promise = wrong_size.load('1000')
+    wrong_size.dispatch()
+
+    with pytest.raises(TypeError):
+        promise.get()
+    # Failed batches are not cached
+    assert wrong_size.load('1000') is not promise
@@ -0,0 +1,81 @@
+import time
+
+import pytest
+from graphql import GraphQLArgument, GraphQLField, GraphQLInt, GraphQLObjectType, GraphQLSchema, GraphQLString
+
+from pygql import Client, gql
+from pygql.executors import cpu_bound
+from pygql.transport.local_schema import LocalSchemaTransport
+
+from .schema import StarWarsSchema
+
+
+def slow_resolver(root, args, *_):
+    time.sleep(0.2)
+    return 'done'
+
+
+@cpu_bound
+def fibonacci(root, args, context, info):
+    a, b = 0, 1
+    for _ in range(args['n']):
+        a, b = b, a + b
+    return a
+
+
+SlowSchema = GraphQLSchema(query=GraphQLObjectType('Query', fields={
+    'first': GraphQLField(GraphQLString, resolver=slow_resolver),
+    'second': GraphQLField(GraphQLString, resolver=slow_resolver),
+    'fibonacci': GraphQLField(GraphQLInt, args={'n': GraphQLArgument(GraphQLInt)}, resolver=fibonacci),
+}))
+
+
+@pytest.mark.parametrize('compiled', [False, True])
+def test_thread_executor_resolves_siblings_in_parallel(compiled):
+    transport = LocalSchemaTransport(SlowSchema, compiled=compiled, executor='thread')
+    client = Client(schema=SlowSchema, transport=transport)
+
+    start = time.time()
+    result = client.execute(gql('{ first second }'))
+
+    assert result == {'first': 'done', 'second': 'done'}
+    assert time.time() - start < 0.35
+    transport.close()
+
+
+@pytest.mark.parametrize('compiled', [False, True])
+def test_thread_executor_nested_query(compiled):
+    transport = LocalSchemaTransport(StarWarsSchema, compiled=compiled, executor='thread', max_workers=2)
+    client = Client(schema=StarWarsSchema, transport=transport)
+    query = gql('{ hero { name friends { name friends { name } } } }')
+
+    assert client.execute(query) == Client(schema=StarWarsSchema).execute(query)
+    transport.close()
+
+
+def test_process_executor_runs_cpu_bound_resolvers():
+    transport = LocalSchemaTransport(SlowSchema, executor='process', max_workers=1)
+    client = Client(schema=SlowSchema, transport=transport)
+
+    assert client.execute(gql('{ fibonacci(n: 10) }')) == {'fibonacci': 55}
+    transport.close()
+
+
+def test_asyncio_executor():
+    asyncio = pytest.importorskip('asyncio')
+
+    def coroutine_resolver(root, args, *_):
+        return asyncio.sleep(0.01, result='async')
+
+    schema = GraphQLSchema(query=GraphQLObjectType('Query', fields={
+        'value': GraphQLField(GraphQLString, resolver=coroutine_resolver),
+    }))
+    transport = LocalSchemaTransport(schema, executor='asyncio', loop=asyncio.new_event_loop())
+    client = Client(schema=schema, transport=transport)
+
+    assert client.execute(gql('{ value }')) == {'value': 'async'}
+
+
+def test_unknown_executor():
+    with pytest.raises(AssertionError):
+        LocalSchemaTransport(StarWarsSchema, executor='fibers')
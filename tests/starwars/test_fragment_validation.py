@@ -0,0 +1,151 @@
+import mock
+import pytest
+from graphql import validate
+
+from pygql import Client, gql
+from pygql import validation
+from pygql.validation import ValidationCache, validate_document
+
+from .schema import StarWarsSchema
+
+DOCUMENTS = [
+    '''
+    query { hero { ...HeroFields } }
+    fragment HeroFields on Character { id name friends { ...FriendFields } }
+    fragment FriendFields on Character { name }
+    ''',
+    # Unknown fields, arguments and types inside fragments
+    '''
+    query { hero { ...HeroFields } }
+    fragment HeroFields on Character { id nickname friends(first: 1) { name } }
+    fragment Unknown on Wookie { name }
+    ''',
+    # Conflicts between the operation and a fragment, and inside a fragment
+    '''
+    query { hero { name: id ...HeroFields } }
+    fragment HeroFields on Character { name ...Nested }
+    fragment Nested on Character { name: appearsIn }
+    ''',
+    # Document rules still see the fragments
+    '''
+    query ($episode: Episode, $unused: String) { hero { ...HeroFields } }
+    fragment HeroFields on Character { name ...Friends }
+    fragment Friends on Character { friends { ...Missing } }
+    fragment Unused on Droid { primaryFunction }
+    fragment OnScalar on String { length }
+    ''',
+    # Variables used in fragments are checked against the operation
+    '''
+    query ($id: Int) { hero { ...Friend } }
+    fragment Friend on Character { friends { ... on Human { homePlanet } } }
+    fragment WithVariable on Query { human(id: $id) { name } droid(id: $undefined) { name } }
+    ''',
+    # Invalid spreads and leafs
+    '''
+    query { hero { ...HumanFields ...DroidFields } }
+    fragment HumanFields on Human { homePlanet { name } }
+    fragment DroidFields on Droid { friends }
+    ''',
+]
+
+
+def messages(errors):
+    return sorted(error.message for error in errors)
+
+
+def located(errors):
+    return [(error.message, [(location.line, location.column) for location in error.locations or []])
+            for error in errors]
+
+
+@pytest.mark.parametrize('source', DOCUMENTS)
+def test_same_errors_as_a_full_validation(source):
+    cache = ValidationCache()
+    expected = validate(StarWarsSchema, gql(source))
+
+    # Without and with the fragments cached
+    for _ in range(2):
+        errors, _ = validate_document(StarWarsSchema, gql(source), fragment_cache=cache)
+        assert messages(errors) == messages(expected)
+        assert located(errors) == located(validation._sorted_errors(expected))
+        assert located(errors) == located(validate_document(StarWarsSchema, gql(source))[0])
+
+
+def test_fragments_are_validated_once():
+    cache = ValidationCache()
+    fragments = '''
+    fragment HeroFields on Character { id name friends { ...FriendFields } }
+    fragment FriendFields on Character { name appearsIn }
+    '''
+    with mock.patch.object(validation, 'validate_fragment', wraps=validation.validate_fragment) as validate_fragment:
+        validate_document(StarWarsSchema, gql('query { hero { ...HeroFields } }' + fragments), fragment_cache=cache)
+        validate_document(StarWarsSchema, gql('query Other { hero { id ...HeroFields } }' + fragments),
+                          fragment_cache=cache)
+
+    assert validate_fragment.call_count == 2
+    assert len(cache) == 2
+
+
+def test_cached_errors_are_located_in_the_document():
+    cache = ValidationCache()
+    fragment = 'fragment HeroFields on Character { name nickname }'
+    first = gql('query { hero { ...HeroFields } }\n' + fragment)
+    second = gql('''
+        query Other($id: String!) {
+          human(id: $id) {
+            id
+            ...HeroFields
+          }
+        }
+    ''' + fragment)
+    validate_document(StarWarsSchema, first, fragment_cache=cache)
+
+    errors, _ = validate_document(StarWarsSchema, second, fragment_cache=cache)
+
+    [error] = errors
+    assert located(errors) == located(validate(StarWarsSchema, second))
+    assert error.source is second.loc.source
+    assert error.nodes[0] is second.definitions[1].selection_set.selections[1]
+
+
+def test_changed_fragments_are_validated_again():
+    cache = ValidationCache()
+    document = 'query { hero { ...HeroFields } } fragment HeroFields on Character { %s }'
+    validate_document(StarWarsSchema, gql(document % 'name'), fragment_cache=cache)
+
+    errors, _ = validate_document(StarWarsSchema, gql(document % 'nickname'), fragment_cache=cache)
+
+    assert messages(errors) == ['Cannot query field "nickname" on type "Character". Did you mean "name"?']
+
+
+def test_changed_spread_fragment_changes_the_key():
+    cache = ValidationCache()
+    document = '''
+    query { hero { ...HeroFields } }
+    fragment HeroFields on Character { ...Name }
+    fragment Name on Character { %s }
+    '''
+    validate_document(StarWarsSchema, gql(document % 'name'), fragment_cache=cache)
+
+    errors, _ = validate_document(StarWarsSchema, gql(document % 'name: id'), fragment_cache=cache)
+
+    assert messages(errors) == messages(validate(StarWarsSchema, gql(document % 'name: id')))
+    assert len(cache) == 4
+
+
+def test_type_names_of_fragments():
+    cache = ValidationCache()
+    document = gql('query { hero { ...DroidFields } } fragment DroidFields on Droid { primaryFunction }')
+    validate_document(StarWarsSchema, document, fragment_cache=cache)
+
+    _, type_names = validate_document(StarWarsSchema, document, fragment_cache=cache)
+
+    assert {'Query', 'Character', 'Droid', 'String'} <= type_names
+    assert cache.invalidate(['Droid']) == 1
+
+
+def test_client_caches_fragments():
+    client = Client(schema=StarWarsSchema)
+    client.validate(gql('query { hero { ...HeroFields } } fragment HeroFields on Character { name }'))
+
+    assert len(client.fragment_cache) == 1
@@ -0,0 +1,201 @@
+import mock
+import pytest
+from graphql import GraphQLField, GraphQLObjectType, GraphQLSchema, GraphQLString
+from graphql.execution import ExecutionResult
+from graphql.language.printer import print_ast
+
+from pygql import Client, gql
+from pygql.client import RetryError
+from pygql.transport.local_schema import LocalSchemaTransport
+from pygql.transport.merging_transport import MergingTransport, merge_documents, split_result
+
+from .schema import StarWarsSchema
+
+
+def resolve_failure(root, args, context, info):
+    raise ValueError('{} failed'.format(info.field_name))
+
+
+FailureType = GraphQLObjectType('Failure', fields=lambda: {
+    'name': GraphQLField(GraphQLString, resolver=lambda *args: 'failure'),
+    'reason': GraphQLField(GraphQLString, resolver=resolve_failure),
+})
+
+FailingSchema = GraphQLSchema(query=GraphQLObjectType('Query', fields={
+    'ok': GraphQLField(GraphQLString, resolver=lambda *args: 'ok'),
+    'failure': GraphQLField(FailureType, resolver=lambda *args: object()),
+    'broken': GraphQLField(GraphQLString, resolver=resolve_failure),
+}))
+
+
+class CountingTransport(LocalSchemaTransport):
+    def __init__(self, schema):
+        super(CountingTransport, self).__init__(schema)
+        self.documents = []
+
+    def execute(self, document, *args, **kwargs):
+        self.documents.append(document)
+        return super(CountingTransport, self).execute(document, *args, **kwargs)
+
+
+@pytest.fixture
+def transport():
+    return CountingTransport(StarWarsSchema)
+
+
+@pytest.fixture
+def client(transport):
+    return Client(schema=StarWarsSchema, transport=MergingTransport(transport))
+
+
+def test_merge_renames_fields_variables_and_fragments():
+    first = gql('''
+        query Human($id: String!) {
+          human(id: $id) { ...Names }
+        }
+        fragment Names on Character { name }
+    ''')
+    second = gql('''
+        query Droid($id: String!) {
+          luke: droid(id: $id) { ...Names }
+        }
+        fragment Names on Character { id }
+    ''')
+
+    document, variables = merge_documents([(first, {'id': '1000'}), (second, {'id': '2001'})])
+    printed = print_ast(document)
+
+    assert variables == {'q0_id': '1000', 'q1_id': '2001'}
+    assert 'q0_human: human(id: $q0_id)' in printed
+    assert 'q1_luke: droid(id: $q1_id)' in printed
+    assert 'fragment q0_Names on Character' in printed
+    assert 'fragment q1_Names on Character' in printed
+
+
+def test_merge_expands_root_fragments():
+    query = gql('''
+        query { ...Root }
+        fragment Root on Query { hero { name } }
+    ''')
+
+    document, _ = merge_documents([(query, None), (query, None)])
+    printed = print_ast(document)
+
+    assert 'q0_hero: hero' in printed
+    assert 'q1_hero: hero' in printed
+    assert 'fragment' not in printed
+
+
+def test_merge_rejects_mutations():
+    mutation = gql('mutation { hero { name } }')
+
+    with pytest.raises(Exception):
+        merge_documents([(mutation, None), (mutation, None)])
+
+
+def test_split_result_assigns_errors_by_path():
+    result = ExecutionResult(
+        data={'q0_hero': {'name': 'R2-D2'}, 'q1_hero': None},
+        errors=[{'message': 'boom', 'path': ['q1_hero', 'name']}, {'message': 'global'}]
+    )
+
+    first, second = split_result(result, 2)
+
+    assert first.data == {'hero': {'name': 'R2-D2'}}
+    assert first.errors == [{'message': 'global'}]
+    assert second.data == {'hero': None}
+    assert second.errors == [{'message': 'boom', 'path': ['hero', 'name']}, {'message': 'global'}]
+
+
+def test_execute_many_sends_a_single_document(client, transport):
+    hero = gql('{ hero { name } }')
+    human = gql('''
+        query FetchHuman($id: String!) {
+          human(id: $id) { name }
+        }
+    ''')
+
+    results = client.execute_many([hero, (human, {'id': '1000'}), (human, {'id': '1002'})])
+
+    assert results == [
+        {'hero': {'name': 'R2-D2'}},
+        {'human': {'name': 'Luke Skywalker'}},
+        {'human': {'name': 'Han Solo'}},
+    ]
+    assert len(transport.documents) == 1
+
+
+def test_execute_many_max_queries(transport):
+    client = Client(schema=StarWarsSchema, transport=MergingTransport(transport, max_queries=2))
+    hero = gql('{ hero { name } }')
+
+    results = client.execute_many([hero] * 3)
+
+    assert results == [{'hero': {'name': 'R2-D2'}}] * 3
+    assert len(transport.documents) == 2
+
+
+def test_execute_many_validation_errors(client, transport):
+    hero = gql('{ hero { name } }')
+    invalid = gql('{ hero { favoriteSpaceship } }')
+
+    results = client.execute_many([hero, invalid], return_exceptions=True)
+
+    assert results[0] == {'hero': {'name': 'R2-D2'}}
+    assert isinstance(results[1], Exception)
+
+
+def test_execute_many_local_errors():
+    transport = MergingTransport(LocalSchemaTransport(FailingSchema))
+    ok = gql('{ ok }')
+    nested = gql('{ failure { name reason } }')
+
+    results = transport.execute_many([(ok, None), (nested, None), (gql('{ broken }'), None), (nested, None)])
+
+    assert [result.data for result in results] == [
+        {'ok': 'ok'}, {'failure': {'name': 'failure', 'reason': None}}, {'broken': None},
+        {'failure': {'name': 'failure', 'reason': None}},
+    ]
+    assert results[0].errors is None
+    assert [[str(error) for error in result.errors] for result in results[1:]] == [
+        ['reason failed'], ['broken failed'], ['reason failed']
+    ]
+
+
+def test_split_result_strips_the_path_of_error_objects():
+    error = Exception('boom')
+    error.path = ['q1_hero', 'name']
+
+    first, second = split_result(ExecutionResult(data={'q0_hero': None, 'q1_hero': None}, errors=[error]), 2)
+
+    assert first.errors is None
+    assert second.errors == [error]
+    assert error.path == ['hero', 'name']
+
+
+def test_execute_many_retries(transport):
+    client = Client(schema=StarWarsSchema, transport=MergingTransport(transport), retries=2)
+    hero = gql('{ hero { name } }')
+
+    merged = ExecutionResult(data={'q0_hero': {'name': 'R2-D2'}, 'q1_hero': None})
+
+    with mock.patch.object(transport, 'execute', side_effect=[Exception('fail'), merged]) as execute:
+        results = client.execute_many([hero, hero])
+
+    assert results == [{'hero': {'name': 'R2-D2'}}, {'hero': None}]
+    assert execute.call_count == 2
+
+
+def test_execute_many_transport_errors(transport):
+    client = Client(schema=StarWarsSchema, transport=MergingTransport(transport), retries=2)
+    hero = gql('{ hero { name } }')
+    invalid = gql('{ hero { favoriteSpaceship } }')
+
+    with mock.patch.object(transport, 'execute', side_effect=Exception('fail')):
+        results = client.execute_many([hero, invalid, hero], return_exceptions=True)
+        with pytest.raises(RetryError):
+            client.execute_many([hero, hero])
+
+    assert isinstance(results[0], RetryError)
+    assert results[2] is results[0]
+    assert 'favoriteSpaceship' in str(results[1])
@@ -2,13 +2,14 @@ import pytest
 from graphql.error import format_error
 
 from pygql import Client, gql
+from pygql.transport.local_schema import LocalSchemaTransport
 
 from .schema import StarWarsSchema
 
 
-@pytest.fixture
-def client():
-    return Client(schema=StarWarsSchema)
+@pytest.fixture(params=[False, True], ids=['interpreted', 'compiled'])
+def client(request):
+    return Client(schema=StarWarsSchema, transport=LocalSchemaTransport(StarWarsSchema, compiled=request.param))
 
 
 def test_hero_name_query(client):
@@ -0,0 +1,175 @@
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import pytest
+from graphql import (GraphQLArgument, GraphQLField, GraphQLInt, GraphQLList, GraphQLObjectType, GraphQLSchema,
+                     GraphQLString)
+from graphql.error import GraphQLError
+
+from pygql import Client, gql
+from pygql.transport.local_schema import LocalSchemaTransport
+from pygql.transport.stream import ResultStream
+
+from .fixtures import getCharacter
+from .schema import characterInterface, droidType, humanType, queryType
+
+Review = namedtuple('Review', 'stars commentary')
+
+ReviewType = GraphQLObjectType('Review', fields={
+    'stars': GraphQLField(GraphQLInt),
+    'commentary': GraphQLField(GraphQLString),
+})
+
+
+def resolve_reviews(root, args, context, info):
+    return context['events'](args.get('count', 3))
+
+
+def resolve_character_changed(root, args, context, info):
+    return (getCharacter(id) for id in args['ids'])
+
+
+subscriptionType = GraphQLObjectType('Subscription', fields={
+    'reviewAdded': GraphQLField(
+        ReviewType,
+        args={'count': GraphQLArgument(GraphQLInt)},
+        resolver=resolve_reviews
+    ),
+    'characterChanged': GraphQLField(
+        characterInterface,
+        args={'ids': GraphQLArgument(GraphQLList(GraphQLString))},
+        resolver=resolve_character_changed
+    ),
+})
+
+SubscriptionSchema = GraphQLSchema(query=queryType, subscription=subscriptionType, types=[humanType, droidType])
+
+REVIEWS = gql('subscription ($count: Int) { reviewAdded(count: $count) { stars } }')
+
+
+def reviews(count):
+    for stars in range(count):
+        yield Review(stars, 'Review {}'.format(stars))
+
+
+def stars(results):
+    return [result.data['reviewAdded']['stars'] for result in results]
+
+
+@pytest.mark.parametrize('compiled', [False, True], ids=['interpreted', 'compiled'])
+def test_subscription_results(compiled):
+    client = Client(schema=SubscriptionSchema, transport=LocalSchemaTransport(SubscriptionSchema, compiled=compiled))
+
+    stream = client.subscribe(REVIEWS, {'count': 3}, context_value={'events': reviews})
+
+    assert isinstance(stream, ResultStream)
+    assert stars(stream) == [0, 1, 2]
+
+
+def test_events_are_resolved_with_the_selection():
+    client = Client(schema=SubscriptionSchema)
+    subscription = gql('''
+        subscription {
+          characterChanged(ids: ["1000", "2001"]) { name ... on Droid { primaryFunction } }
+        }
+    ''')
+
+    results = list(client.subscribe(subscription))
+
+    assert [result.data for result in results] == [
+        {'characterChanged': {'name': 'Luke Skywalker'}},
+        {'characterChanged': {'name': 'R2-D2', 'primaryFunction': 'Astromech'}},
+    ]
+
+
+def test_subscription_is_validated():
+    client = Client(schema=SubscriptionSchema)
+
+    with pytest.raises(GraphQLError) as exc_info:
+        client.subscribe(gql('subscription { reviewAdded { rating } }'))
+    assert 'Cannot query field "rating"' in str(exc_info.value)
+
+
+def test_only_subscriptions():
+    transport = LocalSchemaTransport(SubscriptionSchema)
+
+    with pytest.raises(GraphQLError) as exc_info:
+        transport.subscribe(gql('{ hero { name } }'))
+    assert 'Only subscriptions can be subscribed' in str(exc_info.value)
+
+
+def test_source_errors_end_the_stream():
+    def failing(count):
+        yield Review(5, None)
+        raise ValueError('No more reviews')
+
+    stream = LocalSchemaTransport(SubscriptionSchema).subscribe(REVIEWS, context_value={'events': failing})
+
+    assert stars([next(stream)]) == [5]
+    with pytest.raises(ValueError):
+        next(stream)
+
+
+def test_bounded_buffer():
+    read = []
+
+    def counted(count):
+        for stars in range(count):
+            read.append(stars)
+            yield Review(stars, None)
+
+    transport = LocalSchemaTransport(SubscriptionSchema, max_buffered_events=2)
+    stream = transport.subscribe(REVIEWS, {'count': 10}, context_value={'events': counted})
+
+    time.sleep(0.1)
+    # Two results wait for the consumer, the third event waits for room
+    assert read == [0, 1, 2]
+    assert stars([next(stream)]) == [0]
+    time.sleep(0.1)
+    assert read == [0, 1, 2, 3]
+    assert stars(stream) == list(range(1, 10))
+
+
+def test_close_stops_reading_the_events():
+    closed = threading.Event()
+
+    def endless(count):
+        try:
+            stars = 0
+            while True:
+                yield Review(stars, None)
+                stars += 1
+        finally:
+            closed.set()
+
+    transport = LocalSchemaTransport(SubscriptionSchema, max_buffered_events=1)
+    with transport.subscribe(REVIEWS, context_value={'events': endless}) as stream:
+        assert stars([next(stream), next(stream)]) == [0, 1]
+
+    assert closed.wait(5)
+    assert list(stream) == []
+
+
+@pytest.mark.skipif(sys.version_info < (3, 6), reason='async generators need python 3.6')
+@pytest.mark.parametrize('executor', ['sync', 'asyncio'])
+def test_async_events(executor):
+    import asyncio
+
+    namespace = {'asyncio': asyncio, 'Review': Review}
+    exec('''
+async def events(count):
+    for stars in range(count):
+        await asyncio.sleep(0)
+        yield Review(stars, None)
+
+async def collect(stream):
+    return [result async for result in stream]
+''', namespace)
+
+    loop = asyncio.get_event_loop()
+    transport = LocalSchemaTransport(SubscriptionSchema, executor=executor, loop=loop, max_buffered_events=2)
+    stream = transport.subscribe(REVIEWS, {'count': 5}, context_value={'events': namespace['events']})
+
+    assert stars(loop.run_until_complete(namespace['collect'](stream))) == [0, 1, 2, 3, 4]
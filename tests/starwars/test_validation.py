@@ -1,8 +1,12 @@
+import mock
 import pytest
-from graphql import graphql
+from graphql import build_client_schema, graphql
 from graphql.utils.introspection_query import introspection_query
+from graphql.validation.rules import NoUnusedVariables
 
 from pygql import Client, gql
+from pygql.compact_schema import dump_schema
+from pygql.validation import ValidationError
 
 from .schema import StarWarsSchema
 
@@ -62,7 +66,14 @@ def introspection_schema():
     return Client(introspection=introspection)
 
 
-@pytest.fixture(params=['local_schema', 'typedef_schema', 'introspection_schema'])
+@pytest.fixture
+def compact_schema(tmpdir):
+    path = str(tmpdir.join('schema.gqlc'))
+    dump_schema(build_client_schema(introspection), path)
+    return Client(compact_schema=path)
+
+
+@pytest.fixture(params=['local_schema', 'typedef_schema', 'introspection_schema', 'compact_schema'])
 def client(request):
     return request.getfuncargvalue(request.param)
 
@@ -169,3 +180,75 @@ def test_allows_object_fields_in_inline_fragments(client):
         }
     '''
     assert not validation_errors(client, query)
+
+
+INVALID_QUERY = '''
+    query HeroQuery($unused: String) {
+      hero {
+        favoriteSpaceship
+        name: id
+        name
+      }
+    }
+'''
+
+
+def test_collect_all_validation_errors():
+    client = Client(schema=StarWarsSchema, collect_validation_errors=True)
+
+    with pytest.raises(ValidationError) as exc_info:
+        client.validate(gql(INVALID_QUERY))
+
+    assert len(exc_info.value.errors) == 3
+    assert 'favoriteSpaceship' in str(exc_info.value)
+
+
+def test_cheap_validation_rules():
+    client = Client(schema=StarWarsSchema, validation_rules='cheap', collect_validation_errors=True)
+
+    with pytest.raises(ValidationError) as exc_info:
+        client.validate(gql(INVALID_QUERY))
+
+    assert [error.message for error in exc_info.value.errors] == [
+        'Cannot query field "favoriteSpaceship" on type "Character".'
+    ]
+
+
+def test_custom_validation_rules():
+    client = Client(schema=StarWarsSchema, validation_rules=[NoUnusedVariables])
+
+    with pytest.raises(Exception) as exc_info:
+        client.validate(gql(INVALID_QUERY))
+
+    assert 'unused' in str(exc_info.value)
+
+
+def test_unknown_validation_rules():
+    with pytest.raises(AssertionError):
+        Client(schema=StarWarsSchema, validation_rules='fast')
+
+
+def test_skip_validation():
+    client = Client(schema=StarWarsSchema)
+    query = gql('{ hero { name favoriteSpaceship } }')
+
+    with mock.patch.object(client, 'validate') as validate:
+        assert client.execute(query, skip_validation=True) == {'hero': {'name': 'R2-D2'}}
+    assert not validate.called
+
+
+def test_trusted_documents_are_not_validated():
+    query = gql('{ hero { name } }')
+    client = Client(schema=StarWarsSchema, validation_rules='none')
+    client.trust(query)
+
+    with mock.patch.object(client, 'validate') as validate:
+        client.execute(query)
+        client.execute(gql('{ hero { name } }'))
+    assert not validate.called
+
+    client = Client(schema=StarWarsSchema, trusted_documents=[query])
+    with mock.patch.object(client, 'validate') as validate:
+        client.execute(query)
+        client.execute(gql('{ hero { id } }'))
+    assert validate.call_count == 1
@@ -0,0 +1,423 @@
+import sys
+import threading
+import time
+
+import mock
+import pytest
+import requests
+import concurrent.futures
+from graphql.language.printer import print_ast
+
+from pygql import Client, gql
+from pygql.transport import batch_transport
+from pygql.transport.batch_transport import (PRIORITY_BULK, PRIORITY_INTERACTIVE, QUEUE_REJECT, QUEUE_SHED_OLDEST,
+                                             BatchQueue, BatchResponseError, BatchTransport, DeadlineExceededError,
+                                             Lane, QueuedQuery, QueueFullError, TransportClosedError,
+                                             as_completed, wait)
+
+from .conftest import execute_payload
+
+query = gql('{ hero { name } }')
+expected = {'hero': {'name': 'R2-D2'}}
+
+
+@pytest.fixture
+def transport(graphql_server):
+    return BatchTransport(url=graphql_server.url, use_json=True)
+
+
+def blocking_handler(server):
+    release = threading.Event()
+
+    def handler(payload):
+        release.wait(5)
+        return execute_payload(payload)
+
+    server.handler = handler
+    return release
+
+
+def test_batch_results(graphql_server, transport):
+    client = Client(transport=transport)
+
+    results = [client.execute(query) for _ in range(3)]
+
+    assert [result.data for result in results] == [expected] * 3
+    assert sum(len(payload) for payload in graphql_server.requests) == 3
+
+
+def test_add_done_callback(transport):
+    called = threading.Event()
+    received = []
+
+    def callback(result):
+        received.append(result)
+        called.set()
+
+    result = transport.execute(query)
+    result.add_done_callback(callback)
+
+    assert called.wait(5)
+    assert received == [result]
+    assert result.done()
+    assert result.data == expected
+
+
+def test_wait_and_as_completed(transport):
+    results = [transport.execute(query) for _ in range(3)]
+
+    done, not_done = wait(results, timeout=5)
+    assert done == set(results) and not not_done
+
+    completed = list(as_completed(results, timeout=5))
+    assert set(completed) == set(results)
+
+
+def test_result_timeout(graphql_server, transport):
+    release = blocking_handler(graphql_server)
+    result = transport.execute(query)
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        result.result(timeout=0.05)
+
+    release.set()
+    assert result.result(timeout=5).data == expected
+
+
+def test_cancel_queued_result(graphql_server, transport):
+    release = blocking_handler(graphql_server)
+    first = transport.execute(query)
+    while not first.running():
+        time.sleep(0.001)
+    second = transport.execute(query)
+
+    assert second.cancel()
+    release.set()
+
+    assert first.result(timeout=5).data == expected
+    assert second.cancelled()
+
+
+@pytest.mark.skipif(sys.version_info < (3, 5), reason='requires asyncio')
+def test_await_result(transport):
+    import asyncio
+
+    results = asyncio.get_event_loop().run_until_complete(
+        asyncio.gather(transport.execute(query), transport.execute(query))
+    )
+
+    assert [result.data for result in results] == [expected] * 2
+
+
+def test_queue_reject_policy(graphql_server):
+    release = blocking_handler(graphql_server)
+    transport = BatchTransport(url=graphql_server.url, use_json=True, max_queue_size=1, queue_policy=QUEUE_REJECT)
+    first = transport.execute(query)
+    while not first.running():
+        time.sleep(0.001)
+    second = transport.execute(query)
+
+    with pytest.raises(QueueFullError):
+        transport.execute(query)
+
+    release.set()
+    assert second.result(timeout=5).data == expected
+    stats = transport.queue_stats()
+    assert stats['rejected'] == 1
+    assert stats['max_depth'] == 1
+
+
+def test_queue_block_policy_timeout(graphql_server):
+    release = blocking_handler(graphql_server)
+    transport = BatchTransport(url=graphql_server.url, use_json=True, max_queue_size=1, queue_timeout=0.05)
+    first = transport.execute(query)
+    while not first.running():
+        time.sleep(0.001)
+    transport.execute(query)
+
+    start = time.time()
+    with pytest.raises(QueueFullError):
+        transport.execute(query)
+    assert time.time() - start >= 0.05
+    release.set()
+
+
+def test_queue_shed_oldest_policy(graphql_server):
+    release = blocking_handler(graphql_server)
+    transport = BatchTransport(url=graphql_server.url, use_json=True, max_queue_size=1,
+                               queue_policy=QUEUE_SHED_OLDEST)
+    first = transport.execute(query)
+    while not first.running():
+        time.sleep(0.001)
+    oldest = transport.execute(query)
+    newest = transport.execute(query)
+
+    assert isinstance(oldest.exception(timeout=5), QueueFullError)
+    release.set()
+    assert newest.result(timeout=5).data == expected
+    assert transport.queue_stats()['shed'] == 1
+
+
+def test_expired_queries_are_not_sent(graphql_server, transport):
+    release = blocking_handler(graphql_server)
+    first = transport.execute(query)
+    while not first.running():
+        time.sleep(0.001)
+    expired = transport.execute(query, deadline=0.01)
+    time.sleep(0.05)
+    release.set()
+
+    assert isinstance(expired.exception(timeout=5), DeadlineExceededError)
+    assert first.result(timeout=5).data == expected
+    assert len(graphql_server.requests) == 1
+    assert transport.queue_stats()['expired'] == 1
+
+
+def test_cancelled_queries_are_not_expired(graphql_server, transport):
+    release = blocking_handler(graphql_server)
+    first = transport.execute(query)
+    while not first.running():
+        time.sleep(0.001)
+    cancelled = transport.execute(query, deadline=0.01)
+    assert cancelled.cancel()
+    time.sleep(0.05)
+    release.set()
+
+    assert first.result(timeout=5).data == expected
+    assert transport.execute(query).result(timeout=5).data == expected
+    assert all(query_batcher.is_alive() for query_batcher in transport.query_batchers)
+    assert transport.queue_stats()['expired'] == 0
+
+
+def test_cancelled_queries_are_not_counted_as_shed(graphql_server):
+    release = blocking_handler(graphql_server)
+    transport = BatchTransport(url=graphql_server.url, use_json=True, max_queue_size=1,
+                               queue_policy=QUEUE_SHED_OLDEST)
+    first = transport.execute(query)
+    while not first.running():
+        time.sleep(0.001)
+    cancelled = transport.execute(query)
+    assert cancelled.cancel()
+    newest = transport.execute(query)
+
+    release.set()
+    assert newest.result(timeout=5).data == expected
+    assert cancelled.cancelled()
+    assert transport.queue_stats()['shed'] == 0
+
+
+def test_close_sends_queued_queries(graphql_server, transport):
+    results = [transport.execute(query) for _ in range(3)]
+
+    assert transport.close(timeout=5)
+
+    assert [result.data for result in results] == [expected] * 3
+    assert not any(query_batcher.is_alive() for query_batcher in transport.query_batchers)
+    with pytest.raises(TransportClosedError):
+        transport.execute(query)
+
+
+def test_close_timeout_fails_pending_queries(graphql_server, transport):
+    release = blocking_handler(graphql_server)
+    first = transport.execute(query)
+    while not first.running():
+        time.sleep(0.001)
+    queued = transport.execute(query)
+
+    with mock.patch.object(batch_transport.log, 'exception') as log_exception:
+        assert not transport.close(timeout=0.05)
+        release.set()
+        # The late response of the first query doesn't break the worker
+        for query_batcher in transport.query_batchers:
+            query_batcher.join(5)
+
+    assert not any(query_batcher.is_alive() for query_batcher in transport.query_batchers)
+    assert not log_exception.called
+    assert isinstance(first.exception(timeout=5), TransportClosedError)
+    assert isinstance(queued.exception(timeout=5), TransportClosedError)
+
+
+def test_flush(graphql_server, transport):
+    release = blocking_handler(graphql_server)
+    result = transport.execute(query)
+
+    assert not transport.flush(timeout=0.05)
+    release.set()
+    assert transport.flush(timeout=5)
+    assert result.done()
+    transport.close()
+
+
+def test_context_manager(graphql_server):
+    with BatchTransport(url=graphql_server.url, use_json=True) as transport:
+        result = transport.execute(query)
+
+    assert result.data == expected
+    assert transport.closed
+
+
+def test_short_response_fails_missing_queries(graphql_server, transport):
+    graphql_server.handler = lambda payload: execute_payload(payload)[:1]
+
+    first, second = transport.execute(query), transport.execute(query)
+
+    assert first.result(timeout=5).data == expected
+    assert isinstance(second.exception(timeout=5), BatchResponseError)
+
+
+def test_short_response_retries_missing_queries(graphql_server):
+    transport = BatchTransport(url=graphql_server.url, use_json=True, max_retries=2, retry_backoff=0)
+    graphql_server.handler = lambda payload: execute_payload(payload)[:1]
+
+    results = [transport.execute(query) for _ in range(3)]
+
+    assert [result.result(timeout=5).data for result in results] == [expected] * 3
+    assert [len(payload) for payload in graphql_server.requests] == [3, 2, 1]
+
+
+def test_server_errors_are_retried(graphql_server):
+    transport = BatchTransport(url=graphql_server.url, use_json=True, max_retries=2, retry_backoff=0)
+    responses = [(503, {}), (503, {})]
+    graphql_server.handler = lambda payload: responses.pop() if responses else execute_payload(payload)
+
+    result = transport.execute(query)
+
+    assert result.result(timeout=5).data == expected
+    assert len(graphql_server.requests) == 3
+
+
+def test_backoff_does_not_block_other_batches(graphql_server):
+    transport = BatchTransport(url=graphql_server.url, use_json=True, max_retries=1, retry_backoff=0.5)
+    bulk_query = gql('{ hero { id } }')
+    responses = [(503, {})]
+
+    def handler(payload):
+        if payload[0]['query'] == print_ast(bulk_query) and responses:
+            return responses.pop()
+        return execute_payload(payload)
+
+    graphql_server.handler = handler
+    bulk = transport.execute(bulk_query, priority=PRIORITY_BULK)
+    # Queued again for its retry
+    while not graphql_server.requests or transport.queue_stats()['lanes'][PRIORITY_BULK] != 1:
+        time.sleep(0.001)
+
+    interactive = transport.execute(query)
+
+    assert interactive.result(timeout=0.3).data == expected
+    assert not bulk.done()
+    assert bulk.result(timeout=5).data == {'hero': {'id': '2001'}}
+    assert len(graphql_server.requests) == 3
+
+
+def test_client_errors_are_not_retried(graphql_server):
+    transport = BatchTransport(url=graphql_server.url, use_json=True, max_retries=2, retry_backoff=0)
+    graphql_server.handler = lambda payload: (400, {})
+
+    result = transport.execute(query)
+
+    assert isinstance(result.exception(timeout=5), requests.HTTPError)
+    assert len(graphql_server.requests) == 1
+
+
+def test_too_large_batches_are_split(graphql_server, transport):
+    graphql_server.handler = lambda payload: (413, {}) if len(payload) > 1 else execute_payload(payload)
+
+    results = [transport.execute(query) for _ in range(4)]
+
+    assert [result.result(timeout=5).data for result in results] == [expected] * 4
+    assert [len(payload) for payload in graphql_server.requests] == [4, 2, 1, 1, 2, 1, 1]
+
+
+def test_non_list_response(graphql_server, transport):
+    graphql_server.handler = lambda payload: {'data': None}
+
+    result = transport.execute(query)
+
+    assert isinstance(result.exception(timeout=5), BatchResponseError)
+
+
+def test_priorities_are_batched_separately(graphql_server, transport):
+    bulk_query = gql('{ hero { id } }')
+    bulk = [transport.execute(bulk_query, priority=PRIORITY_BULK) for _ in range(2)]
+    interactive = [transport.execute(query) for _ in range(2)]
+
+    for result in interactive:
+        assert result.result(timeout=5).data == expected
+    for result in bulk:
+        assert result.result(timeout=5).data == {'hero': {'id': '2001'}}
+
+    # The interactive lane has a shorter batching window, so it is sent first
+    first, second = graphql_server.requests
+    assert [item['query'] for item in first] == [print_ast(query)] * 2
+    assert [item['query'] for item in second] == [print_ast(bulk_query)] * 2
+    assert transport.queue_stats()['lanes'] == {PRIORITY_INTERACTIVE: 0, PRIORITY_BULK: 0}
+
+
+def test_lane_weights():
+    lanes = {'fast': Lane(weight=3, batch_window=0), 'slow': Lane(weight=1, batch_window=0)}
+    queue = BatchQueue(lanes=lanes)
+    sent = []
+
+    for _ in range(8):
+        for priority in lanes:
+            if not queue.lanes[priority].items:
+                queue.put(QueuedQuery({}, concurrent.futures.Future(), priority=priority))
+        batch = queue.get_batch()
+        queue.batch_done(batch)
+        sent.append(batch[0].priority)
+
+    assert sent.count('fast') == 6
+    assert sent.count('slow') == 2
+
+
+def test_lane_queue_size(graphql_server):
+    lanes = {PRIORITY_INTERACTIVE: Lane(), PRIORITY_BULK: Lane(batch_window=10, max_queue_size=1)}
+    transport = BatchTransport(url=graphql_server.url, use_json=True, lanes=lanes, queue_policy=QUEUE_REJECT)
+    transport.execute(query, priority=PRIORITY_BULK)
+
+    with pytest.raises(QueueFullError):
+        transport.execute(query, priority=PRIORITY_BULK)
+    assert transport.execute(query).result(timeout=5).data == expected
+    transport.close(timeout=0)
+
+
+def test_slow_batches_only_block_their_lane(graphql_server, transport):
+    bulk_query = gql('{ hero { id } }')
+    release = threading.Event()
+
+    def handler(payload):
+        if payload[0]['query'] == print_ast(bulk_query):
+            release.wait(5)
+        return execute_payload(payload)
+
+    graphql_server.handler = handler
+    bulk = transport.execute(bulk_query, priority=PRIORITY_BULK)
+    while not bulk.running():
+        time.sleep(0.001)
+    next_bulk = transport.execute(bulk_query, priority=PRIORITY_BULK)
+
+    assert transport.execute(query).result(timeout=1).data == expected
+    assert not bulk.done()
+    assert not next_bulk.running()
+    release.set()
+    assert [result.result(timeout=5).data for result in (bulk, next_bulk)] == [{'hero': {'id': '2001'}}] * 2
+
+
+def test_lane_max_in_flight(graphql_server):
+    release = blocking_handler(graphql_server)
+    lanes = {PRIORITY_INTERACTIVE: Lane(batch_window=0, max_in_flight=2)}
+    transport = BatchTransport(url=graphql_server.url, use_json=True, lanes=lanes)
+    first = transport.execute(query)
+    while not first.running():
+        time.sleep(0.001)
+    second = transport.execute(query)
+    while not second.running():
+        time.sleep(0.001)
+    third = transport.execute(query)
+
+    time.sleep(0.05)
+    assert not third.running()
+    release.set()
+    assert [result.result(timeout=5).data for result in (first, second, third)] == [expected] * 3
+    assert len(transport.query_batchers) == 2
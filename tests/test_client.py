@@ -1,9 +1,17 @@
+import threading
+import time
+
 import pytest
 import mock
+from graphql.execution import ExecutionResult
 
 from pygql import Client, gql
+from pygql.transport.local_schema import LocalSchemaTransport
+from pygql.transport.merging_transport import MergingTransport
 from pygql.transport.requests import RequestsHTTPTransport
 
+from .starwars.schema import StarWarsSchema
+
 
 @mock.patch('pygql.transport.requests.RequestsHTTPTransport.execute')
 def test_retries(execute_mock):
@@ -31,4 +39,133 @@ def test_retries(execute_mock):
     assert execute_mock.call_count == expected_retries
 
 
+class SlowEchoTransport(object):
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def execute(self, document, variable_values=None):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if variable_values and variable_values.get('fail'):
+                return ExecutionResult(errors=['failed {}'.format(variable_values['id'])])
+            return ExecutionResult(data={'id': (variable_values or {}).get('id')})
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_execute_many_keeps_order():
+    transport = SlowEchoTransport()
+    client = Client(transport=transport, max_workers=4)
+    query = gql('{ hero { name } }')
+
+    results = client.execute_many([(query, {'id': i}) for i in range(8)])
+
+    assert results == [{'id': i} for i in range(8)]
+    assert 1 < transport.max_active <= 4
+
+
+def test_execute_many_raises_first_error():
+    client = Client(transport=SlowEchoTransport(delay=0))
+    query = gql('{ hero { name } }')
+
+    with pytest.raises(Exception) as exc_info:
+        client.execute_many([(query, {'id': 1}), (query, {'id': 2, 'fail': True})])
+
+    assert str(exc_info.value) == 'failed 2'
+
+
+def test_execute_many_return_exceptions():
+    client = Client(transport=SlowEchoTransport(delay=0))
+    query = gql('{ hero { name } }')
+
+    results = client.execute_many(
+        [query, (query, {'id': 2, 'fail': True}), (query, {'id': 3})],
+        return_exceptions=True
+    )
+
+    assert results[0] == {'id': None}
+    assert isinstance(results[1], Exception)
+    assert results[2] == {'id': 3}
+
+
+class ClosingTransport(SlowEchoTransport):
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_close():
+    transport = ClosingTransport(delay=0)
+    with Client(transport=transport) as client:
+        client.execute_many([gql('{ hero { name } }')] * 2)
+        executor = client._executor
+        client.schema_poller = mock.Mock()
+        poller = client.schema_poller
+
+    assert transport.closed
+    assert client._executor is None
+    with pytest.raises(RuntimeError):
+        executor.submit(lambda: None)
+    poller.stop.assert_called_once_with()
+
+
+def test_close_merging_transport():
+    transport = ClosingTransport(delay=0)
+
+    with Client(transport=MergingTransport(transport)):
+        pass
+
+    assert transport.closed
+    MergingTransport(SlowEchoTransport()).close()
+
+
+class CountingTransport(LocalSchemaTransport):
+    def __init__(self, schema):
+        super(CountingTransport, self).__init__(schema)
+        self.calls = 0
+
+    def execute(self, document, *args, **kwargs):
+        self.calls += 1
+        return super(CountingTransport, self).execute(document, *args, **kwargs)
+
+
+def test_lazy_schema_is_fetched_on_first_use():
+    transport = CountingTransport(StarWarsSchema)
+    client = Client(transport=transport, fetch_schema_from_transport=True, lazy_schema=True)
+    assert transport.calls == 0
+
+    assert client.execute(gql('{ hero { name } }')) == {'hero': {'name': 'R2-D2'}}
+    assert transport.calls == 2
+    assert client.introspection['__schema']
+
+
+def test_lazy_schema_is_built_once_across_threads():
+    client = Client(type_def='schema { query: Query } type Query { hello: String }', lazy_schema=True)
+    schemas = []
+
+    threads = [threading.Thread(target=lambda: schemas.append(client.schema)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(id(schema) for schema in schemas)) == 1
+    assert schemas[0].get_query_type().name == 'Query'
+
+
+def test_warm_schema_in_background():
+    transport = CountingTransport(StarWarsSchema)
+    client = Client(transport=transport, fetch_schema_from_transport=True, lazy_schema=True, warm_schema=True)
+    client.schema_warmup.join(5)
 
+    assert transport.calls == 1
+    assert client.schema.get_type('Droid')
+    assert transport.calls == 1
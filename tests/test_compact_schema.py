@@ -0,0 +1,70 @@
+import json
+
+import pytest
+from graphql import graphql
+from graphql.utils.introspection_query import introspection_query
+
+from pygql import Client, gql
+from pygql.compact_schema import CompactSchemaError, dumps_schema, load_schema, loads_schema, main
+
+from .starwars.schema import StarWarsSchema
+
+FILTER_SCHEMA = '''
+schema {
+  query: Query
+}
+
+enum Color {
+  RED
+  GREEN
+}
+
+input Filter {
+  color: Color = GREEN
+  tags: [String!] = ["a", "b"]
+}
+
+union Result = Query
+
+type Query {
+  search(filter: Filter = {color: RED}, first: Int = 10): [Result]
+}
+'''
+
+
+def introspect(schema):
+    return graphql(schema, introspection_query).data
+
+
+def test_loaded_schema_has_the_same_introspection():
+    schema = Client(type_def=FILTER_SCHEMA).schema
+    loaded = loads_schema(dumps_schema(schema))
+
+    assert introspect(loaded) == introspect(schema)
+    assert loaded.get_query_type().fields['search'].args['filter'].default_value == {'color': 'RED', 'tags': ['a', 'b']}
+
+
+def test_starwars_roundtrip():
+    loaded = loads_schema(dumps_schema(StarWarsSchema))
+
+    assert introspect(loaded) == introspect(StarWarsSchema)
+    assert [t.name for t in loaded.get_possible_types(loaded.get_type('Character'))] == ['Human', 'Droid']
+
+
+def test_invalid_data():
+    with pytest.raises(CompactSchemaError):
+        loads_schema(b'{"__schema": {}}')
+    with pytest.raises(CompactSchemaError):
+        loads_schema(dumps_schema(StarWarsSchema)[:100])
+
+
+def test_cli(tmpdir):
+    introspection_path = tmpdir.join('introspection.json')
+    introspection_path.write(json.dumps({'data': introspect(StarWarsSchema)}))
+    output = str(tmpdir.join('schema.gqlc'))
+
+    assert main([str(introspection_path), output]) == 0
+
+    assert introspect(load_schema(output)) == introspect(StarWarsSchema)
+    client = Client(compact_schema=output, lazy_schema=True)
+    client.validate(gql('{ hero { name } }'))
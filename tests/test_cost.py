@@ -0,0 +1,136 @@
+import pytest
+from graphql import build_ast_schema, parse
+
+from pygql import Client, gql
+from pygql.cost import CostAnalyzer, QueryCost, QueryCostError
+from pygql.transport.local_schema import LocalSchemaTransport
+
+schema = build_ast_schema(parse('''
+schema {
+  query: Query
+}
+
+interface Node {
+  id: ID!
+}
+
+type User implements Node {
+  id: ID!
+  name: String
+  tags: [String]
+  friends(first: Int, last: Int): [User!]!
+  repositories(first: Int): [Repository]
+}
+
+type Repository implements Node {
+  id: ID!
+  name: String
+  owner: User
+}
+
+union SearchResult = User | Repository
+
+type Query {
+  viewer: User
+  node(id: ID!): Node
+  search(text: String!, first: Int): [SearchResult]
+}
+'''))
+
+
+def analyze(query, **kwargs):
+    variable_values = kwargs.pop('variable_values', None)
+    return CostAnalyzer(schema, **kwargs).analyze(gql(query), variable_values)
+
+
+def test_scalar_fields():
+    assert analyze('{ viewer { id name } }') == QueryCost(depth=2, breadth=2, nodes=3, cost=3)
+
+
+def test_lists_use_their_size_argument():
+    cost = analyze('{ viewer { friends(first: 5) { name friends(last: 2) { name } } } }')
+
+    # 1 viewer, 5 friends with their name, and 2 friends with a name for each of them
+    assert cost.nodes == 1 + 5 * (1 + 1 + 2 * 2)
+    assert cost.depth == 4
+
+
+def test_lists_without_size_argument():
+    assert analyze('{ viewer { tags } }').nodes == 1 + 10
+    assert analyze('{ viewer { tags } }', default_list_size=100).nodes == 1 + 100
+
+
+def test_size_from_variables():
+    query = 'query ($first: Int = 3) { viewer { friends(first: $first) { id } } }'
+
+    assert analyze(query).nodes == 1 + 3 * 2
+    assert analyze(query, variable_values={'first': 50}).nodes == 1 + 50 * 2
+
+
+def test_fragments():
+    cost = analyze('''
+        query {
+          viewer { ...UserFields }
+          search(text: "pygql", first: 2) {
+            __typename
+            ...UserFields
+            ... on Repository { name owner { ...UserFields } }
+          }
+        }
+        fragment UserFields on User { id name }
+    ''')
+
+    assert cost == QueryCost(depth=3, breadth=4, nodes=3 + 2 * (1 + 1 + 2 + 1 + 3), cost=3 + 2 * (1 + 1 + 2 + 1 + 3))
+
+
+def test_fragment_cycles():
+    cost = analyze('''
+        { viewer { ...Friends } }
+        fragment Friends on User { friends(first: 2) { ...Friends } }
+    ''')
+
+    assert cost.nodes == 1 + 2
+
+
+def test_field_costs():
+    cost = analyze('{ viewer { name repositories(first: 4) { name } } }',
+                   field_costs={'User.repositories': 5, 'Repository.name': 0})
+
+    assert cost.nodes == 1 + 1 + 4 * 2
+    assert cost.cost == 1 + 1 + 4 * (5 + 0)
+
+
+def test_operation_name():
+    document = gql('query Small { viewer { id } } query Big { viewer { friends { id } } }')
+    analyzer = CostAnalyzer(schema)
+
+    assert analyzer.analyze(document, operation_name='Small').nodes == 2
+    assert analyzer.analyze(document).nodes == 1 + 10 * 2
+
+
+def test_check_limits():
+    analyzer = CostAnalyzer(schema)
+    document = gql('{ viewer { friends(first: 100) { friends(first: 100) { id } } } }')
+
+    assert analyzer.check(document, {'depth': 4}).depth == 4
+    with pytest.raises(QueryCostError) as exc_info:
+        analyzer.check(document, {'depth': 4, 'nodes': 1000})
+    assert str(exc_info.value) == 'The query nodes is 20101, over the limit of 1000.'
+    assert exc_info.value.cost.nodes == 20101
+
+
+def test_client_refuses_expensive_queries():
+    transport = LocalSchemaTransport(schema)
+    client = Client(schema=schema, transport=transport, cost_limits={'nodes': 100})
+    query = gql('query ($first: Int) { viewer { friends(first: $first) { id } } }')
+
+    with pytest.raises(QueryCostError):
+        client.execute(query, variable_values={'first': 1000})
+    with pytest.raises(QueryCostError):
+        client.execute_many([(query, {'first': 1000})])
+    assert client.analyze_cost(query, {'first': 5}).nodes == 11
+
+
+def test_unknown_limits():
+    with pytest.raises(AssertionError):
+        Client(schema=schema, cost_limits={'width': 10})
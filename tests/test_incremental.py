@@ -0,0 +1,144 @@
+import copy
+import threading
+
+import pytest
+
+from pygql import Client, gql
+from pygql.incremental import ACCEPT_INCREMENTAL, ResultMerger, iter_parts, iter_payloads, merge_response
+from pygql.transport.batch_transport import BatchTransport
+from pygql.transport.requests import RequestsHTTPTransport
+from pygql.transport.session_transport import SessionTransport
+
+from .conftest import Multipart
+
+query = gql('''
+    {
+      hero {
+        name
+        ... @defer(label: "friends") { friends { name } }
+        appearsIn @stream(initialCount: 1)
+      }
+    }
+''')
+
+PAYLOADS = [
+    {'data': {'hero': {'name': 'R2-D2', 'appearsIn': ['NEWHOPE']}}, 'hasNext': True},
+    {'incremental': [{'items': ['EMPIRE'], 'path': ['hero', 'appearsIn', 1]}], 'hasNext': True},
+    {
+        'incremental': [
+            {'data': {'friends': [{'name': 'Luke Skywalker'}]}, 'path': ['hero'], 'label': 'friends'},
+            {'items': ['JEDI'], 'path': ['hero', 'appearsIn', 2]},
+        ],
+        'hasNext': False
+    },
+]
+EXPECTED = {
+    'hero': {'name': 'R2-D2', 'appearsIn': ['NEWHOPE', 'EMPIRE', 'JEDI'], 'friends': [{'name': 'Luke Skywalker'}]}
+}
+
+
+def multipart_body(payloads, boundary='-'):
+    return b''.join(Multipart(payloads, boundary).chunks())
+
+
+def test_iter_parts_across_chunks():
+    body = multipart_body([{'data': 1}, {'data': 2}], boundary='graphql')
+    chunks = [body[index:index + 3] for index in range(0, len(body), 3)]
+
+    assert list(iter_parts(chunks, 'graphql')) == [b'{"data": 1}', b'{"data": 2}']
+
+
+def test_iter_payloads_skips_keep_alives():
+    body = b'---\r\n\r\n{}\r\n---\r\nContent-Type: application/json\r\n\r\n{"data": {}}\r\n-----\r\n'
+
+    assert list(iter_payloads('multipart/mixed; boundary="-"', [body])) == [{'data': {}}]
+    assert list(iter_payloads('application/json', [b'{"data": ', b'null}'])) == [{'data': None}]
+
+
+def test_merge_incremental_payloads():
+    merger = ResultMerger()
+
+    results = [merger.add(payload) for payload in copy.deepcopy(PAYLOADS)]
+
+    assert [result.has_next for result in results] == [True, True, False]
+    assert results[-1].data == EXPECTED
+    assert [entry.get('label') for entry in results[-1].incremental] == ['friends', None]
+    assert results[-1].errors is None
+
+
+def test_merge_payloads_with_pending_ids():
+    merger = ResultMerger()
+    merger.add({
+        'data': {'hero': {'name': 'R2-D2', 'appearsIn': []}},
+        'pending': [{'id': '0', 'path': ['hero']}, {'id': '1', 'path': ['hero', 'appearsIn']}],
+        'hasNext': True
+    })
+    merger.add({'incremental': [{'id': '1', 'items': ['NEWHOPE', 'EMPIRE']}], 'hasNext': True})
+    result = merger.add({
+        'incremental': [
+            {'id': '0', 'data': {'name': 'Luke'}, 'subPath': ['friends', 0]},
+            {'id': '1', 'items': ['JEDI'], 'errors': [{'message': 'Slow'}]},
+        ],
+        'completed': [{'id': '0'}, {'id': '1'}],
+        'hasNext': False
+    })
+
+    assert result.data == {'hero': {'name': 'R2-D2', 'appearsIn': ['NEWHOPE', 'EMPIRE', 'JEDI']}}
+    assert result.errors == [{'message': 'Slow'}]
+    assert merger.pending == {}
+
+
+def test_merge_payloads_per_fragment():
+    body = multipart_body([
+        {'data': {'hero': {'name': 'R2-D2'}}, 'hasNext': True},
+        {'data': {'id': '2001'}, 'path': ['hero'], 'hasNext': True},
+        {'data': None, 'path': ['hero', 'missing'], 'errors': [{'message': 'Failed'}], 'hasNext': False},
+    ])
+
+    result = merge_response('multipart/mixed; boundary=-', body)
+
+    assert result.data == {'hero': {'name': 'R2-D2', 'id': '2001'}}
+    assert result.errors == [{'message': 'Failed'}]
+
+
+@pytest.mark.parametrize('transport_class', [RequestsHTTPTransport, SessionTransport, BatchTransport])
+def test_execute_incremental(graphql_server, transport_class):
+    graphql_server.handler = lambda payload: Multipart(PAYLOADS)
+    transport = transport_class(graphql_server.url, use_json=True)
+
+    results = list(Client(transport=transport).execute_incremental(query))
+
+    assert [result.has_next for result in results] == [True, True, False]
+    assert results[-1].data == EXPECTED
+    assert graphql_server.request_headers[0]['Accept'] == ACCEPT_INCREMENTAL
+    assert '@defer' in graphql_server.requests[0]['query']
+
+
+def test_payloads_are_yielded_as_they_arrive(graphql_server):
+    release = threading.Event()
+    graphql_server.handler = lambda payload: Multipart([PAYLOADS[0], lambda: release.wait(5)] + PAYLOADS[1:])
+    transport = RequestsHTTPTransport(graphql_server.url, use_json=True)
+
+    results = transport.execute_incremental(query)
+    first = next(results)
+
+    assert not release.is_set()
+    assert first.data == {'hero': {'name': 'R2-D2', 'appearsIn': ['NEWHOPE']}}
+    release.set()
+    assert list(results)[-1].data == EXPECTED
+
+
+def test_execute_merges_multipart_responses(graphql_server):
+    graphql_server.handler = lambda payload: Multipart(PAYLOADS)
+    client = Client(transport=RequestsHTTPTransport(graphql_server.url, use_json=True))
+
+    assert client.execute(query) == EXPECTED
+
+
+def test_servers_without_incremental_delivery(graphql_server):
+    transport = RequestsHTTPTransport(graphql_server.url, use_json=True)
+
+    [result] = transport.execute_incremental(gql('{ hero { name } }'))
+
+    assert result.data == {'hero': {'name': 'R2-D2'}}
+    assert not result.has_next
@@ -0,0 +1,129 @@
+from graphql import parse
+from graphql.language.printer import print_ast
+
+from pygql import gql
+from pygql.normalize import QueryPrinter, canonical_query, minify, normalize, query_hash
+from pygql.transport.requests import RequestsHTTPTransport
+
+QUERY = '''
+query HeroQuery($episode: Episode = JEDI, $ids: [String!]) @live {
+  hero(episode: $episode) {
+    id
+    name: id
+    ...HeroFields @include(if: true)
+    friends { name }
+    ... on Droid { primaryFunction }
+    ... { id }
+  }
+  search(filter: {name: "R2-D2", limit: -1, ratio: 0.5, tags: [A B], ok: false}, ids: $ids) {
+    __typename
+  }
+}
+
+fragment HeroFields on Character {
+  appearsIn
+}
+'''
+
+
+def test_minify_keeps_the_document():
+    minified = minify(gql(QUERY))
+
+    assert print_ast(parse(minified)) == print_ast(gql(QUERY))
+    assert minified.startswith('query HeroQuery($episode:Episode=JEDI$ids:[String!])@live{')
+    assert '\n' not in minified
+    assert 'limit:-1 ratio:0.5 tags:[A B]ok:false' in minified
+    assert len(minified) < len(print_ast(gql(QUERY))) * 0.75
+
+
+def test_removes_unused_fragments():
+    document = gql('''
+        { hero { ...Used } }
+        fragment Used on Character { name ...Nested }
+        fragment Nested on Character { id }
+        fragment Unused on Character { appearsIn }
+    ''')
+
+    assert minify(normalize(document)) == (
+        '{hero{...Used}}fragment Nested on Character{id}fragment Used on Character{name...Nested}'
+    )
+
+
+def test_merges_duplicate_selections():
+    document = gql('''
+        {
+          hero {
+            name
+            friends { id }
+            name
+            friends { name id }
+            alias: name
+            ...Fields
+            ...Fields
+            ... on Droid { primaryFunction }
+            ... on Droid { primaryFunction id }
+            friends(first: 1) { id }
+          }
+        }
+        fragment Fields on Character { id }
+    ''')
+
+    assert minify(normalize(document)) == (
+        '{hero{name friends{id name}alias:name...Fields...on Droid{primaryFunction id}friends(first:1){id}}}'
+        'fragment Fields on Character{id}'
+    )
+
+
+def test_different_directives_are_not_merged():
+    document = gql('query ($skip: Boolean!) { hero { name name @skip(if: $skip) } }')
+
+    assert minify(normalize(document)) == 'query($skip:Boolean!){hero{name name@skip(if:$skip)}}'
+
+
+def test_canonical_query():
+    first = gql('''
+        query Search { search(text: "r2", filter: {limit: 1, name: "x"}) { id } }
+        fragment Unused on Character { id }
+    ''')
+    second = gql('query Search{search(filter:{name:"x",limit:1},text:"r2"){id id}}')
+
+    assert canonical_query(first) == canonical_query(second) == (
+        'query Search{search(filter:{limit:1 name:"x"}text:"r2"){id}}'
+    )
+    assert query_hash(first) == query_hash(second)
+    assert query_hash(first) != query_hash(gql('query Search { search(text: "r3") { id } }'))
+
+
+def test_normalize_does_not_change_the_document():
+    document = gql(QUERY)
+    printed = print_ast(document)
+
+    normalize(document)
+
+    assert print_ast(document) == printed
+
+
+def test_query_printer():
+    printer = QueryPrinter(maxsize=1)
+    document = gql('{ hero { name name } }')
+
+    assert printer(document) == '{hero{name}}'
+    assert printer(document) is printer(document)
+    assert QueryPrinter(normalize=False)(document) == '{hero{name name}}'
+    assert QueryPrinter(minify=False)(document) == '{\n  hero {\n    name\n  }\n}\n'
+
+
+def test_transport_sends_normalized_queries(graphql_server):
+    transport = RequestsHTTPTransport(graphql_server.url, use_json=True, normalize_query=True)
+    query = gql('''
+        query {
+          hero { name ...Name }
+        }
+        fragment Name on Character { name }
+        fragment Unused on Character { id }
+    ''')
+
+    result = transport.execute(query)
+
+    assert result.data == {'hero': {'name': 'R2-D2'}}
+    assert graphql_server.requests[0]['query'] == '{hero{name...Name}}fragment Name on Character{name}'
@@ -0,0 +1,78 @@
+import json
+import time
+
+import pytest
+from graphql import graphql
+from graphql.utils.introspection_query import introspection_query
+
+from pygql import Client, gql
+from pygql.schema_cache import SchemaCache
+from pygql.transport.local_schema import LocalSchemaTransport
+
+from .starwars.schema import StarWarsSchema
+
+
+class IntrospectedTransport(LocalSchemaTransport):
+    url = 'http://swapi.example.com/graphql'
+
+    def __init__(self, schema):
+        super(IntrospectedTransport, self).__init__(schema)
+        self.calls = 0
+
+    def execute(self, document, *args, **kwargs):
+        self.calls += 1
+        return super(IntrospectedTransport, self).execute(document, *args, **kwargs)
+
+
+@pytest.fixture
+def cache(tmpdir):
+    return SchemaCache(directory=str(tmpdir), ttl=60)
+
+
+def test_client_starts_from_cached_schema(cache):
+    first = IntrospectedTransport(StarWarsSchema)
+    Client(transport=first, fetch_schema_from_transport=True, schema_cache=cache)
+    assert first.calls == 1
+
+    second = IntrospectedTransport(StarWarsSchema)
+    client = Client(transport=second, fetch_schema_from_transport=True, schema_cache=cache)
+
+    assert second.calls == 0
+    assert client.schema_refresh is None
+    assert client.execute(gql('{ hero { name } }')) == {'hero': {'name': 'R2-D2'}}
+
+
+def test_stale_schema_is_refreshed_in_background(cache):
+    introspection = graphql(StarWarsSchema, introspection_query).data
+    entry = cache.store(IntrospectedTransport.url, introspection)
+    entry['fetched_at'] = time.time() - 120
+    with open(cache.path(IntrospectedTransport.url), 'w') as cache_file:
+        json.dump(entry, cache_file)
+
+    transport = IntrospectedTransport(StarWarsSchema)
+    client = Client(transport=transport, fetch_schema_from_transport=True, schema_cache=cache)
+    assert client.schema is not None
+    client.schema_refresh.join(5)
+
+    assert transport.calls == 1
+    assert not cache.is_stale(cache.load(transport.url))
+
+
+def test_cache_is_keyed_by_version(cache, tmpdir):
+    cache.store(IntrospectedTransport.url, {'__schema': {}})
+    other_version = SchemaCache(directory=str(tmpdir), version='v2')
+
+    assert cache.load(IntrospectedTransport.url) is not None
+    assert other_version.load(IntrospectedTransport.url) is None
+    assert cache.load('http://other.example.com/graphql') is None
+
+
+def test_unreadable_cache_is_fetched_again(cache):
+    with open(cache.path(IntrospectedTransport.url), 'w') as cache_file:
+        cache_file.write('{not json')
+
+    transport = IntrospectedTransport(StarWarsSchema)
+    Client(transport=transport, fetch_schema_from_transport=True, schema_cache=cache)
+
+    assert transport.calls == 1
+    assert cache.load(transport.url) is not None
@@ -0,0 +1,92 @@
+import time
+
+import pytest
+from graphql import build_ast_schema, parse
+
+from pygql import Client, gql
+from pygql.schema_poller import SchemaPoller
+from pygql.transport.local_schema import LocalSchemaTransport
+from pygql.validation import ValidationCache
+
+TYPE_DEF = '''
+schema {
+  query: Query
+}
+
+type Human {
+  name: String
+}
+
+type Droid {
+  name: String
+  %s
+}
+
+type Query {
+  human: Human
+  droid: Droid
+}
+'''
+
+V1 = build_ast_schema(parse(TYPE_DEF % ''))
+V2 = build_ast_schema(parse(TYPE_DEF % 'primaryFunction: String'))
+
+HUMAN_QUERY = gql('{ human { name } }')
+DROID_QUERY = gql('{ droid { name } }')
+
+
+@pytest.fixture
+def transport():
+    return LocalSchemaTransport(V1)
+
+
+@pytest.fixture
+def client(transport):
+    return Client(transport=transport, fetch_schema_from_transport=True)
+
+
+def test_poll_swaps_schema_and_invalidates_changed_types(client, transport):
+    client.validate(HUMAN_QUERY)
+    client.validate(DROID_QUERY)
+    with pytest.raises(Exception):
+        client.validate(gql('{ droid { primaryFunction } }'))
+    assert len(client.validation_cache) == 3
+
+    transport.schema = V2
+    assert SchemaPoller(client).poll() == {'Droid'}
+
+    assert client.schema.get_type('Droid').fields['primaryFunction']
+    assert client.validation_cache.get(HUMAN_QUERY) == []
+    assert client.validation_cache.get(DROID_QUERY) is None
+    client.validate(gql('{ droid { primaryFunction } }'))
+
+
+def test_poll_unchanged_schema(client):
+    schema = client.schema
+    client.validate(HUMAN_QUERY)
+
+    assert SchemaPoller(client).poll() == set()
+    assert client.schema is schema
+    assert len(client.validation_cache) == 1
+
+
+def test_background_poller(transport):
+    client = Client(transport=transport, fetch_schema_from_transport=True, poll_schema_interval=0.01)
+    transport.schema = V2
+
+    deadline = time.time() + 5
+    while 'primaryFunction' not in client.schema.get_type('Droid').fields and time.time() < deadline:
+        time.sleep(0.01)
+    client.schema_poller.stop()
+
+    assert 'primaryFunction' in client.schema.get_type('Droid').fields
+
+
+def test_validation_started_before_invalidation_is_not_cached():
+    cache = ValidationCache()
+    generation = cache.generation
+    cache.invalidate(['Droid'])
+
+    cache.put(DROID_QUERY, [], {'Droid'}, generation)
+
+    assert cache.get(DROID_QUERY) is None
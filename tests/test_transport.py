@@ -1,7 +1,12 @@
+import threading
+import time
+
 import pytest
 
 from pygql import Client, gql
+from pygql.transport.pool import ConnectionPool
 from pygql.transport.requests import RequestsHTTPTransport
+from pygql.transport.session_transport import SessionTransport
 import requests
 
 @pytest.fixture
@@ -78,3 +83,107 @@ def test_hero_name_query(client):
     }
     result = client.execute(query)
     assert result == expected
+
+
+def test_requests_transport_reuses_connections(graphql_server):
+    transport = RequestsHTTPTransport(url=graphql_server.url, use_json=True)
+    client = Client(transport=transport)
+    query = gql('{ hero { name } }')
+
+    for _ in range(3):
+        assert client.execute(query) == {'hero': {'name': 'R2-D2'}}
+
+    stats = transport.pool_stats()
+    assert stats['requests'] == 3
+    assert stats['in_flight'] == 0
+    host_stats, = stats['hosts'].values()
+    assert host_stats['connections'] == 1
+    assert host_stats['idle'] == 1
+    assert len(graphql_server.client_addresses) == 1
+
+
+def test_transports_share_connection_pool(graphql_server):
+    pool = ConnectionPool(pool_maxsize=4, pool_block=True)
+    query = gql('{ hero { name } }')
+
+    for transport in (RequestsHTTPTransport(url=graphql_server.url, use_json=True, pool=pool),
+                      SessionTransport(url=graphql_server.url, use_json=True, pool=pool)):
+        assert transport.execute(query).data == {'hero': {'name': 'R2-D2'}}
+
+    assert pool.stats()['requests'] == 2
+    assert len(graphql_server.client_addresses) == 1
+
+
+def test_close_keeps_the_shared_pool_open(graphql_server):
+    pool = ConnectionPool()
+    query = gql('{ hero { name } }')
+    first = RequestsHTTPTransport(url=graphql_server.url, use_json=True, pool=pool)
+    second = RequestsHTTPTransport(url=graphql_server.url, use_json=True, pool=pool)
+
+    first.execute(query)
+    first.close()
+
+    assert second.execute(query).data == {'hero': {'name': 'R2-D2'}}
+    assert len(graphql_server.client_addresses) == 1
+
+
+def test_requests_transport_does_not_keep_cookies(graphql_server):
+    graphql_server.response_headers['Set-Cookie'] = 'session=server; Path=/'
+    query = gql('{ hero { name } }')
+    stateless = RequestsHTTPTransport(url=graphql_server.url, use_json=True, cookies={'user': 'luke'})
+    session = SessionTransport(url=graphql_server.url, use_json=True)
+
+    for transport in (stateless, session):
+        transport.execute(query)
+        transport.execute(query)
+
+    assert [headers.get('Cookie') for headers in graphql_server.request_headers] == [
+        'user=luke', 'user=luke', None, 'session=server'
+    ]
+
+
+def test_connection_pool_idle_timeout(graphql_server):
+    pool = ConnectionPool(idle_timeout=0)
+    transport = RequestsHTTPTransport(url=graphql_server.url, use_json=True, pool=pool)
+    query = gql('{ hero { name } }')
+
+    transport.execute(query)
+    time.sleep(0.01)
+    transport.execute(query)
+
+    assert len(graphql_server.client_addresses) == 2
+
+
+def test_session_transport_per_thread_session(graphql_server):
+    transport = SessionTransport(url=graphql_server.url, use_json=True, per_thread_session=True,
+                                 cookies={'csrftoken': 'token'})
+    query = gql('{ hero { name } }')
+    sessions = []
+
+    def run():
+        assert transport.execute(query).data == {'hero': {'name': 'R2-D2'}}
+        sessions.append(transport.get_session())
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(id(session) for session in sessions)) == 4
+    assert all(session.cookies is transport.session.cookies for session in sessions)
+    assert all(headers['Cookie'] == 'csrftoken=token' for headers in graphql_server.request_headers)
+
+
+def test_session_transport_update_headers(graphql_server):
+    transport = SessionTransport(url=graphql_server.url, use_json=True, per_thread_session=True,
+                                 headers={'x-first': '1'})
+    query = gql('{ hero { name } }')
+
+    transport.execute(query)
+    transport.update_headers({'x-second': '2'})
+    transport.execute(query)
+
+    first, second = graphql_server.request_headers
+    assert first['x-first'] == '1' and 'x-second' not in first
+    assert second['x-first'] == '1' and second['x-second'] == '2'
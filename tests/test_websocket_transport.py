@@ -0,0 +1,190 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from pygql import Client, gql
+from pygql.transport.stream import ResultStream, StreamTimeoutError
+from pygql.transport.websocket import (SubscriptionError, WebSocketError, WebSocketTransport, encode_frame,
+                                       read_frame)
+
+query = gql('{ hero { name } }')
+subscription = gql('subscription ($count: Int) { reviews(count: $count) { stars } }')
+
+
+def review_handler(payload):
+    count = payload['variables'].get('count', 3)
+    return ({'data': {'reviews': {'stars': stars}}} for stars in range(count))
+
+
+def stars(results):
+    return [result.data['reviews']['stars'] for result in results]
+
+
+@pytest.fixture
+def transport(websocket_server):
+    websocket_server.handler = review_handler
+    transport = WebSocketTransport(websocket_server.url, init_payload={'token': 'secret'}, reconnect_delay=0.01)
+    yield transport
+    transport.close()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'Timed out'
+        time.sleep(0.01)
+
+
+def test_frames():
+    from io import BytesIO
+
+    for size in (0, 125, 126, 70000):
+        payload = b'x' * size
+        assert read_frame(BytesIO(encode_frame(0x1, payload))) == (True, 0x1, payload)
+        assert read_frame(BytesIO(encode_frame(0x2, payload, mask=False))) == (True, 0x2, payload)
+
+
+def test_subscription_results(websocket_server, transport):
+    results = list(transport.subscribe(subscription, {'count': 3}))
+
+    assert stars(results) == [0, 1, 2]
+    [init] = websocket_server.messages_of_type('connection_init')
+    assert init['payload'] == {'token': 'secret'}
+    [start] = websocket_server.messages_of_type('start')
+    assert start['payload']['variables'] == {'count': 3}
+    assert 'subscription' in start['payload']['query']
+
+
+def test_subscriptions_share_the_connection(websocket_server, transport):
+    streams = [transport.subscribe(subscription, {'count': count}) for count in range(1, 6)]
+
+    assert [stars(stream) for stream in streams] == [list(range(count)) for count in range(1, 6)]
+    assert len(websocket_server.websockets) == 1
+    assert len(set(start['id'] for start in websocket_server.messages_of_type('start'))) == 5
+    assert transport.subscriptions == {}
+
+
+def test_client_subscribe(websocket_server):
+    websocket_server.handler = review_handler
+    with WebSocketTransport(websocket_server.url) as transport:
+        client = Client(transport=transport)
+
+        assert stars(client.subscribe(subscription, {'count': 2})) == [0, 1]
+
+
+def test_execute(websocket_server, transport):
+    websocket_server.handler = None
+    client = Client(transport=transport)
+
+    assert client.execute(query) == {'hero': {'name': 'R2-D2'}}
+    assert client.execute(query) == {'hero': {'name': 'R2-D2'}}
+    assert len(websocket_server.websockets) == 1
+
+
+def test_stop_subscription(websocket_server, transport):
+    release = threading.Event()
+
+    def handler(payload):
+        yield {'data': {'reviews': {'stars': 5}}}
+        release.wait(5)
+        yield {'data': {'reviews': {'stars': 4}}}
+
+    websocket_server.handler = handler
+    with transport.subscribe(subscription) as stream:
+        assert stars([next(stream)]) == [5]
+
+    wait_for(lambda: websocket_server.messages_of_type('stop'))
+    release.set()
+    assert list(stream) == []
+    assert websocket_server.messages_of_type('stop')[0]['id'] == websocket_server.messages_of_type('start')[0]['id']
+
+
+def test_subscription_error(websocket_server, transport):
+    def handler(payload):
+        yield {'data': {'reviews': {'stars': 5}}}
+        raise ValueError('No more reviews')
+
+    websocket_server.handler = handler
+    stream = transport.subscribe(subscription)
+
+    assert stars([next(stream)]) == [5]
+    with pytest.raises(SubscriptionError) as exc_info:
+        next(stream)
+    assert str(exc_info.value) == 'No more reviews'
+
+
+def test_connection_error(websocket_server):
+    websocket_server.connection_error = {'message': 'Unauthorized'}
+    transport = WebSocketTransport(websocket_server.url)
+
+    with pytest.raises(WebSocketError) as exc_info:
+        transport.subscribe(subscription)
+    assert 'Unauthorized' in str(exc_info.value)
+
+
+def test_reconnect_and_resubscribe(websocket_server, transport):
+    release = threading.Event()
+
+    def handler(payload):
+        yield {'data': {'reviews': {'stars': 1}}}
+        release.wait(5)
+        yield {'data': {'reviews': {'stars': 2}}}
+
+    websocket_server.handler = handler
+    stream = transport.subscribe(subscription)
+    assert stars([next(stream)]) == [1]
+
+    websocket_server.drop_connections()
+    # The subscription starts again on the new connection
+    assert stars([next(stream)]) == [1]
+    release.set()
+
+    assert stars(stream) == [2]
+    assert len(websocket_server.messages_of_type('connection_init')) == 2
+    assert len(set(start['id'] for start in websocket_server.messages_of_type('start'))) == 1
+
+
+def test_connection_lost_without_reconnect(websocket_server):
+    websocket_server.handler = lambda payload: iter(threading.Event().wait, True)
+    transport = WebSocketTransport(websocket_server.url, reconnect=False)
+    stream = transport.subscribe(subscription)
+    wait_for(lambda: websocket_server.messages_of_type('start'))
+
+    websocket_server.drop_connections()
+
+    with pytest.raises(WebSocketError) as exc_info:
+        stream.get(5)
+    assert 'The connection was lost' in str(exc_info.value)
+
+
+def test_close_completes_the_subscriptions(websocket_server, transport):
+    websocket_server.handler = lambda payload: iter(threading.Event().wait, True)
+    stream = transport.subscribe(subscription)
+
+    transport.close()
+
+    assert list(stream) == []
+    wait_for(lambda: websocket_server.messages_of_type('connection_terminate'))
+    with pytest.raises(WebSocketError):
+        transport.subscribe(subscription)
+
+
+def test_stream_timeout():
+    with pytest.raises(StreamTimeoutError):
+        ResultStream().get(0.01)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 5), reason='async for needs python 3.5')
+def test_async_iteration(websocket_server, transport):
+    import asyncio
+
+    namespace = {}
+    exec('async def collect(stream):\n    return [result async for result in stream]', namespace)
+
+    results = asyncio.get_event_loop().run_until_complete(
+        namespace['collect'](transport.subscribe(subscription, {'count': 4}))
+    )
+
+    assert stars(results) == [0, 1, 2, 3]